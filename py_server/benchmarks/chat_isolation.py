@@ -0,0 +1,101 @@
+"""
+Concurrency stress test for /api/chat: hundreds of parallel streams, each in its
+own session, and a check that no session ever sees another one's checkpoints.
+
+Every session sends `--turns` messages in a row. The fake model echoes all user
+messages of the prompt, so the reply of each turn shows exactly which history the
+checkpointer handed the graph; it must be the session's own messages, in order.
+The server-owned history of every session is checked as well.
+
+用法：
+    python benchmarks/chat_isolation.py [--streams 300] [--turns 3]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.chat_server import ChatServer, chat_stream, summarize  # noqa: E402
+from benchmarks.fake_openai import FakeOpenAIServer  # noqa: E402
+
+
+async def run_session(client, session_id: str, turns: int, failures: list) -> list:
+    timings, sent = [], []
+    for turn in range(turns):
+        message = f"{session_id}/{turn}"
+        sent.append(message)
+        result = await chat_stream(client, {"message": message, "session_id": session_id})
+        timings.append(result["total_s"])
+        expected = f"echo: {' | '.join(sent)}"
+        if result["status"] != "done" or not result["content"].startswith(expected + " "):
+            failures.append(f"{session_id} turn {turn}: {result['content'][:120]!r}")
+            return timings
+    return timings
+
+
+async def check_history(client, session_id: str, turns: int, failures: list):
+    history = (await client.get(f"/api/chat/history/{session_id}")).json()["history"]
+    humans = [m["content"] for m in history if m["type"] == "human"]
+    if humans != [f"{session_id}/{turn}" for turn in range(turns)] or len(history) != 2 * turns:
+        failures.append(f"{session_id} history: {humans}")
+
+
+async def stress(url: str, streams: int, turns: int) -> dict:
+    prefix = uuid.uuid4().hex[:8]
+    sessions = [f"{prefix}-{i}" for i in range(streams)]
+    failures: list = []
+    # Drop idle connections before uvicorn's 5 s keep-alive timeout closes them.
+    limits = httpx.Limits(max_connections=streams, keepalive_expiry=2)
+    async with httpx.AsyncClient(base_url=url, timeout=None, limits=limits) as client:
+        started = time.perf_counter()
+        timings = await asyncio.gather(
+            *(run_session(client, session, turns, failures) for session in sessions)
+        )
+        elapsed = time.perf_counter() - started
+        await asyncio.gather(
+            *(check_history(client, session, turns, failures) for session in sessions)
+        )
+    latencies = [t for session in timings for t in session]
+    return {
+        "streams": len(latencies),
+        "elapsed_s": round(elapsed, 2),
+        "streams_per_s": round(len(latencies) / elapsed, 1),
+        "latency": summarize(latencies),
+        "isolation_failures": failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel /api/chat isolation stress test")
+    parser.add_argument("--streams", type=int, default=300, help="concurrent sessions")
+    parser.add_argument("--turns", type=int, default=3, help="turns per session")
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--token-delay-ms", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--llm-port", type=int, default=8766)
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(args.llm_port, args.tokens, args.token_delay_ms) as llm:
+        with ChatServer(f"{llm.url}/v1", port=args.port) as server:
+            report = asyncio.run(stress(server.url, args.streams, args.turns))
+            report["peak_llm_concurrency"] = llm.stats()["peak"]
+
+    failures = report.pop("isolation_failures")
+    print(f"{args.streams} sessions x {args.turns} turns")
+    for key, value in report.items():
+        print(f"  {key}: {value}")
+    print(f"  isolation failures: {len(failures)}")
+    for failure in failures[:10]:
+        print(f"    {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
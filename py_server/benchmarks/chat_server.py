@@ -0,0 +1,256 @@
+"""
+Runs the py_server app in a child process for the /api/chat load tests, plus the
+client helpers those tests share.
+
+The app talks to the fake OpenAI-compatible server (benchmarks/fake_openai.py).
+Without MONGODB_URI the shared Mongo clients are replaced by the in-memory
+doubles from tests/fakes.py; `--mongo-latency-ms` adds a simulated round trip to
+every operation (awaited by the async client, slept by the sync one).
+
+Two switches rebuild the code as it was before a change, so before and after can
+be measured on the same machine:
+
+    --user-model blocking   the user routes call the synchronous UserModel from
+                            inside the async handlers, as they did before
+                            AsyncUserModel
+    --chatbot sync          the chatbot node is a sync function that calls
+                            `chat_modal.invoke`, run on LangGraph's thread pool,
+                            as it was before the node became async
+
+用法（通常由其他 benchmark 启动）：
+    python benchmarks/chat_server.py --port 8000 --llm-url http://127.0.0.1:8766/v1
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+from benchmarks.fake_openai import ensure_port_free, wait_until_ready  # noqa: E402
+
+
+class _Blocking:
+    """Sleeps before every call, like a synchronous driver waiting on the network."""
+
+    def __init__(self, target, latency: float):
+        self._target = target
+        self._latency = latency
+
+    def __getitem__(self, name: str) -> "_Blocking":
+        return _Blocking(self._target[name], self._latency)
+
+    def __getattr__(self, name: str):
+        import mongomock
+
+        attribute = getattr(self._target, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            time.sleep(self._latency)
+            result = attribute(*args, **kwargs)
+            if isinstance(result, (mongomock.Database, mongomock.Collection)):
+                return _Blocking(result, self._latency)
+            return result
+
+        return call
+
+
+def install_fake_mongo(latency: float):
+    import mongomock
+
+    from src.db import connection
+    from tests.fakes import FakeAsyncMongoClient
+
+    client = mongomock.MongoClient()
+    connection._async_client = FakeAsyncMongoClient(client, latency)
+    connection._sync_client = _Blocking(client, latency)
+
+
+def use_blocking_user_model():
+    import main
+    from src.db.user_model import UserModel
+
+    class BlockingUserModel:
+        def __init__(self):
+            self._model = UserModel()
+
+        async def ensure_indexes(self):
+            pass
+
+        async def add_session_to_user(self, *args):
+            return self._model.add_session_to_user(*args)
+
+        async def list_user_sessions(self, *args):
+            return self._model.list_user_sessions(*args)
+
+    main.user_model = BlockingUserModel()
+
+
+def use_sync_chatbot():
+    from langgraph.graph import StateGraph
+
+    from src.graph import builder, context
+    from src.graph.registry import graph_registry
+
+    def assemble_context(state, model):
+        summary = state.get("summary") or ""
+        window, older = context._plan(state, context.CONTEXT_TOKEN_BUDGET)
+        if not older:
+            return context._build_prompt(state, summary, window, False), {}
+        summarizer = model.with_config(tags=[context.TAG_NOSTREAM])
+        summary = summarizer.invoke(context._summary_request(summary, older)).content
+        prompt = context._build_prompt(state, summary, window, True)
+        return prompt, {"summary": summary, "summary_until_id": older[-1].id}
+
+    def chatbot(state: builder.State):
+        prompt, context_update = assemble_context(state, builder.chat_modal)
+        return {
+            "messages": builder.chat_modal.invoke(prompt),
+            "todos": [{"task": "完成项目从 Flask 到 FastAPI 的迁移", "status": "done"}],
+            **context_update,
+        }
+
+    def build_sync_graph(checkpointer=None):
+        workflow = StateGraph(builder.State)
+        workflow.add_node("chatbot", chatbot)
+        workflow.set_entry_point("chatbot")
+        workflow.add_edge("chatbot", "__end__")
+        return workflow.compile(checkpointer=checkpointer or builder.memory_saver)
+
+    graph_registry.register("chatbot", build_sync_graph)
+
+
+def serve(args):
+    import uvicorn
+
+    if not os.getenv("MONGODB_URI"):
+        install_fake_mongo(args.mongo_latency_ms / 1000)
+    import main
+
+    if args.user_model == "blocking":
+        use_blocking_user_model()
+    if args.chatbot == "sync":
+        use_sync_chatbot()
+    uvicorn.run(main.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+class ChatServer:
+    """Runs one app worker in a child process, as a context manager."""
+
+    def __init__(
+        self,
+        llm_url: str,
+        port: int = 8000,
+        user_model: str = "async",
+        chatbot: str = "async",
+        mongo_latency_ms: float = 0.0,
+        env: Optional[Dict[str, str]] = None,
+    ):
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self.command = [
+            sys.executable, os.path.join(SERVER_DIR, "benchmarks", "chat_server.py"),
+            "--port", str(port),
+            "--user-model", user_model,
+            "--chatbot", chatbot,
+            "--mongo-latency-ms", str(mongo_latency_ms),
+        ]
+        self.env = {
+            **os.environ,
+            "PYTHONPATH": SERVER_DIR,
+            "LLM_URL": llm_url,
+            "MODEL": os.getenv("MODEL", "fake"),
+            "API_KEY": os.getenv("API_KEY", "fake"),
+            "CHECKPOINT_RETENTION_INTERVAL_SECONDS": "0",
+            # Measure the worker, not the run manager's queue.
+            "RUN_MAX_CONCURRENCY": "10000",
+            "RUN_MAX_QUEUE": "10000",
+            **(env or {}),
+        }
+        self._process = None
+
+    def __enter__(self) -> "ChatServer":
+        ensure_port_free(self.port)
+        self._process = subprocess.Popen(
+            self.command,
+            cwd=SERVER_DIR,
+            env=self.env,
+            stdout=subprocess.DEVNULL,
+        )
+        wait_until_ready(f"{self.url}/api/metrics", timeout=60)
+        return self
+
+    def __exit__(self, *exc):
+        self._process.terminate()
+        self._process.wait()
+
+
+async def chat_stream(client, payload: Dict) -> Dict:
+    """
+    Sends one /api/chat request and reads the stream to the end.
+
+    Returns:
+        {"session_id", "content", "first_token_s", "total_s", "status"}
+    """
+    started = time.perf_counter()
+    first_token = None
+    session_id, content, status = None, [], None
+    async with client.stream("POST", "/api/chat", json=payload) as response:
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            event = json.loads(line[len("data: ") :])
+            if event.get("type") == "message" and event.get("send_type") == "ai":
+                if first_token is None and event["content"]:
+                    first_token = time.perf_counter() - started
+                content.append(event["content"])
+                session_id = event["session_id"]
+            elif event.get("type") == "message_done":
+                status = event.get("status")
+    return {
+        "session_id": session_id or payload.get("session_id"),
+        "content": "".join(content),
+        "first_token_s": first_token,
+        "total_s": time.perf_counter() - started,
+        "status": status,
+    }
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile, q in [0, 100]."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(1, int(round(q / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(values: List[float]) -> Dict:
+    """p50/p95/p99/max of a list of seconds, in milliseconds."""
+    return {
+        "p50_ms": round(statistics.median(values) * 1000, 1) if values else 0.0,
+        "p95_ms": round(percentile(values, 95) * 1000, 1),
+        "p99_ms": round(percentile(values, 99) * 1000, 1),
+        "max_ms": round(max(values) * 1000, 1) if values else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run one py_server worker for load tests")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--user-model", choices=["async", "blocking"], default="async")
+    parser.add_argument("--chatbot", choices=["async", "sync"], default="async")
+    parser.add_argument("--mongo-latency-ms", type=float, default=0.0)
+    serve(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
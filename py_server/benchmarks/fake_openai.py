@@ -0,0 +1,178 @@
+"""
+A local OpenAI-compatible chat completions server for load tests.
+
+Answers every request with `echo: <user messages joined by " | ">` followed by
+`--tokens` filler tokens, streamed one per `--token-delay-ms` when the request
+asks for a stream, so ChatOpenAI can be driven at high concurrency without a
+real model. Echoing every user message of the prompt shows which history the
+model was given. The server also counts the completions in flight, which is the
+number of generations the server under test is actually running at once:
+
+    python benchmarks/fake_openai.py --port 8766 --tokens 50 --token-delay-ms 20
+    LLM_URL=http://127.0.0.1:8766/v1 MODEL=fake API_KEY=x ...
+
+POST /v1/chat/completions   -> a chat completion, streamed when "stream" is set
+GET  /stats                 -> {"requests", "active", "peak"}
+POST /stats/reset           -> resets the counters
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def create_app(tokens: int, token_delay_ms: int) -> FastAPI:
+    app = FastAPI()
+    counters = {"requests": 0, "active": 0, "peak": 0}
+
+    def reply_tokens(body: dict) -> list:
+        messages = body.get("messages", [])
+        users = [m["content"] for m in messages if m.get("role") == "user"]
+        return [f"echo: {' | '.join(users)}"] + [" 字"] * tokens
+
+    def chunk(model: str, delta: dict, finish_reason=None) -> str:
+        data = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "fake")
+        counters["requests"] += 1
+        counters["active"] += 1
+        counters["peak"] = max(counters["peak"], counters["active"])
+        parts = reply_tokens(body)
+
+        if not body.get("stream"):
+            try:
+                await asyncio.sleep(token_delay_ms * len(parts) / 1000)
+            finally:
+                counters["active"] -= 1
+            return {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "".join(parts)},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 1,
+                    "completion_tokens": len(parts),
+                    "total_tokens": len(parts) + 1,
+                },
+            }
+
+        async def stream():
+            try:
+                yield chunk(model, {"role": "assistant", "content": ""})
+                for part in parts:
+                    await asyncio.sleep(token_delay_ms / 1000)
+                    yield chunk(model, {"content": part})
+                yield chunk(model, {}, "stop")
+                yield "data: [DONE]\n\n"
+            finally:
+                counters["active"] -= 1
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def stats():
+        return counters
+
+    @app.post("/stats/reset")
+    async def reset():
+        counters.update(requests=0, peak=counters["active"])
+        return counters
+
+    return app
+
+
+def ensure_port_free(port: int):
+    """Refuses to start next to a leftover server, whose numbers would be measured instead."""
+    with socket.socket() as sock:
+        if sock.connect_ex(("127.0.0.1", port)) == 0:
+            raise RuntimeError(f"port {port} is already in use")
+
+
+def wait_until_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(url, timeout=1):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def get_json(url: str, method: str = "GET") -> dict:
+    request = urllib.request.Request(url, method=method)
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return json.load(response)
+
+
+class FakeOpenAIServer:
+    """Runs the fake server in a child process, as a context manager."""
+
+    def __init__(self, port: int = 8766, tokens: int = 50, token_delay_ms: int = 20):
+        self.port = port
+        self.args = ["--tokens", str(tokens), "--token-delay-ms", str(token_delay_ms)]
+        self.url = f"http://127.0.0.1:{port}"
+        self._process = None
+
+    def stats(self) -> dict:
+        return get_json(f"{self.url}/stats")
+
+    def reset(self) -> dict:
+        return get_json(f"{self.url}/stats/reset", method="POST")
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        ensure_port_free(self.port)
+        self._process = subprocess.Popen(
+            [sys.executable, os.path.join(BENCHMARKS_DIR, "fake_openai.py"),
+             "--port", str(self.port), *self.args],
+        )
+        wait_until_ready(f"{self.url}/stats")
+        return self
+
+    def __exit__(self, *exc):
+        self._process.terminate()
+        self._process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the fake OpenAI-compatible server")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--token-delay-ms", type=int, default=20)
+    args = parser.parse_args()
+    app = create_app(args.tokens, args.token_delay_ms)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Import-time benchmark for the server.
+
+Runs `python -X importtime -c "import main"` a few times in fresh interpreters,
+reports the best total and the slowest top-level imports, and exits with a
+non-zero status when the total exceeds the budget.
+
+用法：
+    python benchmarks/import_time.py [--runs 3] [--budget-ms 1500] [--top 15]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_TIME_BUDGET_MS = int(os.getenv("IMPORT_TIME_BUDGET_MS", "1500"))
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def profile_once(module: str) -> List[Tuple[str, int, int]]:
+    """Returns (module, cumulative us, depth) for every import of one cold start."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SERVER_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            _, cumulative, indent, name = match.groups()
+            rows.append((name, int(cumulative), len(indent) // 2))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import time of main")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget-ms", type=int, default=IMPORT_TIME_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    best: Dict[str, int] = {}
+    totals = []
+    for _ in range(args.runs):
+        rows = profile_once(args.module)
+        totals.append(next(us for name, us, _ in rows if name == args.module))
+        # The module's direct imports, keeping each one's best run.
+        for name, us, depth in rows:
+            if depth == 1:
+                best[name] = min(us, best.get(name, us))
+
+    total_ms = min(totals) / 1000
+    print(f"import {args.module}: {total_ms:.0f} ms (best of {args.runs})")
+    for name, us in sorted(best.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    if total_ms > args.budget_ms:
+        print(f"❌ Over the {args.budget_ms} ms budget")
+        sys.exit(1)
+    print(f"✅ Within the {args.budget_ms} ms budget")
+
+
+if __name__ == "__main__":
+    main()
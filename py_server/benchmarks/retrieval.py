@@ -0,0 +1,100 @@
+"""
+Query latency of the knowledge-base index against corpus size.
+
+Builds HybridIndex instances over synthetic chunks (random vocabulary, random
+unit vectors standing in for embeddings) and times hybrid and keyword-only
+queries. No model or network is involved, so the numbers are the in-process
+search cost only.
+
+用法：
+    python benchmarks/retrieval.py [--sizes 1000,10000,50000] [--dim 1024] [--queries 200]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.retrieval.index import Chunk, HybridIndex, tokenize  # noqa: E402
+
+_CJK = [chr(code) for code in range(0x4E00, 0x4E00 + 3000)]
+
+
+def make_vocabulary(size: int, rng: random.Random):
+    words = [f"term{i}" for i in range(size // 2)]
+    words += ["".join(rng.choices(_CJK, k=2)) for _ in range(size - len(words))]
+    return words
+
+
+def make_chunk_text(vocabulary, rng: random.Random, words: int = 120) -> str:
+    # Zipf-like: a few words are common, most are rare.
+    picks = [vocabulary[min(int(rng.paretovariate(1.1)) - 1, len(vocabulary) - 1)]
+             for _ in range(words // 2)]
+    picks += rng.choices(vocabulary, k=words - len(picks))
+    return " ".join(picks)
+
+
+def percentile(samples, fraction: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def bench(size: int, dim: int, queries: int, vocabulary, seed: int):
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    chunks = [
+        Chunk(f"doc{i // 10}", f"doc{i // 10}", make_chunk_text(vocabulary, rng), i % 10)
+        for i in range(size)
+    ]
+    vectors = np_rng.standard_normal((size, dim), dtype=np.float32)
+
+    started = time.perf_counter()
+    index = HybridIndex()
+    # Added document by document, as a sync does.
+    for start in range(0, size, 10):
+        index.add(chunks[start : start + 10], vectors[start : start + 10])
+    build = time.perf_counter() - started
+
+    query_texts = [" ".join(rng.choices(vocabulary, k=4)) for _ in range(queries)]
+    query_vectors = np_rng.standard_normal((queries, dim), dtype=np.float32)
+    results = {}
+    for mode in ("hybrid", "keyword"):
+        latencies = []
+        for text, vector in zip(query_texts, query_vectors):
+            started = time.perf_counter()
+            index.search(tokenize(text), vector if mode == "hybrid" else None, k=5)
+            latencies.append((time.perf_counter() - started) * 1000)
+        results[mode] = latencies
+
+    print(
+        f"{size:>8} chunks  build {build:6.2f}s  "
+        + "  ".join(
+            f"{mode} p50 {statistics.median(latencies):6.2f} ms "
+            f"p95 {percentile(latencies, 0.95):6.2f} ms"
+            for mode, latencies in results.items()
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark knowledge-base queries")
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vocabulary = make_vocabulary(args.vocabulary, random.Random(args.seed))
+    for size in (int(size) for size in args.sizes.split(",")):
+        bench(size, args.dim, args.queries, vocabulary, args.seed)
+
+
+if __name__ == "__main__":
+    main()
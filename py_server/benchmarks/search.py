@@ -0,0 +1,81 @@
+"""
+Latency of the search tool against the local stub server.
+
+Compares fetching the result pages one at a time with the concurrent fetch, and
+a cold page cache with a warm one (pages still fresh) and a stale one
+(revalidated with If-None-Match, answered 304).
+
+用法：
+    python benchmarks/search.py [--latency-ms 100] [--results 5] [--runs 5]
+"""
+
+import argparse
+import asyncio
+import importlib
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.search_stub import StubSearchServer  # noqa: E402
+from src.tools.search import HTTPBackend, PageCache, web_search  # noqa: E402
+
+# `src.tools.search` is shadowed by the tool of the same name in `src.tools`.
+search_module = importlib.import_module("src.tools.search")
+
+
+async def timed(runs: int, make_call) -> float:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await make_call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+async def bench(server: StubSearchServer, results: int, runs: int):
+    backend = HTTPBackend(server.url)
+
+    def with_cache(cache, concurrency):
+        search_module.page_cache = cache
+        search_module._fetch_slots = asyncio.Semaphore(concurrency)
+        return lambda: web_search("深圳 天气", backend=backend, max_results=results)
+
+    report = {}
+    report["sequential, no cache"] = await timed(runs, with_cache(None, 1))
+    report["concurrent, no cache"] = await timed(
+        runs, with_cache(None, search_module.SEARCH_FETCH_CONCURRENCY)
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        cache = PageCache(directory, ttl=3600)
+        call = with_cache(cache, search_module.SEARCH_FETCH_CONCURRENCY)
+        report["concurrent, cold cache"] = await timed(1, call)
+        report["concurrent, warm cache"] = await timed(runs, call)
+        cache.ttl = 0
+        report["concurrent, revalidated (304)"] = await timed(runs, call)
+
+    for name, ms in report.items():
+        print(f"  {name:<32} p50 {ms:8.1f} ms")
+    print(f"  stub requests: {server.requests}")
+    await search_module.close_search_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the search tool")
+    parser.add_argument("--latency-ms", type=int, default=100)
+    parser.add_argument("--results", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    with StubSearchServer(latency_ms=args.latency_ms) as server:
+        print(
+            f"{args.results} results, {args.latency_ms} ms per stub request, "
+            f"fetch concurrency {search_module.SEARCH_FETCH_CONCURRENCY}"
+        )
+        asyncio.run(bench(server, args.results, args.runs))
+
+
+if __name__ == "__main__":
+    main()
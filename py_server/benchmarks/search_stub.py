@@ -0,0 +1,118 @@
+"""
+A local stand-in for a search engine and the pages it links to.
+
+Serves the JSON format of the `http` search backend and HTML pages with ETags,
+with an optional artificial latency, so the search tool can be exercised
+without network access:
+
+    python benchmarks/search_stub.py --port 8765 --latency-ms 100
+    SEARCH_BACKEND=http SEARCH_BACKEND_URL=http://127.0.0.1:8765 ...
+
+GET /search?q=...&max_results=N  -> {"results": [{"title", "url", "content"}]}
+GET /pages/<n>                    -> an HTML page; honours If-None-Match
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def page_html(number: int, paragraphs: int) -> str:
+    body = "".join(
+        f"<p>第 {number} 页第 {i} 段：深圳今天晴，气温 25℃。Paragraph {i} of page {number}.</p>"
+        for i in range(paragraphs)
+    )
+    return (
+        f"<html><head><title>Page {number}</title><style>p{{}}</style></head>"
+        f"<body><script>var x = 1;</script><h1>Page {number}</h1>{body}</body></html>"
+    )
+
+
+class StubSearchServer:
+    """Runs the stub in a background thread; also usable as a context manager."""
+
+    def __init__(self, port: int = 0, latency_ms: int = 0, paragraphs: int = 50):
+        self.latency = latency_ms / 1000
+        self.paragraphs = paragraphs
+        self.requests = {"search": 0, "pages": 0, "not_modified": 0}
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str, etag=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                if etag:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                time.sleep(stub.latency)
+                url = urlparse(self.path)
+                if url.path == "/search":
+                    stub.requests["search"] += 1
+                    params = parse_qs(url.query)
+                    count = int(params.get("max_results", ["5"])[0])
+                    results = [
+                        {
+                            "title": f"Page {n}",
+                            "url": f"{stub.url}/pages/{n}",
+                            "content": f"Snippet of page {n}",
+                        }
+                        for n in range(count)
+                    ]
+                    body = json.dumps({"results": results}).encode()
+                    return self._send(200, body, "application/json")
+                if url.path.startswith("/pages/"):
+                    number = int(url.path.rsplit("/", 1)[1])
+                    etag = f'"page-{number}-v1"'
+                    if self.headers.get("If-None-Match") == etag:
+                        stub.requests["not_modified"] += 1
+                        return self._send(304, b"", "text/html", etag)
+                    stub.requests["pages"] += 1
+                    body = page_html(number, stub.paragraphs).encode()
+                    return self._send(200, body, "text/html; charset=utf-8", etag)
+                self._send(404, b"not found", "text/plain")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self) -> "StubSearchServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the stub search server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--paragraphs", type=int, default=50)
+    args = parser.parse_args()
+    server = StubSearchServer(args.port, args.latency_ms, args.paragraphs)
+    print(f"Stub search server on {server.url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
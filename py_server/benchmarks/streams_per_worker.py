@@ -0,0 +1,75 @@
+"""
+How many concurrent /api/chat streams one app worker holds, with the chatbot
+node sync (`chat_modal.invoke` on LangGraph's thread pool, as before the node
+became async) and async (`ainvoke` on the event loop).
+
+For every `--concurrency` level, that many single-turn chats start at once
+against a local fake OpenAI-compatible server. The fake server's peak number of
+completions in flight is the number of generations the worker actually ran in
+parallel; the others waited for a free thread. Throughput and first-token
+latency are reported as well.
+
+用法：
+    python benchmarks/streams_per_worker.py [--concurrency 25,100,200]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.chat_server import ChatServer, chat_stream, summarize  # noqa: E402
+from benchmarks.fake_openai import FakeOpenAIServer  # noqa: E402
+
+
+async def burst(url: str, streams: int) -> dict:
+    limits = httpx.Limits(max_connections=streams, keepalive_expiry=2)
+    async with httpx.AsyncClient(base_url=url, timeout=None, limits=limits) as client:
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(
+                chat_stream(client, {"message": "hi", "session_id": uuid.uuid4().hex})
+                for _ in range(streams)
+            )
+        )
+        elapsed = time.perf_counter() - started
+    first_tokens = [r["first_token_s"] for r in results if r["first_token_s"] is not None]
+    return {
+        "done": sum(r["status"] == "done" for r in results),
+        "elapsed_s": round(elapsed, 2),
+        "streams_per_s": round(streams / elapsed, 1),
+        "first_token": summarize(first_tokens),
+        "total": summarize([r["total_s"] for r in results]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent chat streams per worker")
+    parser.add_argument("--concurrency", default="25,100,200", help="comma-separated levels")
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--token-delay-ms", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--llm-port", type=int, default=8766)
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    print(f"{args.tokens} tokens per reply, {args.token_delay_ms} ms per token")
+    with FakeOpenAIServer(args.llm_port, args.tokens, args.token_delay_ms) as llm:
+        for mode in ("sync", "async"):
+            print(f"chatbot node: {mode}")
+            with ChatServer(f"{llm.url}/v1", port=args.port, chatbot=mode) as server:
+                for streams in levels:
+                    llm.reset()
+                    report = asyncio.run(burst(server.url, streams))
+                    report["peak_llm_concurrency"] = llm.stats()["peak"]
+                    print(f"  {streams} streams: {report}")
+
+
+if __name__ == "__main__":
+    main()
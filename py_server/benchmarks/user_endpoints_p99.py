@@ -0,0 +1,112 @@
+"""
+p99 latency of /api/chat streams while the user session endpoints are hammered.
+
+Runs the same load twice against one app worker: once with the user routes on
+the synchronous UserModel (`--user-model blocking`, as before AsyncUserModel)
+and once on AsyncUserModel. Every Mongo operation pays `--mongo-latency-ms`,
+slept by the sync driver and awaited by the async one. While `--hammer` clients
+loop over POST /api/users/sessions/create and GET /api/users/sessions/{user_id},
+`--streams` chat sessions send `--turns` messages each; the chat latency (whole
+stream and first token) and the user endpoint latency are reported per mode.
+
+用法：
+    python benchmarks/user_endpoints_p99.py [--streams 50] [--hammer 20] [--mongo-latency-ms 3]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.chat_server import ChatServer, chat_stream, summarize  # noqa: E402
+from benchmarks.fake_openai import FakeOpenAIServer  # noqa: E402
+
+
+async def hammer_user_endpoints(client, user_id: str, stop: asyncio.Event, timings: list):
+    while not stop.is_set():
+        session_id = uuid.uuid4().hex
+        started = time.perf_counter()
+        await client.post(
+            "/api/users/sessions/create",
+            json={"session_id": session_id, "user_id": user_id, "agent_id": "chatbot"},
+        )
+        timings.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        await client.get(f"/api/users/sessions/{user_id}", params={"limit": 20})
+        timings.append(time.perf_counter() - started)
+
+
+async def chat_session(client, turns: int, totals: list, first_tokens: list):
+    session_id = uuid.uuid4().hex
+    for turn in range(turns):
+        result = await chat_stream(client, {"message": f"hi {turn}", "session_id": session_id})
+        totals.append(result["total_s"])
+        if result["first_token_s"] is not None:
+            first_tokens.append(result["first_token_s"])
+
+
+async def measure(url: str, streams: int, turns: int, hammer: int) -> dict:
+    totals, first_tokens, user_timings = [], [], []
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=streams + hammer, keepalive_expiry=2)
+    async with httpx.AsyncClient(base_url=url, timeout=None, limits=limits) as client:
+        hammers = [
+            asyncio.create_task(
+                hammer_user_endpoints(client, f"user-{i}", stop, user_timings)
+            )
+            for i in range(hammer)
+        ]
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(chat_session(client, turns, totals, first_tokens) for _ in range(streams))
+        )
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*hammers)
+    return {
+        "chat_streams": len(totals),
+        "chat_total": summarize(totals),
+        "chat_first_token": summarize(first_tokens),
+        "user_requests_per_s": round(len(user_timings) / elapsed, 1),
+        "user_latency": summarize(user_timings),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat p99 under user endpoint load")
+    parser.add_argument("--streams", type=int, default=50, help="concurrent chat sessions")
+    parser.add_argument("--turns", type=int, default=3, help="turns per chat session")
+    parser.add_argument("--hammer", type=int, default=20, help="concurrent user endpoint clients")
+    parser.add_argument("--mongo-latency-ms", type=float, default=3.0)
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--token-delay-ms", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--llm-port", type=int, default=8766)
+    args = parser.parse_args()
+
+    print(
+        f"{args.streams} chat sessions x {args.turns} turns, {args.hammer} user endpoint "
+        f"clients, {args.mongo_latency_ms} ms per Mongo operation"
+    )
+    with FakeOpenAIServer(args.llm_port, args.tokens, args.token_delay_ms) as llm:
+        for mode in ("blocking", "async"):
+            with ChatServer(
+                f"{llm.url}/v1",
+                port=args.port,
+                user_model=mode,
+                mongo_latency_ms=args.mongo_latency_ms,
+            ) as server:
+                report = asyncio.run(measure(server.url, args.streams, args.turns, args.hammer))
+            print(f"user model: {mode}")
+            for key, value in report.items():
+                print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,113 @@
+import asyncio
 import os
 import uuid
+from contextlib import asynccontextmanager
 from textwrap import indent
 from typing import Optional
 from fastapi.responses import StreamingResponse
 from fastapi.routing import json
-from langgraph.checkpoint.mongodb.aio import AsyncMongoDBSaver
 from langchain_core.messages import BaseMessage, HumanMessage, message_chunk_to_message
-from pydantic import BaseModel
-from src.agents.run_agent import run_agent, run_agent_api
-from src.agents.researcher import researcher
-from src.coze.rag import list_datasets
-from src.graph.builder import build_graph
-
-from fastapi import FastAPI, Request
+from pydantic import BaseModel, Field
+from src.coze.app import get_coze, token_manager
+from src.coze.rag import alist_datasets, datasets_cache
+from src.db.checkpointer import check_checkpointer_health, create_checkpointer
+from src.db.connection import close_clients
+from src.db.message_store import MessageStore
+from src.db.retention import CHECKPOINT_RETENTION_INTERVAL_SECONDS, CheckpointRetention
+from src.db.sessions import DEFAULT_AGENT_ID
+# 导入 builder 以将 chatbot 图注册到 graph_registry
+from src.graph.builder import memory_saver, store
+from src.graph.context import context_metrics
+from src.graph.registry import graph_registry
+from src.graph.router import router_metrics
+from src.modals import chat_modal, llm_cache
+from src.modals.admission import AdmissionRejected, admission, current_user
+from src.modals.pool import ModelPool
+from src.runs.buffer import parse_event_id
+from src.runs.manager import ChatRun, RunQueueFull, run_manager
+from src.tools.runtime import tool_cache
+from src.tools.search import close_search_client
+
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
 from src.utils import to_printable
+from src.utils.sse import (
+    DEFAULT_COALESCE_BYTES,
+    DEFAULT_COALESCE_MS,
+    MessageFrameEncoder,
+    coalesce_frames,
+    sse_frame,
+)
+
+
+# 启动后在后台预热的图和外部客户端，逗号分隔，例如 "supervisor,coze"；
+# 未预热的在第一次使用时创建
+WARMUP = [name.strip() for name in os.getenv("WARMUP", "").split(",") if name.strip()]
 
-app = FastAPI()
+
+def warm_up(checkpointer):
+    """创建 WARMUP 中列出的图和客户端，在线程中运行以免阻塞事件循环"""
+    for name in WARMUP:
+        try:
+            if name == "coze":
+                get_coze()
+                # 提前换好访问令牌，之后由令牌管理器在到期前后台刷新
+                token_manager.get().refresh()
+            else:
+                graph_registry.get(name, checkpointer)
+            print(f"✅ 预热完成: {name}")
+        except Exception as e:
+            print(f"❌ 预热 {name} 失败: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时建立共享的 checkpointer 连接池，关闭时释放所有数据库连接"""
+    retention_task = None
+    kb_task = None
+    try:
+        checkpointer = await create_checkpointer()
+        app.state.checkpointer = checkpointer
+        # 启动时按 checkpointer 预编译图，请求中只读复用
+        graph_registry.get(DEFAULT_AGENT, checkpointer)
+        # 索引只在启动时创建一次
+        await user_model.ensure_indexes()
+        await message_store.ensure_indexes()
+        # 后台定期回收过期的 checkpoint，间隔配置为 0 时关闭
+        app.state.retention = CheckpointRetention(
+            checkpointer,
+            graph_for=lambda agent_id: _agent_graph(agent_id, checkpointer),
+            summary_model=chat_modal,
+            thread_busy=run_manager.has_active_run,
+        )
+        if CHECKPOINT_RETENTION_INTERVAL_SECONDS > 0:
+            retention_task = asyncio.create_task(app.state.retention.run_forever())
+        # 知识库只在配置了 KB_DOCS_DIR 时加载，避免未使用时在启动阶段导入 numpy
+        if os.getenv("KB_DOCS_DIR"):
+            from src.retrieval.knowledge_base import knowledge_base
+
+            app.state.knowledge_base = knowledge_base
+            kb_task = asyncio.create_task(knowledge_base.run_forever())
+        if WARMUP:
+            app.state.warmup = asyncio.create_task(
+                asyncio.to_thread(warm_up, checkpointer)
+            )
+        yield
+    finally:
+        if retention_task:
+            retention_task.cancel()
+        if kb_task:
+            kb_task.cancel()
+        await run_manager.shutdown()
+        await close_search_client()
+        if token_manager.ready:
+            token_manager.get().close()
+        await close_clients()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # 配置 CORS 中间件
 app.add_middleware(
@@ -29,103 +118,394 @@ app.add_middleware(
     allow_headers=["*"],  # 允许所有请求头
 )
 
-graph = build_graph()
+
+message_store = MessageStore()
 
 
 class ChatRequest(BaseModel):
     message: str
     session_id: Optional[str] = None
+    # 用于在用户之间公平分配 LLM 调用配额，未提供时按会话区分
+    user_id: Optional[str] = None
+    # 可选的 SSE 帧合并：按时间或字节数批量发送，不设置时逐 token 发送
+    coalesce_ms: Optional[int] = Field(None, ge=1, le=5000)
+    coalesce_bytes: Optional[int] = Field(None, ge=1, le=1 << 20)
+    # 处理本次对话的智能体（图），与 add_session_to_user 保存的 agent_id 一致，默认 chatbot
+    agent_id: Optional[str] = None
+
+
+# 可以通过 /api/chat 对话的图，共用同一个 checkpointer 连接池
+CHAT_AGENTS = ("chatbot", "supervisor", "planner", "researcher")
+DEFAULT_AGENT = "chatbot"
+# 会话记录中的 agent_id 到图名的映射：未指定智能体的会话保存为 DEFAULT_AGENT_ID，由 chatbot 处理
+AGENT_ALIASES = {DEFAULT_AGENT_ID: DEFAULT_AGENT}
+
+
+def _resolve_agent(agent_id: Optional[str]) -> Optional[str]:
+    """返回 agent_id 对应的图名，未知的智能体返回 None"""
+    agent_id = agent_id or DEFAULT_AGENT
+    agent_id = AGENT_ALIASES.get(agent_id, agent_id)
+    return agent_id if agent_id in CHAT_AGENTS else None
+
+
+def _agent_graph(agent_id: Optional[str], checkpointer):
+    """按 checkpoint 元数据中的 agent_id 返回 thread 所属的图，未打标签的旧会话属于 chatbot"""
+    agent_id = _resolve_agent(agent_id)
+    if agent_id is None:
+        return None
+    return graph_registry.get(agent_id, checkpointer)
 
 
 # 不再需要独立的chat_histories，使用LangGraph的checkpointer来管理会话记忆
 
 
 @app.get("/api/datasets/list")
-def list_all_datasets():
+async def list_all_datasets():
     """List all datasets."""
-    datasets = list_datasets()
-    # 将每个 dataset 对象转换为字典，以便进行 JSON 序列化
-    datasets_json = [dataset.model_dump() for dataset in datasets]
-    return json.dumps(datasets_json, indent=2)
+    return await alist_datasets()
+
+
+@app.get("/api/health")
+async def health(request: Request):
+    """Reports the health of the checkpointer pool and the last retention run."""
+    checkpointer = request.app.state.checkpointer
+    last_report = request.app.state.retention.last_report
+    return {
+        "checkpointer": await check_checkpointer_health(checkpointer),
+        "retention": last_report.as_dict() if last_report else None,
+    }
+
+
+@app.get("/api/metrics")
+async def metrics():
+    """Reports per-worker performance counters."""
+    return {
+        "context": context_metrics.snapshot(),
+        "runs": run_manager.stats(),
+        "llm_cache": llm_cache.stats() if llm_cache else None,
+        "llm_pool": chat_modal.stats() if isinstance(chat_modal, ModelPool) else None,
+        "admission": admission.stats(),
+        "coze_datasets": datasets_cache.stats(),
+        "coze_token": token_manager.get().stats() if token_manager.ready else None,
+        "tool_cache": tool_cache.stats(),
+        "supervisor_router": router_metrics.snapshot(),
+        "in_memory": {"checkpointer": memory_saver.stats(), "store": store.stats()},
+        "knowledge_base": (
+            app.state.knowledge_base.stats()
+            if getattr(app.state, "knowledge_base", None)
+            else None
+        ),
+    }
+
+
+def _start_chat_run(chat_request: ChatRequest, request: Request) -> ChatRun:
+    """
+    Starts a generation of the requested agent as a background run.
+
+    Raises:
+        HTTPException: 400 for an unknown agent_id; 503 with Retry-After when the
+            worker's run queue or the LLM admission queue is full.
+    """
+    agent_id = _resolve_agent(chat_request.agent_id)
+    if agent_id is None:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown agent: {chat_request.agent_id}"
+        )
+    try:
+        admission.check()
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)}
+        )
+
+    graph = graph_registry.get(agent_id, request.app.state.checkpointer)
+    message = chat_request.message
+    session_id = chat_request.session_id or str(uuid.uuid4())
+
+    encoder = MessageFrameEncoder(session_id)
+    # 本轮新增的完整消息，流结束后追加到聊天记录
+    human_message = HumanMessage(content=message)
+    new_messages = [human_message]
+
+    async def message_chunks():
+        """
+        Yields (content, send_type) for every message chunk the graph streams, and
+        an `update` frame for every node that finishes, sub-agents' nodes included.
+        """
+        # 使用会话ID作为thread_id来关联LangGraph的记忆
+        # metadata 会写入 checkpoint，后台回收任务据此找到 thread 所属的图
+        config = {
+            "configurable": {"thread_id": session_id},
+            "metadata": {"agent_id": agent_id},
+        }
+
+        # 获取历史状态或创建新的初始状态
+        init_state = {"messages": [human_message], "todos": []}
+        # 已在 update 帧中报告过的消息 id，嵌套的图会重复返回同一条消息
+        reported = set()
+        # The `stream` method returns a generator of events as they occur.
+        # 使用config参数来启用记忆功能
+        # subgraphs=True also streams the updates of the agents a graph hands off to
+        async for namespace, event, chunk in graph.astream(
+            input=init_state,
+            config=config,
+            stream_mode=["messages", "updates"],
+            subgraphs=True,
+        ):
+            if event == "messages":
+                message_chunk, metadata = chunk
+                yield message_chunk.content, _send_type(message_chunk)
+            if event == "updates":
+                agent = namespace[-1].split(":")[0] if namespace else agent_id
+                for node, node_update in chunk.items():
+                    messages = _messages_from_update(node_update)
+                    # 只有顶层图的消息才是本轮对话的一部分
+                    if not namespace:
+                        new_messages.extend(messages)
+                    messages = _progress_messages(messages, reported)
+                    yield _update_frame(session_id, agent, node, node_update, messages)
+
+    async def generation_frames():
+        """Yields the SSE frames of the generation, independently of the client."""
+        # Runs in the run's own task, so the user only applies to this generation.
+        current_user.set(chat_request.user_id or session_id)
+        # 必须在本轮写入 checkpoint 之前导入旧会话，否则本轮消息会被重复记录
+        await _backfill_history(session_id, request.app.state.checkpointer)
+        try:
+            if chat_request.coalesce_ms or chat_request.coalesce_bytes:
+                frames = coalesce_frames(
+                    message_chunks(),
+                    encoder,
+                    max_delay_ms=chat_request.coalesce_ms or DEFAULT_COALESCE_MS,
+                    max_bytes=chat_request.coalesce_bytes or DEFAULT_COALESCE_BYTES,
+                )
+                async for frame in frames:
+                    yield frame
+            else:
+                async for item in message_chunks():
+                    yield item if isinstance(item, str) else encoder.encode(*item)
+        finally:
+            # 生成失败或被取消时也记录用户消息（它已写入 checkpoint）和已完成的回复
+            await message_store.append_messages(session_id, new_messages)
+        # 结束帧 message_done 由 run_manager 在任何结束方式下统一发送
+
+    try:
+        return run_manager.start(session_id, generation_frames())
+    except RunQueueFull as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": "1"}
+        )
+
+
+def _get_run(run_id: str) -> ChatRun:
+    run = run_manager.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run
 
 
 @app.post("/api/chat")
-async def chat_with_llm(chat_request: ChatRequest):
+async def chat_with_llm(chat_request: ChatRequest, request: Request):
     """
     Handles a chat request with the language model, supporting streaming responses.
 
     This endpoint receives a message from the client, sends it to the LangGraph-based
-    chatbot, and streams the response back to the client using Server-Sent Events (SSE).
-    It leverages asynchronous programming to handle the streaming efficiently.
+    agent selected by `agent_id` (the chatbot by default), and streams the response
+    back to the client using Server-Sent Events (SSE). Besides the message tokens, an
+    `update` frame reports every node that finishes, including the nodes of the
+    sub-agents the supervisor hands off to.
+
+    The generation runs in a background task and every frame carries an event id.
+    A client that reconnects with a `Last-Event-ID` header is replayed the frames
+    it missed and attached to the same generation instead of starting a new one.
     """
 
-    checkpoint_url = os.getenv("MONGODB_URI")
-    message = chat_request.message
-    session_id = chat_request.session_id or str(uuid.uuid4())
-
-    if not message:
+    last_event = parse_event_id(request.headers.get("last-event-id"))
+    if last_event:
+        run_id, seq = last_event
+        run = run_manager.get(run_id)
+        # 新会话的第一轮请求没有 session_id（由服务端生成），重连时也不会带上
+        if run is None or (
+            chat_request.session_id and run.session_id != chat_request.session_id
+        ):
+            raise HTTPException(
+                status_code=410, detail="Generation is no longer available"
+            )
+        return StreamingResponse(
+            run.buffer.subscribe(seq), media_type="text/event-stream"
+        )
+
+    if not chat_request.message:
         return json.dumps({"error": "Message not provided"}), 400
 
-    async def event_stream():
-        """An async generator function to stream responses."""
-        async with AsyncMongoDBSaver.from_conn_string(checkpoint_url) as checkpointer:
-            graph.checkpointer = checkpointer
-            # 使用会话ID作为thread_id来关联LangGraph的记忆
-            config = {"configurable": {"thread_id": session_id}}
-
-            # 获取历史状态或创建新的初始状态
-            init_state = {"messages": [HumanMessage(content=message)], "todos": []}
-            # The `stream` method returns a generator of events as they occur.
-            # 使用config参数来启用记忆功能
-            async for event, chunk in graph.astream(
-                input=init_state, config=config, stream_mode=["messages", "updates"]
-            ):
-                langgraph_node = None
-                if event == "messages":
-                    message_chunk, metadata = chunk
-                    base_message = message_chunk_to_message(message_chunk)
-                    # for k, v in base_message:
-                    # print(k, v, getattr(base_message, k, v))
-                    langgraph_node = metadata.get("langgraph_node")
-                    data_to_send = {
-                        "session_id": session_id,
-                        "type": "message",
-                        "content": message_chunk.content,
-                        "send_type": getattr(base_message, "type", None),
-                    }
-                    yield f"data: {json.dumps(data_to_send, ensure_ascii=False)}\n\n"
-                if event == "updates" and langgraph_node:
-                    state = chunk[langgraph_node]
-
-            yield f"data: {json.dumps({'type': 'message_done'})}\n\n"
-
+    run = _start_chat_run(chat_request, request)
     # Return a streaming response.
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
+    return StreamingResponse(run.buffer.subscribe(), media_type="text/event-stream")
+
+
+@app.post("/api/runs", status_code=202)
+async def start_run(chat_request: ChatRequest, request: Request):
+    """Starts a chat generation without streaming it; attach via the stream endpoint."""
+    if not chat_request.message:
+        raise HTTPException(status_code=400, detail="Message not provided")
+    return _start_chat_run(chat_request, request).as_dict()
+
+
+@app.get("/api/runs/{run_id}")
+async def get_run(run_id: str):
+    """Reports the status of a run."""
+    return _get_run(run_id).as_dict()
+
+
+@app.get("/api/runs/{run_id}/stream")
+async def attach_run(run_id: str, request: Request, after_seq: int = Query(0, ge=0)):
+    """
+    Streams the frames of a run, starting after `after_seq`.
+
+    A `Last-Event-ID` header from an automatic reconnect takes precedence over
+    `after_seq`.
+    """
+    run = _get_run(run_id)
+    last_event = parse_event_id(request.headers.get("last-event-id"))
+    if last_event and last_event[0] == run_id:
+        after_seq = last_event[1]
+    return StreamingResponse(
+        run.buffer.subscribe(after_seq), media_type="text/event-stream"
+    )
+
+
+@app.post("/api/runs/{run_id}/cancel")
+async def cancel_run(run_id: str):
+    """Cancels a queued or running generation."""
+    _get_run(run_id)
+    return (await run_manager.cancel(run_id)).as_dict()
+
+
+_SEND_TYPES: dict = {}
+
+
+def _send_type(message_chunk) -> Optional[str]:
+    """Returns the message type ("ai", "tool", ...) of a chunk, cached per chunk class."""
+    chunk_class = type(message_chunk)
+    if chunk_class not in _SEND_TYPES:
+        base_message = message_chunk_to_message(message_chunk)
+        _SEND_TYPES[chunk_class] = getattr(base_message, "type", None)
+    return _SEND_TYPES[chunk_class]
+
+
+def _messages_from_update(node_update) -> list:
+    """Extracts the complete messages a node returned in an `updates` stream event."""
+    if not isinstance(node_update, dict):
+        return []
+    messages = node_update.get("messages", [])
+    if isinstance(messages, BaseMessage):
+        return [messages]
+    return [m for m in messages if isinstance(m, BaseMessage)]
+
+
+# update 帧中每条消息内容的最大长度，完整内容已经通过 message 帧发送
+UPDATE_PREVIEW_CHARS = 500
+
+
+def _progress_messages(messages: list, reported: set) -> list:
+    """
+    Keeps the messages of the current turn that no earlier update frame reported.
+
+    Agents that return their whole message list (such as the LLM supervisor's
+    inner nodes) would otherwise resend the conversation history in every frame.
+    """
+    last_human = max(
+        (i for i, message in enumerate(messages) if message.type == "human"),
+        default=-1,
+    )
+    progress = []
+    for message in messages[last_human + 1 :]:
+        if message.id:
+            if message.id in reported:
+                continue
+            reported.add(message.id)
+        progress.append(message)
+    return progress
+
+
+def _update_frame(
+    session_id: str, agent: str, node: str, node_update, messages: list
+) -> str:
+    """Encodes a node's `updates` stream event as a progress frame for the client."""
+    state = (
+        {
+            key: value
+            for key, value in node_update.items()
+            if key != "messages" and isinstance(value, (str, int, float, bool))
+        }
+        if isinstance(node_update, dict)
+        else {}
+    )
+    return sse_frame(
+        {
+            "session_id": session_id,
+            "type": "update",
+            "agent": agent,
+            "node": node,
+            "messages": [
+                {
+                    "type": message.type,
+                    "name": message.name,
+                    "content": (
+                        message.content[:UPDATE_PREVIEW_CHARS]
+                        if isinstance(message.content, str)
+                        else message.content
+                    ),
+                    "tool_calls": [
+                        call["name"] for call in getattr(message, "tool_calls", [])
+                    ],
+                }
+                for message in messages
+            ],
+            "state": state,
+        }
+    )
 
 
 @app.get("/api/chat/history/{session_id}")
-async def get_chat_history(session_id: str):
+async def get_chat_history(
+    session_id: str,
+    request: Request,
+    after_seq: Optional[int] = Query(None, ge=0),
+    before_seq: Optional[int] = Query(None, ge=1),
+    limit: int = Query(50, ge=1, le=500),
+):
     """
-    Retrieves the chat history for a given session ID using LangGraph的记忆功能.
+    Retrieves the chat history for a given session ID.
+
+    Messages are read from the server-owned message store by sequence number.
+    Without `after_seq` the latest `limit` messages are returned and `has_more`
+    tells whether older ones exist, which clients page back through by passing
+    the first `seq` they hold as `before_seq`. Clients pass the last `seq` they
+    hold as `after_seq` to fetch only new messages. Sessions recorded before the
+    message store existed are imported from their latest LangGraph checkpoint on
+    first access.
     """
-    checkpoint_url = os.getenv("MONGODB_URI")
+    # 生成中的会话已由本轮对话导入，此时的 checkpoint 已包含本轮的用户消息
+    if not run_manager.has_active_run(session_id):
+        await _backfill_history(session_id, request.app.state.checkpointer)
+    page = await message_store.get_messages(session_id, after_seq, limit, before_seq)
+    return {"session_id": session_id, **page}
+
 
+async def _backfill_history(session_id: str, checkpointer) -> None:
+    """Imports a pre-message-store session from its checkpoint, at most once."""
     try:
-        async with AsyncMongoDBSaver.from_conn_string(checkpoint_url) as checkpointer:
-            # 使用会话ID从LangGraph的checkpointer中获取历史记录
-            config = {"configurable": {"thread_id": session_id}}
-            messages = await checkpointer.aget_tuple(config)
-            history = messages.checkpoint.get("channel_values", {}).get("messages", [])
-            return {"session_id": session_id, "history": history}
+        await message_store.backfill_from_checkpoint(session_id, checkpointer)
     except Exception as e:
-        return {"session_id": session_id, "history": [], "error": str(e)}
+        print(f"❌ 导入会话 {session_id} 的聊天记录失败: {e}")
 
 
 # User API
 
-from src.db.user_model import UserModel
+from src.db.async_user_model import AsyncUserModel
 
-user_model = UserModel()
+user_model = AsyncUserModel()
 
 
 class AddSessionRequest(BaseModel):
@@ -133,6 +513,7 @@ class AddSessionRequest(BaseModel):
 
     session_id: str
     user_id: str
+    agent_id: Optional[str] = None
 
 
 @app.post("/api/users/sessions/create")
@@ -147,7 +528,9 @@ async def add_session_to_user(request: AddSessionRequest):
         操作结果
     """
 
-    success = user_model.add_session_to_user(request.user_id, request.session_id)
+    success = await user_model.add_session_to_user(
+        request.user_id, request.session_id, request.agent_id
+    )
 
     if success:
         return {"success": True, "message": "会话添加成功"}
@@ -156,18 +539,28 @@ async def add_session_to_user(request: AddSessionRequest):
 
 
 @app.get("/api/users/sessions/{user_id}")
-async def get_user_sessions(user_id: str):
+async def get_user_sessions(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    agent_id: Optional[str] = None,
+):
     """
-    获取用户的所有会话ID
+    分页获取用户的会话，按创建时间倒序
 
     Args:
         user_id: 用户ID
+        limit: 每页数量
+        cursor: 上一页返回的 next_cursor（可选）
+        agent_id: 只返回该智能体下的会话（可选）
 
     Returns:
-        包含用户会话ID的列表
+        包含会话列表和下一页游标的字典
     """
-    sessions = user_model.get_user_sessions(user_id)
-    return {"sessions": sessions}
+    try:
+        return await user_model.list_user_sessions(user_id, limit, cursor, agent_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 def main():
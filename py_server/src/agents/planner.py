@@ -1,12 +1,26 @@
+from typing import Optional
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.prebuilt import create_react_agent
+from src.graph.registry import graph_registry
 from src.modals import chat_modal
-from src.tools import search
+from src.tools import knowledge_search, search
+from src.tools.runtime import managed_tools
 from src.prompts.apply import apply_prompt_template
 
 
-planner = create_react_agent(
-    model=chat_modal,
-    tools=[search],
-    prompt=apply_prompt_template("planner"),
-    name="planner",
-)
+def build_planner(checkpointer: Optional[BaseCheckpointSaver] = None):
+    return create_react_agent(
+        model=chat_modal,
+        tools=managed_tools([search, knowledge_search]),
+        prompt=apply_prompt_template("planner"),
+        name="planner",
+        checkpointer=checkpointer,
+    )
+
+
+def __getattr__(name: str):
+    # `planner` is compiled on first access instead of at import time.
+    if name == "planner":
+        return graph_registry.get("planner")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,28 +1,43 @@
 import uuid
+from typing import Optional
 
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph.state import CompiledStateGraph
 
 
-def run_agent(agent: CompiledStateGraph, message: str):
-    result = agent.stream(
-        {"messages": [{"role": "user", "content": message}]},
-        stream_mode="values",
-        config={"thread_id": uuid.uuid4()},
-    )
-    for chunk in result:
+def _stream(agent: CompiledStateGraph, message: str, thread_id: Optional[str]):
+    """
+    Streams the agent's state values for one message.
+
+    Without a thread_id the call is one-off: it runs on a fresh thread that is
+    deleted from the agent's checkpointer afterwards instead of being kept forever.
+    """
+    one_off = thread_id is None
+    config = {"configurable": {"thread_id": thread_id or str(uuid.uuid4())}}
+    try:
+        yield from agent.stream(
+            {"messages": [{"role": "user", "content": message}]},
+            stream_mode="values",
+            config=config,
+        )
+    finally:
+        # `checkpointer` may also be a bool on graphs meant to run as subgraphs
+        if one_off and isinstance(agent.checkpointer, BaseCheckpointSaver):
+            agent.checkpointer.delete_thread(config["configurable"]["thread_id"])
+
+
+def run_agent(agent: CompiledStateGraph, message: str, thread_id: Optional[str] = None):
+    for chunk in _stream(agent, message, thread_id):
         messages = chunk["messages"]
         last_message = messages[-1]
         last_message.pretty_print()
 
 
-def run_agent_api(agent: CompiledStateGraph, message: str):
-    result = agent.stream(
-        {"messages": [{"role": "user", "content": message}]},
-        stream_mode="values",
-        config={"thread_id": uuid.uuid4()},
-    )
+def run_agent_api(
+    agent: CompiledStateGraph, message: str, thread_id: Optional[str] = None
+):
     message_list = []
-    for chunk in result:
+    for chunk in _stream(agent, message, thread_id):
         messages = chunk["messages"]
         last_message = messages[-1]
         print(last_message)
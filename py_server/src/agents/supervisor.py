@@ -1,12 +1,29 @@
-from typing import TypedDict,Sequence
+import time
+from typing import Optional, Sequence, TypedDict
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import merge_configs
 from langgraph.graph.message import AnyMessage,add_messages
+from langgraph.types import Command
 from pydantic import Field
-from typing_extensions import Annotated
-from langgraph.graph import StateGraph, state
+from typing_extensions import Annotated, NotRequired
+from langgraph.graph import START, StateGraph
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph_supervisor import create_supervisor
 
-from src.agents.planner import planner
-from src.agents.researcher import researcher
+from src.graph.registry import graph_registry
+from src.graph.router import (
+    DIRECT_REPLIES,
+    ROUTE_DIRECT,
+    ROUTE_PLANNER,
+    ROUTE_RESEARCHER,
+    ROUTE_SUPERVISOR,
+    RouteDecision,
+    SupervisorHopTimer,
+    classify,
+    count_handoffs,
+    router_metrics,
+)
 from src.modals import chat_modal
 from src.prompts.apply import apply_prompt_template
 
@@ -16,11 +33,89 @@ class State(TypedDict):
     todos: Annotated[list, Field(description="The list of todos")]
     messages: Annotated[Sequence[AnyMessage], add_messages]
     remaining_steps: int
+    # 本轮快速路由的结果，由 router 节点写入
+    route: NotRequired[str]
+    route_reason: NotRequired[str]
 
 
-supervisor = create_supervisor(
-    [planner, researcher],
-    state_schema=State,
-    model=chat_modal,
-    prompt=apply_prompt_template("supervisor"),
-).compile()
+def build_llm_supervisor():
+    """由 LLM 决定交给哪个子智能体的原始 supervisor（不单独持久化）"""
+    agents = [graph_registry.get("planner"), graph_registry.get("researcher")]
+    return create_supervisor(
+        agents,
+        state_schema=State,
+        model=chat_modal,
+        prompt=apply_prompt_template("supervisor"),
+    ).compile(name="supervisor")
+
+
+def build_supervisor(checkpointer: Optional[BaseCheckpointSaver] = None):
+    """
+    在 LLM supervisor 前加一层规则快速路由：
+    寒暄直接回复，明确的检索/规划请求直接交给 researcher/planner，
+    其余（不确定的）才交给 LLM supervisor。
+
+    子智能体不单独持久化，由外层图的 checkpointer 统一保存。
+    """
+    llm_supervisor = build_llm_supervisor()
+    hop_timer = SupervisorHopTimer()
+
+    def router(state: State) -> Command:
+        decision = classify(state["messages"])
+        return Command(
+            goto=decision.route,
+            update={"route": decision.route, "route_reason": decision.reason},
+        )
+
+    def _decision(state: State) -> RouteDecision:
+        return RouteDecision(
+            state.get("route", ROUTE_SUPERVISOR), state.get("route_reason", "")
+        )
+
+    async def direct(state: State):
+        router_metrics.record_turn(_decision(state), 0, 0.0)
+        reply = DIRECT_REPLIES[state["route_reason"]]
+        return {"messages": [AIMessage(content=reply, name="supervisor")]}
+
+    async def run_graph(graph, state: State, config: RunnableConfig, handoffs: int):
+        started = time.perf_counter()
+        before = len(state["messages"])
+        result = await graph.ainvoke({"messages": state["messages"]}, config)
+        added = result["messages"][before:]
+        router_metrics.record_turn(
+            _decision(state),
+            handoffs + count_handoffs(added),
+            time.perf_counter() - started,
+        )
+        return {"messages": added}
+
+    async def planner(state: State, config: RunnableConfig):
+        return await run_graph(graph_registry.get("planner"), state, config, 1)
+
+    async def researcher(state: State, config: RunnableConfig):
+        return await run_graph(graph_registry.get("researcher"), state, config, 1)
+
+    async def supervisor(state: State, config: RunnableConfig):
+        config = merge_configs(config, {"callbacks": [hop_timer]})
+        return await run_graph(llm_supervisor, state, config, 0)
+
+    builder = StateGraph(State)
+    builder.add_node(
+        "router",
+        router,
+        destinations=(ROUTE_DIRECT, ROUTE_PLANNER, ROUTE_RESEARCHER, ROUTE_SUPERVISOR),
+    )
+    builder.add_node(ROUTE_DIRECT, direct)
+    builder.add_node(ROUTE_PLANNER, planner)
+    builder.add_node(ROUTE_RESEARCHER, researcher)
+    builder.add_node(ROUTE_SUPERVISOR, supervisor)
+    builder.add_edge(START, "router")
+    return builder.compile(checkpointer=checkpointer, name="supervisor")
+
+
+def __getattr__(name: str):
+    # `supervisor` is compiled on first access (e.g. by langgraph.json) instead of
+    # at import time.
+    if name == "supervisor":
+        return graph_registry.get("supervisor")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,15 +1,11 @@
 import os
 from dotenv import load_dotenv
-from cozepy import COZE_CN_BASE_URL, Coze, JWTAuth, JWTOAuthApp, TokenAuth
 
-load_dotenv()
+from src.utils.lazy import Lazy
 
+load_dotenv()
 
-# The default access is api.coze.cn, but if you need to access api.coze.com,
-# please use base_url to configure the api endpoint to access
-coze_api_base = COZE_CN_BASE_URL
 
-jwt_oauth_private_key = ""
 # client ID
 jwt_oauth_client_id = os.getenv("COZE_JWT_OAUTH_CLIENT_ID")
 # path to the private key file (usually with .pem extension)
@@ -17,47 +13,132 @@ jwt_oauth_private_key_file_path = os.getenv("COZE_JWT_OAUTH_PRIVATE_KEY_FILE_PAT
 # public key id
 jwt_oauth_public_key_id = os.getenv("COZE_JWT_OAUTH_PUBLIC_KEY_ID")
 
-if jwt_oauth_private_key_file_path and jwt_oauth_private_key_file_path.strip():
+
+def _load_private_key() -> str:
+    """读取 JWT 私钥文件，失败时返回空字符串"""
+    if not (jwt_oauth_private_key_file_path and jwt_oauth_private_key_file_path.strip()):
+        return ""
     # 验证路径是否存在且是一个文件
-    if os.path.isfile(jwt_oauth_private_key_file_path):
-        try:
-            with open(jwt_oauth_private_key_file_path, "r") as f:
-                jwt_oauth_private_key = f.read()
-            print(f"✅ 成功加载私钥文件: {jwt_oauth_private_key_file_path}")
-        except (IOError, OSError) as e:
-            print(f"❌ 读取私钥文件失败: {e}")
-            jwt_oauth_private_key = ""
-    else:
+    if not os.path.isfile(jwt_oauth_private_key_file_path):
         print(f"⚠️  私钥文件不存在或不是有效文件: {jwt_oauth_private_key_file_path}")
-        jwt_oauth_private_key = ""
+        return ""
+    try:
+        with open(jwt_oauth_private_key_file_path, "r") as f:
+            private_key = f.read()
+        print(f"✅ 成功加载私钥文件: {jwt_oauth_private_key_file_path}")
+        return private_key
+    except (IOError, OSError) as e:
+        print(f"❌ 读取私钥文件失败: {e}")
+        return ""
+
+
+def _check_credentials(private_key: str):
+    # 验证必要参数是否存在
+    if not private_key:
+        print("❌ 警告: 未提供有效的JWT私钥，Coze客户端可能无法正常工作")
+
+    if not jwt_oauth_client_id:
+        print("❌ 警告: 未提供COZE_JWT_OAUTH_CLIENT_ID")
+
+    if not jwt_oauth_public_key_id:
+        print("❌ 警告: 未提供COZE_JWT_OAUTH_PUBLIC_KEY_ID")
+
+
+def _create_token_manager():
+    """
+    创建同步和异步客户端共用的访问令牌管理器
+
+    令牌由它缓存并在到期前后台刷新，请求路径上不再签名 JWT、请求 OAuth 接口。
+    """
+    from cozepy import COZE_CN_BASE_URL, JWTOAuthApp
+
+    from .token import AccessToken, CozeTokenManager
+
+    jwt_oauth_private_key = _load_private_key()
+    _check_credentials(jwt_oauth_private_key)
+
+    # The sdk offers the JWTOAuthApp class to establish an authorization for Service OAuth.
+    # Firstly, it is required to initialize the JWTOAuthApp.
+    jwt_oauth_app = JWTOAuthApp(
+        client_id=jwt_oauth_client_id,
+        private_key=jwt_oauth_private_key,
+        public_key_id=jwt_oauth_public_key_id,
+        base_url=COZE_CN_BASE_URL,
+    )
+
+    def mint(ttl: int) -> AccessToken:
+        token = jwt_oauth_app.get_access_token(ttl)
+        # OAuthToken.expires_in 是过期时刻的时间戳
+        return AccessToken(token.access_token, token.expires_in)
+
+    return CozeTokenManager(mint, key=jwt_oauth_client_id or "default")
+
+
+token_manager = Lazy(_create_token_manager)
+
+
+def _create_coze():
+    """
+    创建 Coze 客户端
+
+    cozepy 的导入和私钥读取都推迟到第一次使用时，导入本模块不再有这部分开销。
+    """
+    from cozepy import COZE_CN_BASE_URL, Coze
+
+    from .token import ManagedJWTAuth
+
+    # The default access is api.coze.cn, but if you need to access api.coze.com,
+    # please use base_url to configure the api endpoint to access
+    coze_api_base = COZE_CN_BASE_URL
+
+    try:
+        coze = Coze(auth=ManagedJWTAuth(token_manager.get()), base_url=coze_api_base)
+        print("✅ Coze客户端初始化成功")
+        return coze
+    except Exception as e:
+        print(f"❌ Coze客户端初始化失败: {e}")
+        return None
+
+
+def _create_async_coze():
+    """创建异步 Coze 客户端，供 FastAPI 路由在事件循环中直接调用"""
+    from cozepy import COZE_CN_BASE_URL, AsyncCoze
+
+    from .token import AsyncManagedJWTAuth
+
+    try:
+        coze = AsyncCoze(
+            auth=AsyncManagedJWTAuth(token_manager.get()), base_url=COZE_CN_BASE_URL
+        )
+        print("✅ 异步Coze客户端初始化成功")
+        return coze
+    except Exception as e:
+        print(f"❌ 异步Coze客户端初始化失败: {e}")
+        return None
+
+
+coze_client = Lazy(_create_coze)
+
+
+def get_coze():
+    """返回共享的 Coze 客户端（首次调用时创建），初始化失败时返回 None"""
+    return coze_client.get()
 
 
-# 验证必要参数是否存在
-if not jwt_oauth_private_key:
-    print("❌ 警告: 未提供有效的JWT私钥，Coze客户端可能无法正常工作")
+async_coze_client = Lazy(_create_async_coze)
 
-if not jwt_oauth_client_id:
-    print("❌ 警告: 未提供COZE_JWT_OAUTH_CLIENT_ID")
 
-if not jwt_oauth_public_key_id:
-    print("❌ 警告: 未提供COZE_JWT_OAUTH_PUBLIC_KEY_ID")
+def get_async_coze():
+    """返回共享的异步 Coze 客户端（首次调用时创建），初始化失败时返回 None"""
+    return async_coze_client.get()
 
-# The sdk offers the JWTOAuthApp class to establish an authorization for Service OAuth.
-# Firstly, it is required to initialize the JWTOAuthApp.
 
-jwt_oauth_app = JWTOAuthApp(
-    client_id=jwt_oauth_client_id,
-    private_key=jwt_oauth_private_key,
-    public_key_id=jwt_oauth_public_key_id,
-    base_url=coze_api_base,
-)
+def __getattr__(name: str):
+    # 兼容 `from src.coze.app import coze`
+    if name == "coze":
+        return get_coze()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-try:
-    coze = Coze(auth=JWTAuth(oauth_app=jwt_oauth_app), base_url=coze_api_base)
-    print("✅ Coze客户端初始化成功")
-except Exception as e:
-    print(f"❌ Coze客户端初始化失败: {e}")
-    coze = None
 
 if __name__ == "__main__":
-    print(coze.workspaces.list().items)
+    print(get_coze().workspaces.list().items)
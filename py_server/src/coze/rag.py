@@ -1,21 +1,59 @@
-from .app import coze
+import os
+from typing import Dict, List
 
+from src.utils.swr import SWRCache
 
-def list_datasets():
+from .app import get_async_coze, get_coze
+
+# 知识库所在的 Coze 空间
+COZE_SPACE_ID = os.getenv("COZE_SPACE_ID", "7532480716039438379")
+# 数据集列表的缓存时间；过期后 COZE_DATASETS_STALE_SECONDS 内仍先返回旧值并在后台刷新
+COZE_DATASETS_TTL_SECONDS = float(os.getenv("COZE_DATASETS_TTL_SECONDS", "60"))
+COZE_DATASETS_STALE_SECONDS = float(os.getenv("COZE_DATASETS_STALE_SECONDS", "600"))
+
+datasets_cache: SWRCache[List[Dict]] = SWRCache(
+    ttl=COZE_DATASETS_TTL_SECONDS, stale_ttl=COZE_DATASETS_STALE_SECONDS
+)
+
+
+def list_datasets(space_id: str = COZE_SPACE_ID):
     """List all datasets."""
+    coze = get_coze()
     if coze is None:
         print("❌ Coze客户端未初始化，无法获取数据集列表")
         return []
-        
+
     try:
-        return coze.datasets.list(space_id="7532480716039438379").items
+        return coze.datasets.list(space_id=space_id).items
     except Exception as e:
         print(f"❌ 获取数据集列表失败: {e}")
         return []
 
+
+async def alist_datasets(space_id: str = COZE_SPACE_ID) -> List[Dict]:
+    """
+    异步获取数据集列表（已转换为字典）
+
+    结果按空间缓存，并发请求共享同一次刷新；Coze 不可用时返回空列表，不写入缓存。
+    """
+
+    async def load() -> List[Dict]:
+        coze = get_async_coze()
+        if coze is None:
+            raise RuntimeError("Coze客户端未初始化")
+        datasets = await coze.datasets.list(space_id=space_id)
+        return [dataset.model_dump() for dataset in datasets.items]
+
+    try:
+        return await datasets_cache.get(space_id, load)
+    except Exception as e:
+        print(f"❌ 获取数据集列表失败: {e}")
+        return []
+
+
 def get_dataset(dataset_id: str):
     """Get a dataset by ID."""
-    return coze.files.retrieve
+    return get_coze().files.retrieve
 
 
 if __name__ == "__main__":
@@ -0,0 +1,242 @@
+"""
+Coze 访问令牌管理
+
+每次换取访问令牌都要用 RSA 私钥签名 JWT 再请求一次 OAuth 接口。这里把令牌缓存在进程内：
+1. 令牌到期前 COZE_TOKEN_REFRESH_MARGIN_SECONDS 秒由后台定时器提前刷新，请求路径上只读缓存
+2. 同一时刻只有一个线程/协程去换取令牌，其余调用等待它的结果
+3. 可选（COZE_TOKEN_SHARED）：令牌写入 MongoDB 供多个 worker 共用，并用租约保证同一时刻只有一个 worker 换取
+"""
+
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from cozepy import AsyncAuth, SyncAuth
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from src.db.connection import get_sync_client
+
+# 申请的令牌有效期（Coze 允许的最大值为 86399 秒）
+COZE_TOKEN_TTL_SECONDS = int(os.getenv("COZE_TOKEN_TTL_SECONDS", "7200"))
+# 到期前多少秒开始刷新
+COZE_TOKEN_REFRESH_MARGIN_SECONDS = int(
+    os.getenv("COZE_TOKEN_REFRESH_MARGIN_SECONDS", "300")
+)
+# 是否通过 MongoDB 在多个 worker 之间共享令牌
+COZE_TOKEN_SHARED = os.getenv("COZE_TOKEN_SHARED", "false").lower() in ("1", "true")
+
+TOKENS_COLLECTION = "coze_tokens"
+# 换取令牌的租约时长，持有租约的 worker 崩溃后其他 worker 最多等待这么久
+_LEASE_SECONDS = 30
+# 后台刷新失败后的重试间隔
+_RETRY_SECONDS = 15
+
+
+@dataclass
+class AccessToken:
+    access_token: str
+    # 过期时刻（Unix 时间戳）
+    expires_at: float
+
+    def valid(self, margin: float = 0) -> bool:
+        return time.time() < self.expires_at - margin
+
+
+class CozeTokenManager:
+    """
+    缓存并提前刷新 Coze 访问令牌
+    """
+
+    def __init__(
+        self,
+        mint: Callable[[int], AccessToken],
+        key: str,
+        ttl: int = COZE_TOKEN_TTL_SECONDS,
+        refresh_margin: int = COZE_TOKEN_REFRESH_MARGIN_SECONDS,
+        shared: bool = COZE_TOKEN_SHARED,
+    ):
+        """
+        Args:
+            mint: 换取新令牌的函数，参数为有效期秒数
+            key: 令牌在共享存储中的键，通常为 OAuth client id
+            ttl: 申请的令牌有效期
+            refresh_margin: 到期前多少秒开始刷新
+            shared: 是否通过 MongoDB 在 worker 之间共享令牌
+        """
+        self.mint = mint
+        self.key = key
+        self.ttl = ttl
+        self.refresh_margin = min(refresh_margin, ttl // 2)
+        self.shared = shared
+        self._token: Optional[AccessToken] = None
+        # 保证同一时刻只有一次换取
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._timer_due = 0.0
+        self._timer_lock = threading.Lock()
+        self._mints = 0
+        self._shared_hits = 0
+        self._errors = 0
+
+    def _collection(self):
+        return get_sync_client().get_database("nan_agent_main")[TOKENS_COLLECTION]
+
+    def get(self) -> str:
+        """返回可用的访问令牌，只有在没有缓存令牌时才会阻塞换取"""
+        token = self._token
+        if token is not None and token.valid(self.refresh_margin):
+            return token.access_token
+        if token is not None and token.valid():
+            # 已进入刷新窗口但仍然有效：先返回旧令牌，后台刷新
+            self._schedule(0)
+            return token.access_token
+        return self.refresh().access_token
+
+    async def aget(self) -> str:
+        """get 的异步版本，换取令牌时不阻塞事件循环"""
+        token = self._token
+        if token is not None and token.valid():
+            return self.get()
+        return (await asyncio.to_thread(self.refresh)).access_token
+
+    def refresh(self) -> AccessToken:
+        """换取新令牌（单飞：并发调用只会有一次真正换取）"""
+        with self._lock:
+            token = self._token
+            if token is None or not token.valid(self.refresh_margin):
+                token = self._fetch()
+                self._token = token
+        self._schedule(max(0.0, token.expires_at - self.refresh_margin - time.time()))
+        return token
+
+    def _fetch(self) -> AccessToken:
+        if not self.shared:
+            return self._mint()
+        try:
+            return self._fetch_shared()
+        except PyMongoError as e:
+            print(f"⚠️  读取共享的 Coze 令牌失败，改为本地换取: {e}")
+            return self._mint()
+
+    def _fetch_shared(self) -> AccessToken:
+        """先读其他 worker 换好的令牌，没有时抢租约换取，抢不到则等待持有者写回"""
+        collection = self._collection()
+        deadline = time.time() + _LEASE_SECONDS
+        while time.time() < deadline:
+            doc = collection.find_one({"_id": self.key}) or {}
+            if doc.get("access_token"):
+                token = AccessToken(doc["access_token"], doc["expires_at"])
+                if token.valid(self.refresh_margin):
+                    self._shared_hits += 1
+                    return token
+            now = time.time()
+            try:
+                collection.update_one(
+                    {"_id": self.key, "lease_until": {"$not": {"$gt": now}}},
+                    {"$set": {"lease_until": now + _LEASE_SECONDS}},
+                    upsert=True,
+                )
+            except DuplicateKeyError:
+                # 其他 worker 持有租约；旧令牌仍有效时直接用，否则等它写回
+                if doc.get("access_token") and token.valid():
+                    return token
+                time.sleep(0.5)
+                continue
+            token = self._mint()
+            collection.update_one(
+                {"_id": self.key},
+                {
+                    "$set": {
+                        "access_token": token.access_token,
+                        "expires_at": token.expires_at,
+                        "lease_until": 0,
+                    }
+                },
+            )
+            return token
+        print("⚠️  等待共享 Coze 令牌超时，改为本地换取")
+        return self._mint()
+
+    def _mint(self) -> AccessToken:
+        try:
+            token = self.mint(self.ttl)
+        except Exception:
+            self._errors += 1
+            raise
+        self._mints += 1
+        print("✅ 已换取新的 Coze 访问令牌")
+        return token
+
+    def _schedule(self, delay: float):
+        """安排一次后台刷新，已有更早的刷新安排时忽略"""
+        due = time.time() + delay
+        with self._timer_lock:
+            if self._timer is not None:
+                if self._timer.is_alive() and self._timer_due <= due:
+                    return
+                self._timer.cancel()
+            self._timer = threading.Timer(delay, self._background_refresh)
+            self._timer.daemon = True
+            self._timer_due = due
+            self._timer.start()
+
+    def _background_refresh(self):
+        with self._timer_lock:
+            self._timer = None
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"❌ 后台刷新 Coze 令牌失败: {e}")
+            token = self._token
+            if token is not None and token.valid():
+                self._schedule(_RETRY_SECONDS)
+
+    def close(self):
+        """取消后台刷新"""
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def stats(self) -> Dict:
+        token = self._token
+        return {
+            "shared": self.shared,
+            "mints": self._mints,
+            "shared_hits": self._shared_hits,
+            "errors": self._errors,
+            "expires_in": round(token.expires_at - time.time()) if token else None,
+        }
+
+
+class ManagedJWTAuth(SyncAuth):
+    """同步 Coze 客户端的鉴权，令牌由 CozeTokenManager 提供"""
+
+    def __init__(self, manager: CozeTokenManager):
+        self.manager = manager
+
+    @property
+    def token_type(self) -> str:
+        return "Bearer"
+
+    @property
+    def token(self) -> str:
+        return self.manager.get()
+
+
+class AsyncManagedJWTAuth(AsyncAuth):
+    """异步 Coze 客户端的鉴权，与同步客户端共用同一个 CozeTokenManager"""
+
+    def __init__(self, manager: CozeTokenManager):
+        self.manager = manager
+
+    @property
+    def token_type(self) -> str:
+        return "Bearer"
+
+    @property
+    async def atoken(self) -> str:
+        return await self.manager.aget()
@@ -0,0 +1,342 @@
+"""
+异步用户模型和数据库操作模块
+与 UserModel 提供相同的方法，但基于异步 MongoDB 驱动，可在 async 路由中直接 await，不会阻塞事件循环
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pymongo import DESCENDING
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from .connection import (
+    close_async_client,
+    get_async_client,
+    indexes_ready,
+    mark_indexes_ready,
+)
+from .sessions import (
+    SESSION_INDEXES,
+    SESSION_SORT,
+    SESSIONS_COLLECTION,
+    build_sessions_query,
+    new_session_document,
+    to_session_item,
+    to_session_page,
+)
+from .user_model import USERS_INDEX_KEY
+
+
+class AsyncUserModel:
+    """
+    异步用户模型类，用于管理用户数据和会话历史
+    """
+
+    def __init__(self):
+        """初始化用户模型，复用进程共享的异步数据库客户端"""
+        self.client = get_async_client()
+        self.db = self.client.get_database("nan_agent_main")
+        self.users_collection = self.db["users"]
+        # 会话关系单独存储，避免用户文档随会话数量无限增长
+        self.sessions_collection = self.db[SESSIONS_COLLECTION]
+
+    async def ensure_indexes(self):
+        """创建必要的索引（每个进程只执行一次），建议在应用启动时调用"""
+        if indexes_ready(USERS_INDEX_KEY):
+            return
+        try:
+            # 为用户ID创建唯一索引
+            await self.users_collection.create_index("user_id", unique=True)
+            # 为创建时间创建索引，便于按时间排序
+            await self.users_collection.create_index([("created_at", DESCENDING)])
+            # 会话集合的唯一索引和分页复合索引
+            await self.sessions_collection.create_indexes(SESSION_INDEXES)
+            mark_indexes_ready(USERS_INDEX_KEY)
+            print("用户集合索引创建成功")
+        except Exception as e:
+            print(f"创建索引时出错: {e}")
+
+    async def create_user(
+        self,
+        user_id: str,
+        username: str = None,
+        email: str = None,
+        metadata: Dict = None,
+    ) -> bool:
+        """
+        创建新用户
+
+        Args:
+            user_id: 用户唯一标识符
+            username: 用户名（可选）
+            email: 用户邮箱（可选）
+            metadata: 用户元数据（可选）
+
+        Returns:
+            bool: 创建是否成功
+        """
+        try:
+            user_data = {
+                "user_id": user_id,
+                "username": username or user_id,
+                "email": email,
+                "session_count": 0,  # 会话总数，会话本身存储在 user_sessions 集合中
+                "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow(),
+                "last_active": datetime.utcnow(),
+                "metadata": metadata or {},
+            }
+
+            result = await self.users_collection.insert_one(user_data)
+            print(f"用户 '{user_id}' 创建成功，文档ID: {result.inserted_id}")
+            return True
+
+        except DuplicateKeyError:
+            print(f"用户 '{user_id}' 已存在")
+            return False
+        except PyMongoError as e:
+            print(f"创建用户时出错: {e}")
+            return False
+        except Exception as e:
+            print(f"未知错误: {e}")
+            return False
+
+    async def add_session_to_user(
+        self, user_id: str, session_id: str, agent_id: Optional[str] = None
+    ) -> bool:
+        """
+        为用户添加新的会话ID
+
+        Args:
+            user_id: 用户ID
+            session_id: 会话ID
+            agent_id: 智能体ID（可选）
+
+        Returns:
+            bool: 操作是否成功
+        """
+        try:
+            now = datetime.utcnow()
+            user_result = await self.users_collection.update_one(
+                {"user_id": user_id},
+                {"$set": {"updated_at": now, "last_active": now}},
+            )
+            if user_result.matched_count == 0:
+                print(f"用户 '{user_id}' 不存在")
+                return False
+
+            # upsert + 唯一索引避免重复添加相同的session_id
+            result = await self.sessions_collection.update_one(
+                {"user_id": user_id, "session_id": session_id},
+                {
+                    "$setOnInsert": new_session_document(
+                        user_id, session_id, agent_id, now
+                    )
+                },
+                upsert=True,
+            )
+            if result.upserted_id is not None:
+                await self.users_collection.update_one(
+                    {"user_id": user_id}, {"$inc": {"session_count": 1}}
+                )
+
+            print(f"为用户 '{user_id}' 添加会话ID '{session_id}' 成功")
+            return True
+
+        except PyMongoError as e:
+            print(f"添加会话ID时出错: {e}")
+            return False
+        except Exception as e:
+            print(f"未知错误: {e}")
+            return False
+
+    async def get_user_sessions(
+        self, user_id: str, limit: int = None, agent_id: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        获取用户最近的会话，按创建时间倒序
+
+        Args:
+            user_id: 用户ID
+            limit: 返回的会话数量限制（可选）
+            agent_id: 只返回该智能体下的会话（可选）
+
+        Returns:
+            List[Dict]: 会话列表，每项包含 id、agent_id、created_at
+        """
+        try:
+            cursor = self.sessions_collection.find(
+                build_sessions_query(user_id, agent_id)
+            ).sort(SESSION_SORT)
+            if limit:
+                cursor = cursor.limit(limit)
+            return [to_session_item(doc) async for doc in cursor]
+
+        except PyMongoError as e:
+            print(f"查询用户会话时出错: {e}")
+            return []
+        except Exception as e:
+            print(f"未知错误: {e}")
+            return []
+
+    async def list_user_sessions(
+        self,
+        user_id: str,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        agent_id: Optional[str] = None,
+    ) -> Dict:
+        """
+        基于游标分页获取用户的会话，按创建时间倒序
+
+        Args:
+            user_id: 用户ID
+            limit: 每页数量
+            cursor: 上一页返回的 next_cursor（可选）
+            agent_id: 只返回该智能体下的会话（可选）
+
+        Returns:
+            Dict: {"sessions": [...], "next_cursor": str | None}
+
+        Raises:
+            ValueError: 游标格式不正确
+        """
+        query = build_sessions_query(user_id, agent_id, cursor)
+        try:
+            results = (
+                self.sessions_collection.find(query).sort(SESSION_SORT).limit(limit + 1)
+            )
+            return to_session_page([doc async for doc in results], limit)
+
+        except PyMongoError as e:
+            print(f"查询用户会话时出错: {e}")
+            return {"sessions": [], "next_cursor": None}
+
+    async def get_user_info(self, user_id: str) -> Optional[Dict]:
+        """
+        获取用户的完整信息
+
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            Optional[Dict]: 用户信息字典，如果不存在则返回None
+        """
+        try:
+            user = await self.users_collection.find_one({"user_id": user_id})
+            if user:
+                # 转换ObjectId为字符串，便于JSON序列化
+                user["_id"] = str(user["_id"])
+                return user
+            else:
+                return None
+
+        except PyMongoError as e:
+            print(f"查询用户信息时出错: {e}")
+            return None
+        except Exception as e:
+            print(f"未知错误: {e}")
+            return None
+
+    async def update_user_metadata(self, user_id: str, metadata: Dict) -> bool:
+        """
+        更新用户的元数据
+
+        Args:
+            user_id: 用户ID
+            metadata: 要更新的元数据
+
+        Returns:
+            bool: 更新是否成功
+        """
+        try:
+            result = await self.users_collection.update_one(
+                {"user_id": user_id},
+                {"$set": {"metadata": metadata, "updated_at": datetime.utcnow()}},
+            )
+
+            if result.modified_count > 0:
+                print(f"用户 '{user_id}' 元数据更新成功")
+                return True
+            else:
+                print(f"用户 '{user_id}' 不存在")
+                return False
+
+        except PyMongoError as e:
+            print(f"更新用户元数据时出错: {e}")
+            return False
+        except Exception as e:
+            print(f"未知错误: {e}")
+            return False
+
+    async def get_active_users(self, days: int = 30, limit: int = 10) -> List[Dict]:
+        """
+        获取最近活跃的用户列表
+
+        Args:
+            days: 活跃天数范围（默认30天）
+            limit: 返回的用户数量限制
+
+        Returns:
+            List[Dict]: 活跃用户列表
+        """
+        try:
+            cutoff_date = datetime.utcnow() - timedelta(days=days)
+
+            users = (
+                self.users_collection.find(
+                    {"last_active": {"$gte": cutoff_date}},
+                    {"user_id": 1, "username": 1, "last_active": 1, "session_count": 1},
+                )
+                .sort("last_active", DESCENDING)
+                .limit(limit)
+            )
+
+            result = []
+            async for user in users:
+                user["_id"] = str(user["_id"])
+                result.append(user)
+
+            return result
+
+        except PyMongoError as e:
+            print(f"查询活跃用户时出错: {e}")
+            return []
+        except Exception as e:
+            print(f"未知错误: {e}")
+            return []
+
+    async def delete_user(self, user_id: str) -> bool:
+        """
+        删除用户（谨慎使用）
+
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            bool: 删除是否成功
+        """
+        try:
+            result = await self.users_collection.delete_one({"user_id": user_id})
+            await self.sessions_collection.delete_many({"user_id": user_id})
+
+            if result.deleted_count > 0:
+                print(f"用户 '{user_id}' 删除成功")
+                return True
+            else:
+                print(f"用户 '{user_id}' 不存在")
+                return False
+
+        except PyMongoError as e:
+            print(f"删除用户时出错: {e}")
+            return False
+        except Exception as e:
+            print(f"未知错误: {e}")
+            return False
+
+    async def close_connection(self):
+        """关闭进程共享的异步数据库连接，仅应在应用退出时调用"""
+        try:
+            await close_async_client()
+        except Exception as e:
+            print(f"关闭连接时出错: {e}")
@@ -0,0 +1,49 @@
+"""
+LangGraph checkpointer 连接管理
+在应用生命周期内共享一个带连接池的 AsyncMongoDBSaver，避免每个请求都重新建立连接
+"""
+
+import os
+from typing import Dict
+
+from langgraph.checkpoint.mongodb.aio import AsyncMongoDBSaver
+from pymongo.errors import PyMongoError
+
+from .connection import MONGODB_MAX_POOL_SIZE, get_async_client
+
+CHECKPOINT_DB_NAME = os.getenv("CHECKPOINT_DB_NAME", "checkpointing_db")
+
+
+async def create_checkpointer() -> AsyncMongoDBSaver:
+    """
+    创建应用级共享的 checkpointer，应在 FastAPI lifespan 中调用
+
+    连接和索引检查只在启动时进行一次，之后所有请求复用共享的异步客户端连接池。
+    连接的关闭由 connection.close_clients 统一负责。
+
+    Returns:
+        AsyncMongoDBSaver: 共享的 checkpointer 实例
+    """
+    client = get_async_client()
+    await client.admin.command("ping")
+    checkpointer = AsyncMongoDBSaver(client, db_name=CHECKPOINT_DB_NAME)
+    await checkpointer._setup()
+    print(f"✅ Checkpointer 连接池已建立 (maxPoolSize={MONGODB_MAX_POOL_SIZE})")
+    return checkpointer
+
+
+async def check_checkpointer_health(checkpointer: AsyncMongoDBSaver) -> Dict:
+    """
+    检查 checkpointer 的数据库连接状态
+
+    Args:
+        checkpointer: 共享的 checkpointer 实例
+
+    Returns:
+        Dict: 包含健康状态的字典
+    """
+    try:
+        await checkpointer.client.admin.command("ping")
+        return {"status": "ok", "max_pool_size": MONGODB_MAX_POOL_SIZE}
+    except PyMongoError as e:
+        return {"status": "error", "error": str(e)}
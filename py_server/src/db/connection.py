@@ -0,0 +1,118 @@
+"""
+MongoDB 连接注册表
+整个 py_server 进程共享同一个同步客户端和同一个异步客户端，统一管理连接池配置和生命周期
+"""
+
+import os
+from threading import Lock
+from typing import Optional, Set
+
+from dotenv import load_dotenv
+from pymongo import AsyncMongoClient, MongoClient
+
+load_dotenv()
+
+# 获取MongoDB连接URI
+MONGODB_URI = os.getenv("MONGODB_URI")
+
+# 连接池配置，均可通过环境变量覆盖
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "50"))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+MONGODB_MAX_IDLE_TIME_MS = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000"))
+MONGODB_CONNECT_TIMEOUT_MS = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "5000"))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(
+    os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000")
+)
+MONGODB_HEARTBEAT_FREQUENCY_MS = int(
+    os.getenv("MONGODB_HEARTBEAT_FREQUENCY_MS", "10000")
+)
+
+_sync_client: Optional[MongoClient] = None
+_async_client: Optional[AsyncMongoClient] = None
+_clients_lock = Lock()
+
+# 已完成索引创建的集合，避免每次构造模型时重复创建
+_indexed_collections: Set[str] = set()
+
+
+def _client_options() -> dict:
+    """同步和异步客户端共用的连接池配置"""
+    return {
+        "maxPoolSize": MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": MONGODB_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGODB_MAX_IDLE_TIME_MS,
+        "connectTimeoutMS": MONGODB_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        "heartbeatFrequencyMS": MONGODB_HEARTBEAT_FREQUENCY_MS,
+    }
+
+
+def get_sync_client() -> MongoClient:
+    """
+    获取进程共享的同步MongoDB客户端，首次调用时创建
+
+    Returns:
+        MongoClient: 共享的同步客户端
+    """
+    global _sync_client
+    if _sync_client is None:
+        with _clients_lock:
+            if _sync_client is None:
+                _sync_client = MongoClient(MONGODB_URI, **_client_options())
+    return _sync_client
+
+
+def get_async_client() -> AsyncMongoClient:
+    """
+    获取进程共享的异步MongoDB客户端，首次调用时创建
+
+    Returns:
+        AsyncMongoClient: 共享的异步客户端
+    """
+    global _async_client
+    if _async_client is None:
+        with _clients_lock:
+            if _async_client is None:
+                _async_client = AsyncMongoClient(MONGODB_URI, **_client_options())
+    return _async_client
+
+
+def indexes_ready(name: str) -> bool:
+    """
+    判断某个集合的索引是否已在本进程中创建过
+
+    Args:
+        name: 集合标识，如 "nan_agent_main.users"
+    """
+    return name in _indexed_collections
+
+
+def mark_indexes_ready(name: str):
+    """记录某个集合的索引已创建完成"""
+    _indexed_collections.add(name)
+
+
+def close_sync_client():
+    """关闭共享的同步客户端（可重复调用）"""
+    global _sync_client
+    with _clients_lock:
+        client, _sync_client = _sync_client, None
+    if client is not None:
+        client.close()
+        print("同步数据库连接已关闭")
+
+
+async def close_async_client():
+    """关闭共享的异步客户端（可重复调用）"""
+    global _async_client
+    with _clients_lock:
+        client, _async_client = _async_client, None
+    if client is not None:
+        await client.close()
+        print("异步数据库连接已关闭")
+
+
+async def close_clients():
+    """关闭所有共享客户端，应在应用关闭时调用"""
+    close_sync_client()
+    await close_async_client()
@@ -0,0 +1,218 @@
+"""
+聊天记录存储模块
+服务端自行保存聊天记录（每条消息一个文档，带会话内单调递增的序号），
+客户端可以按序号增量拉取，不再需要读取整个 LangGraph checkpoint
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from .connection import get_async_client, indexes_ready, mark_indexes_ready
+
+MESSAGES_COLLECTION = "chat_messages"
+COUNTERS_COLLECTION = "chat_message_counters"
+MESSAGES_INDEX_KEY = "nan_agent_main.chat_messages"
+
+
+def _message_to_document(session_id: str, seq: int, message: BaseMessage) -> Dict:
+    """将 LangChain 消息转换为存储文档"""
+    return {
+        "session_id": session_id,
+        "seq": seq,
+        "message_id": message.id,
+        "type": message.type,
+        "content": message.content,
+        "name": getattr(message, "name", None),
+        "created_at": datetime.utcnow(),
+    }
+
+
+def _document_to_item(doc: Dict) -> Dict:
+    """存储文档转换为接口返回格式"""
+    return {
+        "id": doc.get("message_id") or f"{doc['session_id']}:{doc['seq']}",
+        "seq": doc["seq"],
+        "type": doc["type"],
+        "content": doc["content"],
+        "name": doc.get("name"),
+        "timestamp": doc["created_at"].isoformat() + "Z",
+    }
+
+
+class MessageStore:
+    """
+    按会话追加和读取聊天记录
+    """
+
+    def __init__(self):
+        """复用进程共享的异步数据库客户端"""
+        self.db = get_async_client().get_database("nan_agent_main")
+        self.messages_collection = self.db[MESSAGES_COLLECTION]
+        self.counters_collection = self.db[COUNTERS_COLLECTION]
+
+    async def ensure_indexes(self):
+        """创建必要的索引（每个进程只执行一次），建议在应用启动时调用"""
+        if indexes_ready(MESSAGES_INDEX_KEY):
+            return
+        try:
+            await self.messages_collection.create_indexes(
+                [
+                    IndexModel(
+                        [("session_id", ASCENDING), ("seq", ASCENDING)], unique=True
+                    )
+                ]
+            )
+            mark_indexes_ready(MESSAGES_INDEX_KEY)
+            print("聊天记录集合索引创建成功")
+        except Exception as e:
+            print(f"创建索引时出错: {e}")
+
+    async def _reserve_seqs(self, session_id: str, count: int) -> int:
+        """
+        原子地为会话预留 count 个连续序号
+
+        Returns:
+            int: 预留区间的第一个序号（序号从 1 开始）
+        """
+        counter = await self.counters_collection.find_one_and_update(
+            {"_id": session_id},
+            {"$inc": {"seq": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return counter["seq"] - count + 1
+
+    async def append_messages(
+        self, session_id: str, messages: Sequence[BaseMessage]
+    ) -> List[int]:
+        """
+        追加一组消息到会话末尾
+
+        Args:
+            session_id: 会话ID
+            messages: 要追加的消息，按时间顺序
+
+        Returns:
+            List[int]: 分配给各条消息的序号，失败时返回空列表
+        """
+        if not messages:
+            return []
+        try:
+            first_seq = await self._reserve_seqs(session_id, len(messages))
+            docs = [
+                _message_to_document(session_id, first_seq + offset, message)
+                for offset, message in enumerate(messages)
+            ]
+            await self.messages_collection.insert_many(docs, ordered=True)
+            return [doc["seq"] for doc in docs]
+        except PyMongoError as e:
+            print(f"保存聊天记录时出错: {e}")
+            return []
+
+    async def backfill_from_checkpoint(self, session_id: str, checkpointer: Any) -> int:
+        """
+        将消息存储上线前的会话从最新的 LangGraph checkpoint 导入聊天记录
+
+        应在读取聊天记录之前、以及本轮对话写入 checkpoint 之前调用；正在生成回复的会话
+        不要导入，否则 checkpoint 中本轮的用户消息会与本轮结束时的追加重复。会话已有
+        计数器（已导入或已有新记录）时直接返回。
+
+        先写入消息再写入计数器：写入消息失败时计数器不存在，下次访问会重新导入；
+        并发导入写入的是相同的序号，重复的消息由唯一索引忽略。
+
+        Args:
+            session_id: 会话ID
+            checkpointer: 与 /api/chat 共用的 checkpointer
+
+        Returns:
+            int: 本次写入的消息数量
+        """
+        if await self.count_messages(session_id) is not None:
+            return 0
+        config = {"configurable": {"thread_id": session_id}}
+        checkpoint_tuple = await checkpointer.aget_tuple(config)
+        if checkpoint_tuple is None:
+            return 0
+        messages = checkpoint_tuple.checkpoint.get("channel_values", {}).get(
+            "messages", []
+        )
+        if not messages:
+            return 0
+        docs = [
+            _message_to_document(session_id, seq, message)
+            for seq, message in enumerate(messages, start=1)
+        ]
+        try:
+            result = await self.messages_collection.insert_many(docs, ordered=False)
+            inserted = len(result.inserted_ids)
+        except BulkWriteError as e:
+            if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                raise
+            inserted = e.details["nInserted"]
+        # 序号 1..n 属于导入的消息，之后的追加从 n+1 开始
+        await self.counters_collection.update_one(
+            {"_id": session_id}, {"$max": {"seq": len(docs)}}, upsert=True
+        )
+        if inserted:
+            print(f"已从 checkpoint 导入会话 {session_id} 的 {inserted} 条聊天记录")
+        return inserted
+
+    async def get_messages(
+        self,
+        session_id: str,
+        after_seq: Optional[int] = None,
+        limit: int = 50,
+        before_seq: Optional[int] = None,
+    ) -> Dict:
+        """
+        按序号范围读取会话的聊天记录，返回的消息始终按序号升序排列
+
+        不传 after_seq 时返回最新的 limit 条（或 before_seq 之前的 limit 条），
+        用于首次加载和向前翻页；传入 after_seq 时返回其后的消息，用于增量拉取。
+
+        Args:
+            session_id: 会话ID
+            after_seq: 只返回序号大于该值的消息，客户端传入已拥有的最后一个序号
+            limit: 最多返回的消息数量
+            before_seq: 只返回序号小于该值的消息，客户端传入已拥有的第一个序号
+
+        Returns:
+            Dict: {"history": [...], "first_seq": int, "last_seq": int,
+                "has_more": bool}，增量拉取时 has_more 表示还有更新的消息，
+                否则表示还有更早的消息
+        """
+        query: Dict[str, Any] = {"session_id": session_id}
+        if after_seq is not None:
+            query["seq"] = {"$gt": after_seq}
+        elif before_seq is not None:
+            query["seq"] = {"$lt": before_seq}
+        newest_first = after_seq is None
+        results = (
+            self.messages_collection.find(query)
+            .sort("seq", DESCENDING if newest_first else ASCENDING)
+            .limit(limit + 1)
+        )
+        docs = [doc async for doc in results]
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+        if newest_first:
+            docs.reverse()
+        if docs:
+            first_seq, last_seq = docs[0]["seq"], docs[-1]["seq"]
+        else:
+            first_seq = last_seq = after_seq or 0
+        return {
+            "history": [_document_to_item(doc) for doc in docs],
+            "first_seq": first_seq,
+            "last_seq": last_seq,
+            "has_more": has_more,
+        }
+
+    async def count_messages(self, session_id: str) -> Optional[int]:
+        """返回会话已保存的消息数量（即最后一个序号），会话不存在时返回 None"""
+        counter = await self.counters_collection.find_one({"_id": session_id})
+        return counter["seq"] if counter else None
@@ -0,0 +1,103 @@
+"""
+会话数据迁移脚本
+将用户文档中内嵌的 session_ids 数组迁移到独立的 user_sessions 集合
+
+用法：
+    python -m src.db.migrate_sessions [--dry-run]
+
+脚本可以重复执行：已迁移的会话依靠 (user_id, session_id) 唯一索引跳过，
+迁移完成的用户文档会移除 session_ids 字段。
+"""
+
+import argparse
+from datetime import datetime, timedelta
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from .sessions import DEFAULT_AGENT_ID, new_session_document
+from .user_model import UserModel
+
+
+def _normalize_entry(entry):
+    """兼容旧格式：数组元素可能是字符串，也可能是 {"id", "agent_id"} 字典"""
+    if isinstance(entry, dict):
+        return entry.get("id"), entry.get("agent_id") or DEFAULT_AGENT_ID
+    return entry, DEFAULT_AGENT_ID
+
+
+def migrate_embedded_sessions(dry_run: bool = False) -> dict:
+    """
+    执行迁移
+
+    内嵌数组没有记录添加时间，这里以用户的 created_at 为基准，按数组顺序每条递增 1 毫秒，
+    从而在新集合中保持原有的先后顺序。
+
+    Args:
+        dry_run: 为 True 时只统计不写入
+
+    Returns:
+        dict: 迁移统计信息
+    """
+    user_model = UserModel()
+    stats = {"users": 0, "sessions": 0, "inserted": 0}
+
+    users = user_model.users_collection.find(
+        {"session_ids": {"$exists": True}},
+        {"user_id": 1, "session_ids": 1, "created_at": 1},
+    )
+    for user in users:
+        user_id = user["user_id"]
+        base_time = user.get("created_at") or datetime.utcnow()
+        operations = []
+        for index, entry in enumerate(user.get("session_ids") or []):
+            session_id, agent_id = _normalize_entry(entry)
+            if not session_id:
+                continue
+            created_at = base_time + timedelta(milliseconds=index)
+            operations.append(
+                UpdateOne(
+                    {"user_id": user_id, "session_id": session_id},
+                    {
+                        "$setOnInsert": new_session_document(
+                            user_id, session_id, agent_id, created_at
+                        )
+                    },
+                    upsert=True,
+                )
+            )
+
+        stats["users"] += 1
+        stats["sessions"] += len(operations)
+        if dry_run:
+            continue
+
+        try:
+            if operations:
+                result = user_model.sessions_collection.bulk_write(
+                    operations, ordered=False
+                )
+                stats["inserted"] += result.upserted_count
+            session_count = user_model.sessions_collection.count_documents(
+                {"user_id": user_id}
+            )
+            user_model.users_collection.update_one(
+                {"user_id": user_id},
+                {
+                    "$set": {"session_count": session_count},
+                    "$unset": {"session_ids": ""},
+                },
+            )
+            print(f"用户 '{user_id}' 迁移完成，共 {session_count} 个会话")
+        except PyMongoError as e:
+            print(f"迁移用户 '{user_id}' 时出错: {e}")
+
+    print(f"迁移结束: {stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="迁移内嵌的 session_ids 数组")
+    parser.add_argument("--dry-run", action="store_true", help="只统计不写入")
+    args = parser.parse_args()
+    migrate_embedded_sessions(dry_run=args.dry_run)
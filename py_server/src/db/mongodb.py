@@ -1,18 +1,8 @@
-from pymongo.mongo_client import MongoClient
-from pymongo.server_api import ServerApi
 from pymongo.errors import CollectionInvalid
 from pymongo.errors import PyMongoError
 from bson.json_util import dumps
-from dotenv import load_dotenv
 
-load_dotenv()
-import os
-
-uri = os.getenv("MONGODB_URI")
-# uri = "mongodb://localhost:27017/?directConnection=true"
-
-# Create a new client and connect to the server
-client = MongoClient(uri, server_api=ServerApi("1"))
+from .connection import get_sync_client
 
 
 def create_collection(database_name, collection_name):
@@ -28,7 +18,7 @@ def create_collection(database_name, collection_name):
     """
     try:
         # 获取或创建数据库
-        db = client.get_database(database_name)
+        db = get_sync_client().get_database(database_name)
 
         # 创建集合
         db.create_collection(collection_name)
@@ -61,7 +51,7 @@ def get_collection_data(
     """
     try:
         # 获取数据库和集合
-        db = client.get_database(database_name)
+        db = get_sync_client().get_database(database_name)
         collection = db[collection_name]
 
         # 构建查询
@@ -108,7 +98,7 @@ def insertSessionId(user_id: str, session_id: str):
     """
     try:
         # 获取数据库和集合
-        db = client.get_database("main")
+        db = get_sync_client().get_database("main")
         collection = db["sessions"]
 
         # 插入文档（兼容旧格式）
@@ -116,12 +106,11 @@ def insertSessionId(user_id: str, session_id: str):
 
         print(f"会话ID '{session_id}' 插入成功")
         
-        # 同时更新到用户模型（如果存在）
+        # 同时更新到用户模型（如果存在），UserModel 复用共享连接，无需关闭
         try:
             from .user_model import UserModel
             user_model = UserModel()
             user_model.add_session_to_user(user_id, session_id)
-            user_model.close_connection()
             print(f"会话ID '{session_id}' 已关联到用户 '{user_id}'")
         except Exception as e:
             print(f"更新用户会话记录时出错: {e}")
@@ -0,0 +1,324 @@
+"""
+Checkpoint 保留策略
+AsyncMongoDBSaver 每一轮对话都会新增 checkpoint 和 write 文档且从不清理，
+这里提供一个后台任务定期回收：
+1. 每个 thread 只保留最近 N 个 checkpoint 及其 writes
+2. 过期（超过 TTL）且不属于最新 checkpoint 的 pending writes 直接删除
+3. 可选：消息历史超过 token 预算时，将较早的消息总结为一条摘要并截断。
+   每个 thread 按 checkpoint 元数据中的 agent_id 找到所属的图，
+   找不到或状态与图不匹配的 thread、以及正在生成回复的 thread 跳过
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import HumanMessage, RemoveMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.checkpoint.mongodb.aio import AsyncMongoDBSaver
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+from langgraph.graph.state import CompiledStateGraph
+
+from src.graph.context import split_window
+
+# 保留策略配置，均可通过环境变量覆盖
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "20"))
+CHECKPOINT_WRITES_TTL_SECONDS = int(
+    os.getenv("CHECKPOINT_WRITES_TTL_SECONDS", str(7 * 24 * 3600))
+)
+CHECKPOINT_RETENTION_INTERVAL_SECONDS = int(
+    os.getenv("CHECKPOINT_RETENTION_INTERVAL_SECONDS", "3600")
+)
+# 为 0 时不做消息摘要截断
+CHECKPOINT_SUMMARY_TOKEN_BUDGET = int(os.getenv("CHECKPOINT_SUMMARY_TOKEN_BUDGET", "0"))
+
+# UUID 纪元 1582-10-15 与 Unix 纪元之间相差的 100 纳秒间隔数
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+# 根据 checkpoint 元数据中的 agent_id（旧会话没有，为 None）返回该 thread 所属的图
+GraphLookup = Callable[[Optional[str]], Optional[CompiledStateGraph]]
+# 返回 thread 当前是否有正在进行的生成
+BusyCheck = Callable[[str], bool]
+
+SUMMARY_PROMPT = "请用简洁的中文总结以上对话的关键信息，供后续对话作为上下文使用。"
+
+
+def checkpoint_id_before(seconds_ago: float) -> str:
+    """
+    构造一个 seconds_ago 秒之前时刻的最小 checkpoint_id
+
+    LangGraph 的 checkpoint_id 是按时间排序的 UUIDv6，字符串比较即时间比较，
+    因此比该值小的 checkpoint_id 都早于这个时刻。
+    """
+    timestamp = int((time.time() - seconds_ago) * 10**7) + _UUID_EPOCH_OFFSET
+    uuid_int = ((timestamp >> 12) & 0xFFFFFFFFFFFF) << 80
+    uuid_int |= (0x6000 | (timestamp & 0x0FFF)) << 64
+    uuid_int |= 0x8000 << 48
+    hex_str = f"{uuid_int:032x}"
+    return (
+        f"{hex_str[:8]}-{hex_str[8:12]}-{hex_str[12:16]}-"
+        f"{hex_str[16:20]}-{hex_str[20:]}"
+    )
+
+
+@dataclass
+class RetentionReport:
+    """一次回收的统计结果"""
+
+    deleted_checkpoints: int = 0
+    deleted_writes: int = 0
+    reclaimed_bytes: int = 0
+    summarized_threads: int = 0
+    skipped_threads: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def as_dict(self) -> Dict:
+        return {
+            "deleted_checkpoints": self.deleted_checkpoints,
+            "deleted_writes": self.deleted_writes,
+            "reclaimed_bytes": self.reclaimed_bytes,
+            "summarized_threads": self.summarized_threads,
+            "skipped_threads": self.skipped_threads,
+            "errors": self.errors,
+        }
+
+
+class CheckpointRetention:
+    """
+    Checkpoint 回收引擎
+    """
+
+    def __init__(
+        self,
+        checkpointer: AsyncMongoDBSaver,
+        keep_last: int = CHECKPOINT_KEEP_LAST,
+        writes_ttl_seconds: int = CHECKPOINT_WRITES_TTL_SECONDS,
+        summary_token_budget: int = CHECKPOINT_SUMMARY_TOKEN_BUDGET,
+        graph_for: Optional[GraphLookup] = None,
+        summary_model: Optional[BaseChatModel] = None,
+        thread_busy: Optional[BusyCheck] = None,
+    ):
+        """
+        Args:
+            checkpointer: 共享的 checkpointer
+            keep_last: 每个 thread 保留的 checkpoint 数量
+            writes_ttl_seconds: pending writes 的过期时间
+            summary_token_budget: 消息历史的 token 预算，0 表示不做摘要截断
+            graph_for: 按 agent_id 查找 thread 所属的图，用于读取和更新消息状态，
+                摘要截断时必须提供
+            summary_model: 用于生成摘要的模型，摘要截断时必须提供
+            thread_busy: 判断 thread 是否正在生成回复，正在生成的 thread 不做摘要截断，
+                否则生成结束时写入的 checkpoint 会覆盖摘要
+        """
+        self.checkpointer = checkpointer
+        self.checkpoints = checkpointer.checkpoint_collection
+        self.writes = checkpointer.writes_collection
+        self.keep_last = keep_last
+        self.writes_ttl_seconds = writes_ttl_seconds
+        self.summary_token_budget = summary_token_budget
+        self.graph_for = graph_for
+        self.summary_model = summary_model
+        self.thread_busy = thread_busy or (lambda thread_id: False)
+        # 上次运行时刻对应的 checkpoint_id，用于找出之后有新对话的 thread
+        self._last_run_checkpoint_id: Optional[str] = None
+        self.last_report: Optional[RetentionReport] = None
+
+    async def _delete_with_size(self, collection, query: Dict) -> tuple:
+        """删除匹配的文档，返回 (删除数量, 回收字节数)"""
+        size = 0
+        async for row in await collection.aggregate(
+            [
+                {"$match": query},
+                {"$group": {"_id": None, "bytes": {"$sum": {"$bsonSize": "$$ROOT"}}}},
+            ]
+        ):
+            size = row["bytes"]
+        result = await collection.delete_many(query)
+        return result.deleted_count, size
+
+    async def prune_checkpoints(self, report: RetentionReport):
+        """每个 thread 只保留最近 keep_last 个 checkpoint"""
+        threads = await self.checkpoints.aggregate(
+            [
+                {
+                    "$group": {
+                        "_id": {
+                            "thread_id": "$thread_id",
+                            "checkpoint_ns": "$checkpoint_ns",
+                        },
+                        "count": {"$sum": 1},
+                    }
+                },
+                {"$match": {"count": {"$gt": self.keep_last}}},
+            ]
+        )
+        async for thread in threads:
+            key = thread["_id"]
+            stale = self.checkpoints.find(key, {"checkpoint_id": 1}).sort(
+                "checkpoint_id", -1
+            )
+            stale_ids = [
+                doc["checkpoint_id"] async for doc in stale.skip(self.keep_last)
+            ]
+            if not stale_ids:
+                continue
+            query = {**key, "checkpoint_id": {"$in": stale_ids}}
+            deleted, size = await self._delete_with_size(self.checkpoints, query)
+            report.deleted_checkpoints += deleted
+            report.reclaimed_bytes += size
+            deleted, size = await self._delete_with_size(self.writes, query)
+            report.deleted_writes += deleted
+            report.reclaimed_bytes += size
+
+    async def expire_pending_writes(self, report: RetentionReport):
+        """删除超过 TTL 且不属于 thread 最新 checkpoint 的 pending writes"""
+        cutoff_id = checkpoint_id_before(self.writes_ttl_seconds)
+        threads = await self.writes.aggregate(
+            [
+                {"$match": {"checkpoint_id": {"$lt": cutoff_id}}},
+                {
+                    "$group": {
+                        "_id": {
+                            "thread_id": "$thread_id",
+                            "checkpoint_ns": "$checkpoint_ns",
+                        }
+                    }
+                },
+            ]
+        )
+        async for thread in threads:
+            key = thread["_id"]
+            latest = await self.checkpoints.find_one(
+                key, {"checkpoint_id": 1}, sort=[("checkpoint_id", -1)]
+            )
+            id_filter = {"$lt": cutoff_id}
+            if latest:
+                id_filter["$ne"] = latest["checkpoint_id"]
+            deleted, size = await self._delete_with_size(
+                self.writes, {**key, "checkpoint_id": id_filter}
+            )
+            report.deleted_writes += deleted
+            report.reclaimed_bytes += size
+
+    async def _thread_graph(self, thread_id: str) -> tuple:
+        """
+        找到 thread 所属的图
+
+        Returns:
+            tuple: (图, agent_id)，thread 不属于任何可摘要的图时图为 None
+        """
+        checkpoint_tuple = await self.checkpointer.aget_tuple(
+            {"configurable": {"thread_id": thread_id}}
+        )
+        if checkpoint_tuple is None:
+            return None, None
+        agent_id = (checkpoint_tuple.metadata or {}).get("agent_id")
+        graph = self.graph_for(agent_id)
+        # 未打标签的旧 thread 也可能属于其他图，状态中有图不认识的通道时不能用它改写
+        channels = checkpoint_tuple.checkpoint.get("channel_versions", {})
+        if graph is None or not set(channels) <= set(graph.channels):
+            return None, agent_id
+        return graph, agent_id
+
+    async def _summarize_thread(self, thread_id: str) -> Optional[bool]:
+        """
+        对单个 thread 做摘要截断
+
+        Returns:
+            Optional[bool]: 做了摘要返回 True，未超预算返回 False，跳过返回 None
+        """
+        if self.thread_busy(thread_id):
+            return None
+        graph, agent_id = await self._thread_graph(thread_id)
+        if graph is None:
+            return None
+        config = {"configurable": {"thread_id": thread_id}}
+        state = await graph.aget_state(config)
+        messages = state.values.get("messages", [])
+        if count_tokens_approximately(messages) <= self.summary_token_budget:
+            return False
+
+        # 保留不超过一半预算、并从用户消息开始的最近消息，其余部分生成摘要；
+        # 从用户消息开始可以避免保留下来的开头是失去对应 tool call 的 ToolMessage
+        older, kept = split_window(messages, self.summary_token_budget // 2)
+        if kept and not isinstance(kept[0], HumanMessage):
+            older, kept = messages, []
+        if not older:
+            return False
+
+        summary = await self.summary_model.ainvoke(
+            [*older, HumanMessage(content=SUMMARY_PROMPT)]
+        )
+        # 生成摘要期间开始了新一轮对话时放弃本次摘要，下次回收再处理
+        latest = await self.checkpointer.aget_tuple(config)
+        if self.thread_busy(thread_id) or (
+            latest.config["configurable"]["checkpoint_id"]
+            != state.config["configurable"]["checkpoint_id"]
+        ):
+            return None
+        update = {
+            "messages": [
+                RemoveMessage(id=REMOVE_ALL_MESSAGES),
+                SystemMessage(content=f"此前对话摘要：{summary.content}"),
+                *kept,
+            ]
+        }
+        # 摘要已包含滚动摘要覆盖的消息，清空滚动摘要，避免两份摘要同时出现在提示词中
+        if "summary" in graph.channels:
+            update.update(summary="", summary_until_id="")
+        # 带上 agent_id，新的 checkpoint 仍能找到所属的图
+        config["metadata"] = {"agent_id": agent_id} if agent_id else {}
+        await graph.aupdate_state(config, update)
+        return True
+
+    async def summarize_threads(self, report: RetentionReport, since_id: str):
+        """对自上次运行以来有新对话、且消息超过 token 预算的 thread 做摘要截断"""
+        thread_ids = await self.checkpoints.distinct(
+            "thread_id", {"checkpoint_ns": "", "checkpoint_id": {"$gte": since_id}}
+        )
+        for thread_id in thread_ids:
+            # 单个 thread 出错不影响其他 thread
+            try:
+                summarized = await self._summarize_thread(thread_id)
+            except Exception as e:
+                report.errors.append(f"{thread_id}: {e}")
+                print(f"❌ Thread {thread_id} 摘要截断出错: {e}")
+                continue
+            if summarized is None:
+                report.skipped_threads += 1
+            elif summarized:
+                report.summarized_threads += 1
+
+    async def run_once(self) -> RetentionReport:
+        """执行一次完整的回收，返回统计结果"""
+        report = RetentionReport()
+        since_id = self._last_run_checkpoint_id or checkpoint_id_before(
+            CHECKPOINT_RETENTION_INTERVAL_SECONDS
+        )
+        self._last_run_checkpoint_id = checkpoint_id_before(0)
+
+        steps = [self.prune_checkpoints(report), self.expire_pending_writes(report)]
+        if self.summary_token_budget and self.graph_for and self.summary_model:
+            # 先摘要再裁剪，摘要生成的新 checkpoint 也受 keep_last 约束
+            steps.insert(0, self.summarize_threads(report, since_id))
+        for step in steps:
+            try:
+                await step
+            except Exception as e:
+                report.errors.append(str(e))
+                print(f"❌ Checkpoint 回收出错: {e}")
+
+        self.last_report = report
+        print(f"Checkpoint 回收完成: {report.as_dict()}")
+        return report
+
+    async def run_forever(
+        self, interval_seconds: int = CHECKPOINT_RETENTION_INTERVAL_SECONDS
+    ):
+        """按固定间隔循环执行回收，作为后台任务运行直到被取消"""
+        while True:
+            await self.run_once()
+            await asyncio.sleep(interval_seconds)
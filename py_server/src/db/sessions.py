@@ -0,0 +1,126 @@
+"""
+用户会话集合的公共定义
+会话关系存储在独立的 user_sessions 集合中（每个会话一条文档），
+同步的 UserModel 和异步的 AsyncUserModel 共用这里的索引定义和游标分页逻辑
+"""
+
+import base64
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+SESSIONS_COLLECTION = "user_sessions"
+DEFAULT_AGENT_ID = "main_agent"
+
+SESSION_INDEXES = [
+    # 同一用户下会话ID唯一，替代原先 $addToSet 的去重语义
+    IndexModel([("user_id", ASCENDING), ("session_id", ASCENDING)], unique=True),
+    # 按用户+智能体分页查询
+    IndexModel(
+        [
+            ("user_id", ASCENDING),
+            ("agent_id", ASCENDING),
+            ("created_at", DESCENDING),
+            ("session_id", DESCENDING),
+        ]
+    ),
+    # 不区分智能体时按用户分页查询
+    IndexModel(
+        [
+            ("user_id", ASCENDING),
+            ("created_at", DESCENDING),
+            ("session_id", DESCENDING),
+        ]
+    ),
+]
+
+# 分页排序：最新的会话在前，created_at 相同时用 session_id 保证顺序稳定
+SESSION_SORT = [("created_at", DESCENDING), ("session_id", DESCENDING)]
+
+
+def new_session_document(
+    user_id: str, session_id: str, agent_id: Optional[str], created_at: datetime
+) -> Dict:
+    """构造一条会话文档"""
+    return {
+        "user_id": user_id,
+        "session_id": session_id,
+        "agent_id": agent_id or DEFAULT_AGENT_ID,
+        "created_at": created_at,
+    }
+
+
+def encode_cursor(doc: Dict) -> str:
+    """将一页最后一条会话编码为不透明的游标字符串"""
+    raw = f"{doc['created_at'].isoformat()}|{doc['session_id']}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    解析游标字符串
+
+    Raises:
+        ValueError: 游标格式不正确
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, session_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), session_id
+    except Exception as e:
+        raise ValueError(f"无效的游标: {cursor}") from e
+
+
+def build_sessions_query(
+    user_id: str, agent_id: Optional[str] = None, cursor: Optional[str] = None
+) -> Dict:
+    """
+    构造会话分页查询条件
+
+    Args:
+        user_id: 用户ID
+        agent_id: 智能体ID（可选）
+        cursor: 上一页返回的游标（可选）
+
+    Returns:
+        Dict: MongoDB 查询条件
+    """
+    query = {"user_id": user_id}
+    if agent_id:
+        query["agent_id"] = agent_id
+    if cursor:
+        created_at, session_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "session_id": {"$lt": session_id}},
+        ]
+    return query
+
+
+def to_session_page(docs: List[Dict], limit: int) -> Dict:
+    """
+    将查询结果（多取一条用于判断是否还有下一页）转换为分页响应
+
+    Args:
+        docs: 最多 limit + 1 条会话文档
+        limit: 每页数量
+
+    Returns:
+        Dict: {"sessions": [...], "next_cursor": str | None}
+    """
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    return {
+        "sessions": [to_session_item(doc) for doc in docs],
+        "next_cursor": encode_cursor(docs[-1]) if has_more and docs else None,
+    }
+
+
+def to_session_item(doc: Dict) -> Dict:
+    """会话文档转换为接口返回格式，与原 session_ids 数组元素的格式保持兼容"""
+    return {
+        "id": doc["session_id"],
+        "agent_id": doc.get("agent_id", DEFAULT_AGENT_ID),
+        "created_at": doc.get("created_at"),
+    }
@@ -3,17 +3,17 @@
 提供RESTful API来管理用户和会话
 """
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, status
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List, Dict
 from datetime import datetime
-from .user_model import UserModel
+from .async_user_model import AsyncUserModel
 
 # 创建路由器
 router = APIRouter(prefix="/api/users", tags=["users"])
 
 # 初始化用户模型
-user_model = UserModel()
+user_model = AsyncUserModel()
 
 
 # Pydantic模型用于请求验证
@@ -28,6 +28,7 @@ class CreateUserRequest(BaseModel):
 class AddSessionRequest(BaseModel):
     """添加会话请求模型"""
     session_id: str
+    agent_id: Optional[str] = None
 
 
 class UpdateMetadataRequest(BaseModel):
@@ -40,7 +41,6 @@ class UserResponse(BaseModel):
     user_id: str
     username: str
     email: Optional[str] = None
-    session_ids: List[str]
     session_count: int
     created_at: datetime
     updated_at: datetime
@@ -48,11 +48,18 @@ class UserResponse(BaseModel):
     metadata: Dict
 
 
+class SessionItem(BaseModel):
+    """单个会话"""
+    id: str
+    agent_id: str
+    created_at: Optional[datetime] = None
+
+
 class SessionResponse(BaseModel):
-    """会话响应模型"""
+    """会话分页响应模型"""
     user_id: str
-    session_ids: List[str]
-    session_count: int
+    sessions: List[SessionItem]
+    next_cursor: Optional[str] = None
 
 
 # API路由
@@ -65,7 +72,7 @@ async def create_user(request: CreateUserRequest):
         包含创建状态和用户信息的对象
     """
     try:
-        success = user_model.create_user(
+        success = await user_model.create_user(
             user_id=request.user_id,
             username=request.username,
             email=request.email,
@@ -73,7 +80,7 @@ async def create_user(request: CreateUserRequest):
         )
         
         if success:
-            user_info = user_model.get_user_info(request.user_id)
+            user_info = await user_model.get_user_info(request.user_id)
             return {
                 "success": True,
                 "message": "用户创建成功",
@@ -103,7 +110,7 @@ async def get_user(user_id: str):
     Returns:
         用户信息
     """
-    user_info = user_model.get_user_info(user_id)
+    user_info = await user_model.get_user_info(user_id)
     
     if not user_info:
         raise HTTPException(
@@ -126,7 +133,9 @@ async def add_session_to_user(user_id: str, request: AddSessionRequest):
     Returns:
         操作结果
     """
-    success = user_model.add_session_to_user(user_id, request.session_id)
+    success = await user_model.add_session_to_user(
+        user_id, request.session_id, request.agent_id
+    )
     
     if success:
         return {
@@ -141,30 +150,33 @@ async def add_session_to_user(user_id: str, request: AddSessionRequest):
 
 
 @router.get("/{user_id}/sessions", response_model=SessionResponse)
-async def get_user_sessions(user_id: str, limit: Optional[int] = None):
+async def get_user_sessions(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    agent_id: Optional[str] = None,
+):
     """
-    获取用户的所有会话ID
+    分页获取用户的会话，按创建时间倒序
     
     Args:
         user_id: 用户ID
-        limit: 返回的会话数量限制
+        limit: 每页数量
+        cursor: 上一页返回的 next_cursor，为空时从最新的会话开始
+        agent_id: 只返回该智能体下的会话（可选）
         
     Returns:
-        会话信息
+        会话列表和下一页游标（没有更多数据时为 null）
     """
-    session_ids = user_model.get_user_sessions(user_id, limit)
-    
-    if session_ids is None:
+    try:
+        page = await user_model.list_user_sessions(user_id, limit, cursor, agent_id)
+    except ValueError as e:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="用户不存在"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
     
-    return SessionResponse(
-        user_id=user_id,
-        session_ids=session_ids,
-        session_count=len(session_ids)
-    )
+    return SessionResponse(user_id=user_id, **page)
 
 
 @router.put("/{user_id}/metadata", response_model=Dict)
@@ -179,7 +191,7 @@ async def update_user_metadata(user_id: str, request: UpdateMetadataRequest):
     Returns:
         操作结果
     """
-    success = user_model.update_user_metadata(user_id, request.metadata)
+    success = await user_model.update_user_metadata(user_id, request.metadata)
     
     if success:
         return {
@@ -205,7 +217,7 @@ async def get_active_users(days: int = 30, limit: int = 10):
     Returns:
         活跃用户列表
     """
-    active_users = user_model.get_active_users(days, limit)
+    active_users = await user_model.get_active_users(days, limit)
     return active_users
 
 
@@ -220,7 +232,7 @@ async def delete_user(user_id: str):
     Returns:
         操作结果
     """
-    success = user_model.delete_user(user_id)
+    success = await user_model.delete_user(user_id)
     
     if success:
         return {
@@ -238,7 +250,7 @@ async def delete_user(user_id: str):
 @router.on_event("shutdown")
 async def shutdown_event():
     """应用关闭时的清理操作"""
-    user_model.close_connection()
+    await user_model.close_connection()
 
 
 # 集成到主应用的示例
@@ -257,7 +269,7 @@ app.include_router(user_router)
 # POST /api/users/ - 创建用户
 # GET /api/users/{user_id} - 获取用户信息
 # POST /api/users/{user_id}/sessions - 添加会话
-# GET /api/users/{user_id}/sessions - 获取用户会话
+# GET /api/users/{user_id}/sessions?limit=&cursor= - 分页获取用户会话
 # PUT /api/users/{user_id}/metadata - 更新元数据
 # GET /api/users/active/recent - 获取活跃用户
 # DELETE /api/users/{user_id} - 删除用户
@@ -4,17 +4,29 @@
 """
 
 from pymongo.errors import PyMongoError, DuplicateKeyError
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo import ASCENDING, DESCENDING
 from datetime import datetime
 from typing import List, Dict, Optional
 from bson import ObjectId
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
-
-# 获取MongoDB连接URI
-MONGODB_URI = os.getenv("MONGODB_URI")
+from .connection import (
+    close_sync_client,
+    get_sync_client,
+    indexes_ready,
+    mark_indexes_ready,
+)
+from .sessions import (
+    SESSION_INDEXES,
+    SESSION_SORT,
+    SESSIONS_COLLECTION,
+    build_sessions_query,
+    new_session_document,
+    to_session_item,
+    to_session_page,
+)
+
+# users 和 user_sessions 两个集合的索引作为一组，在每个进程中只创建一次
+USERS_INDEX_KEY = "nan_agent_main.users"
 
 
 class UserModel:
@@ -23,24 +35,29 @@ class UserModel:
     """
 
     def __init__(self):
-        """初始化用户模型，建立数据库连接"""
-        self.client = MongoClient(MONGODB_URI)
+        """初始化用户模型，复用进程共享的数据库连接"""
+        self.client = get_sync_client()
         self.db = self.client.get_database("nan_agent_main")
 
         self.users_collection = self.db["users"]
+        # 会话关系单独存储，避免用户文档随会话数量无限增长
+        self.sessions_collection = self.db[SESSIONS_COLLECTION]
         if self.users_collection is None:
             self.db.create_collection("users")
         self._create_indexes()
 
     def _create_indexes(self):
-        """创建必要的索引以优化查询性能"""
+        """创建必要的索引以优化查询性能（每个进程只执行一次）"""
+        if indexes_ready(USERS_INDEX_KEY):
+            return
         try:
             # 为用户ID创建唯一索引
             self.users_collection.create_index("user_id", unique=True)
-            # 为会话ID数组创建索引，便于查询
-            self.users_collection.create_index("session_ids")
             # 为创建时间创建索引，便于按时间排序
             self.users_collection.create_index([("created_at", DESCENDING)])
+            # 会话集合的唯一索引和分页复合索引
+            self.sessions_collection.create_indexes(SESSION_INDEXES)
+            mark_indexes_ready(USERS_INDEX_KEY)
             print("用户集合索引创建成功")
         except Exception as e:
             print(f"创建索引时出错: {e}")
@@ -69,8 +86,7 @@ class UserModel:
                 "user_id": user_id,
                 "username": username or user_id,
                 "email": email,
-                "session_ids": [],  # 存储会话ID的数组
-                "session_count": 0,  # 会话总数
+                "session_count": 0,  # 会话总数，会话本身存储在 user_sessions 集合中
                 "created_at": datetime.utcnow(),
                 "updated_at": datetime.utcnow(),
                 "last_active": datetime.utcnow(),
@@ -104,30 +120,32 @@ class UserModel:
             bool: 操作是否成功
         """
         try:
-            # 使用addToSet避免重复添加相同的session_id
-            result = self.users_collection.update_one(
+            now = datetime.utcnow()
+            user_result = self.users_collection.update_one(
                 {"user_id": user_id},
+                {"$set": {"updated_at": now, "last_active": now}},
+            )
+            if user_result.matched_count == 0:
+                print(f"用户 '{user_id}' 不存在")
+                return False
+
+            # upsert + 唯一索引避免重复添加相同的session_id
+            result = self.sessions_collection.update_one(
+                {"user_id": user_id, "session_id": session_id},
                 {
-                    "$addToSet": {
-                        "session_ids": {
-                            "id": session_id,
-                            "agent_id": agent_id if agent_id else "main_agent",
-                        }
-                    },
-                    "$inc": {"session_count": 1},
-                    "$set": {
-                        "updated_at": datetime.utcnow(),
-                        "last_active": datetime.utcnow(),
-                    },
+                    "$setOnInsert": new_session_document(
+                        user_id, session_id, agent_id, now
+                    )
                 },
+                upsert=True,
             )
+            if result.upserted_id is not None:
+                self.users_collection.update_one(
+                    {"user_id": user_id}, {"$inc": {"session_count": 1}}
+                )
 
-            if result.modified_count > 0:
-                print(f"为用户 '{user_id}' 添加会话ID '{session_id}' 成功")
-                return True
-            else:
-                print(f"用户 '{user_id}' 不存在")
-                return False
+            print(f"为用户 '{user_id}' 添加会话ID '{session_id}' 成功")
+            return True
 
         except PyMongoError as e:
             print(f"添加会话ID时出错: {e}")
@@ -136,30 +154,27 @@ class UserModel:
             print(f"未知错误: {e}")
             return False
 
-    def get_user_sessions(self, user_id: str, limit: int = None) -> List[str]:
+    def get_user_sessions(
+        self, user_id: str, limit: int = None, agent_id: Optional[str] = None
+    ) -> List[Dict]:
         """
-        获取用户的所有会话ID
+        获取用户最近的会话，按创建时间倒序
 
         Args:
             user_id: 用户ID
             limit: 返回的会话数量限制（可选）
+            agent_id: 只返回该智能体下的会话（可选）
 
         Returns:
-            List[str]: 会话ID列表
+            List[Dict]: 会话列表，每项包含 id、agent_id、created_at
         """
         try:
-            user = self.users_collection.find_one(
-                {"user_id": user_id}, {"session_ids": 1, "session_count": 1}
-            )
-
-            if user:
-                session_ids = user.get("session_ids", [])
-                if limit and len(session_ids) > limit:
-                    return session_ids[-limit:]  # 返回最新的会话ID
-                return session_ids
-            else:
-                print(f"用户 '{user_id}' 不存在")
-                return []
+            cursor = self.sessions_collection.find(
+                build_sessions_query(user_id, agent_id)
+            ).sort(SESSION_SORT)
+            if limit:
+                cursor = cursor.limit(limit)
+            return [to_session_item(doc) for doc in cursor]
 
         except PyMongoError as e:
             print(f"查询用户会话时出错: {e}")
@@ -168,6 +183,39 @@ class UserModel:
             print(f"未知错误: {e}")
             return []
 
+    def list_user_sessions(
+        self,
+        user_id: str,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        agent_id: Optional[str] = None,
+    ) -> Dict:
+        """
+        基于游标分页获取用户的会话，按创建时间倒序
+
+        Args:
+            user_id: 用户ID
+            limit: 每页数量
+            cursor: 上一页返回的 next_cursor（可选）
+            agent_id: 只返回该智能体下的会话（可选）
+
+        Returns:
+            Dict: {"sessions": [...], "next_cursor": str | None}
+
+        Raises:
+            ValueError: 游标格式不正确
+        """
+        query = build_sessions_query(user_id, agent_id, cursor)
+        try:
+            results = (
+                self.sessions_collection.find(query).sort(SESSION_SORT).limit(limit + 1)
+            )
+            return to_session_page(list(results), limit)
+
+        except PyMongoError as e:
+            print(f"查询用户会话时出错: {e}")
+            return {"sessions": [], "next_cursor": None}
+
     def get_user_info(self, user_id: str) -> Optional[Dict]:
         """
         获取用户的完整信息
@@ -276,6 +324,7 @@ class UserModel:
         """
         try:
             result = self.users_collection.delete_one({"user_id": user_id})
+            self.sessions_collection.delete_many({"user_id": user_id})
 
             if result.deleted_count > 0:
                 print(f"用户 '{user_id}' 删除成功")
@@ -292,10 +341,9 @@ class UserModel:
             return False
 
     def close_connection(self):
-        """关闭数据库连接"""
+        """关闭进程共享的数据库连接，仅应在应用或脚本退出时调用"""
         try:
-            self.client.close()
-            print("数据库连接已关闭")
+            close_sync_client()
         except Exception as e:
             print(f"关闭连接时出错: {e}")
 
@@ -333,7 +381,6 @@ def test_user_model():
                 print(f"用户ID: {user_info['user_id']}")
                 print(f"用户名: {user_info['username']}")
                 print(f"会话数量: {user_info['session_count']}")
-                print(f"会话ID列表: {user_info['session_ids']}")
                 print(f"创建时间: {user_info['created_at']}")
 
             # 测试获取用户会话
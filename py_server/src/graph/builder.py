@@ -2,30 +2,43 @@
 This module defines the state and the graph for a simple chatbot.
 """
 
-from typing import Annotated, Sequence
+from typing import Annotated, Optional, Sequence
 from langgraph.graph import StateGraph
-from langgraph.checkpoint.memory import InMemorySaver
-from langgraph.store.memory import InMemoryStore
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from src.graph.context import assemble_context
+from src.graph.memory import BoundedInMemorySaver, BoundedInMemoryStore
+from src.graph.registry import graph_registry
 from src.modals.chat_modal import chat_modal
 from langgraph.graph.message import MessagesState
 
 from pydantic import Field
 
 
-store = InMemoryStore()
-memory_saver = InMemorySaver()
+# Used when no checkpointer is given (dev, tests, the LangGraph CLI); bounded so
+# that threads are evicted instead of accumulating for the life of the process.
+store = BoundedInMemoryStore()
+memory_saver = BoundedInMemorySaver()
 
 
 class State(MessagesState):
     """State for the graph."""
 
     todos: Annotated[list, Field(description="The list of todos")]
+    summary: Annotated[str, Field(description="Rolling summary of older messages")]
+    summary_until_id: Annotated[
+        str, Field(description="Id of the last message folded into the summary")
+    ]
 
 
-def chatbot(state: State):
+async def chatbot(state: State):
     """
     This is the core function of our chatbot. It takes the current
-    conversation history and invokes the language model to get the next message.
+    conversation history, bounds it to the context token budget and invokes the
+    language model to get the next message.
+
+    The node is async so the model call runs on the event loop instead of a
+    thread-pool worker, and tokens reach the `messages` stream without crossing
+    threads.
 
     Args:
         state: The current state of the graph, containing the message history.
@@ -33,13 +46,25 @@ def chatbot(state: State):
     Returns:
         A dictionary with the AI's response message.
     """
+    prompt, context_update = await assemble_context(state, chat_modal)
     return {
-        "messages": chat_modal.invoke(state["messages"]),
+        "messages": await chat_modal.ainvoke(prompt),
         "todos": [{"task": "完成项目从 Flask 到 FastAPI 的迁移", "status": "done"}],
+        **context_update,
     }
 
 
-def build_graph() -> StateGraph:
+def build_graph(checkpointer: Optional[BaseCheckpointSaver] = None) -> StateGraph:
+    """
+    Builds and compiles the chatbot graph.
+
+    Args:
+        checkpointer: The checkpointer to compile the graph with. Defaults to the
+            module-level in-memory saver.
+
+    Returns:
+        The compiled graph.
+    """
     # Create a new StateGraph with our custom State class
     workflow = StateGraph(State)
 
@@ -49,10 +74,13 @@ def build_graph() -> StateGraph:
     # Set the entry point of the graph to the "chatbot" node
     workflow.set_entry_point("chatbot")
     workflow.add_edge("chatbot", "__end__")
-    graph = workflow.compile(checkpointer=memory_saver)
+    graph = workflow.compile(checkpointer=checkpointer or memory_saver)
     return graph
 
 
+graph_registry.register("chatbot", build_graph)
+
+
 if __name__ == "__main__":
     graph = build_graph()
     print(graph.get_graph().draw_mermaid_png(output_file_path="researcher.png"))
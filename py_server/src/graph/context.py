@@ -0,0 +1,173 @@
+"""
+This module assembles a token-bounded prompt for the chatbot node.
+
+Instead of sending the full conversation on every turn, the prompt is made of a
+rolling summary of older messages plus a sliding window of the most recent ones.
+The summary is cached in graph state and only extended with the messages that
+fell out of the window since the previous turn.
+"""
+
+import os
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.constants import TAG_NOSTREAM
+
+# Token budget for the whole prompt; 0 disables context management.
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+# Tokens reserved for the rolling summary inside the budget.
+CONTEXT_SUMMARY_MAX_TOKENS = int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", "512"))
+
+SUMMARY_SYSTEM_PROMPT = (
+    "你负责维护一段对话摘要。请把已有摘要和新增的对话内容合并成一段新的摘要，"
+    "保留用户的目标、偏好、已确认的事实和未完成的事项，"
+    f"不超过 {CONTEXT_SUMMARY_MAX_TOKENS} 个 token，直接输出摘要内容。"
+)
+
+
+def count_tokens(messages: Sequence[BaseMessage]) -> int:
+    """Counts the tokens of a list of messages."""
+    return count_tokens_approximately(messages)
+
+
+def summary_message(summary: str) -> SystemMessage:
+    """Wraps the rolling summary into the system message placed before the window."""
+    return SystemMessage(content=f"此前对话摘要：{summary}")
+
+
+@dataclass
+class ContextMetrics:
+    """Per-worker counters of prompt tokens sent versus full history size."""
+
+    turns: int = 0
+    prompt_tokens: int = 0
+    history_tokens: int = 0
+    summaries: int = 0
+    last_prompt_tokens: int = 0
+    last_history_tokens: int = 0
+
+    def __post_init__(self):
+        self._lock = Lock()
+
+    def record(self, prompt_tokens: int, history_tokens: int, summarized: bool):
+        with self._lock:
+            self.turns += 1
+            self.prompt_tokens += prompt_tokens
+            self.history_tokens += history_tokens
+            self.summaries += int(summarized)
+            self.last_prompt_tokens = prompt_tokens
+            self.last_history_tokens = history_tokens
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "turns": self.turns,
+                "prompt_tokens": self.prompt_tokens,
+                "history_tokens": self.history_tokens,
+                "saved_tokens": self.history_tokens - self.prompt_tokens,
+                "summaries": self.summaries,
+                "last_prompt_tokens": self.last_prompt_tokens,
+                "last_history_tokens": self.last_history_tokens,
+            }
+
+
+context_metrics = ContextMetrics()
+
+
+def _unsummarized(
+    messages: Sequence[BaseMessage], summary_until_id: Optional[str]
+) -> List[BaseMessage]:
+    """Returns the messages after the last one already folded into the summary."""
+    if summary_until_id:
+        for index, message in enumerate(messages):
+            if message.id == summary_until_id:
+                return list(messages[index + 1 :])
+    # The summarised messages may have been removed from state (e.g. by the
+    # checkpoint retention job), in which case everything left is unsummarised.
+    return list(messages)
+
+
+def split_window(
+    messages: Sequence[BaseMessage], budget: int
+) -> Tuple[List[BaseMessage], List[BaseMessage]]:
+    """
+    Splits messages into (older, window) where window is the longest suffix that
+    fits the budget and starts on a human message. The latest message is always
+    kept in the window.
+    """
+    start, used = len(messages), 0
+    for index in range(len(messages) - 1, -1, -1):
+        used += count_tokens([messages[index]])
+        if used > budget and start < len(messages):
+            break
+        start = index
+    while start < len(messages) - 1 and not isinstance(messages[start], HumanMessage):
+        start += 1
+    return list(messages[:start]), list(messages[start:])
+
+
+def _summary_request(summary: str, older: Sequence[BaseMessage]) -> List[BaseMessage]:
+    request = [SystemMessage(content=SUMMARY_SYSTEM_PROMPT)]
+    if summary:
+        request.append(summary_message(summary))
+    request.extend(older)
+    request.append(HumanMessage(content="请输出更新后的对话摘要。"))
+    return request
+
+
+def _plan(state: Dict, budget: int) -> Tuple[List[BaseMessage], List[BaseMessage]]:
+    """
+    Works out the sliding window for this turn.
+
+    Returns:
+        A tuple of (window, older) where older holds the messages that left the
+        window and must be folded into the summary.
+    """
+    summary = state.get("summary") or ""
+    pending = _unsummarized(state["messages"], state.get("summary_until_id"))
+    prefix = [summary_message(summary)] if summary else []
+    if not budget or count_tokens(prefix + pending) <= budget:
+        return pending, []
+    # Shrink the window to half of what is left after the summary so the next few
+    # turns fit again without refreshing the summary on every turn.
+    older, window = split_window(pending, (budget - CONTEXT_SUMMARY_MAX_TOKENS) // 2)
+    return window, older
+
+
+def _build_prompt(
+    state: Dict, summary: str, window: List[BaseMessage], summarized: bool
+) -> List[BaseMessage]:
+    prompt = ([summary_message(summary)] if summary else []) + window
+    context_metrics.record(
+        count_tokens(prompt), count_tokens(state["messages"]), summarized
+    )
+    return prompt
+
+
+async def assemble_context(
+    state: Dict, model: BaseChatModel, budget: int = CONTEXT_TOKEN_BUDGET
+) -> Tuple[List[BaseMessage], Dict]:
+    """
+    Builds the bounded prompt for the current turn.
+
+    Args:
+        state: The graph state, with `messages` and the cached `summary`.
+        model: The model used to refresh the summary when messages leave the window.
+        budget: The prompt token budget.
+
+    Returns:
+        A tuple of the prompt messages and the state update for the summary fields.
+    """
+    summary = state.get("summary") or ""
+    window, older = _plan(state, budget)
+    if not older:
+        return _build_prompt(state, summary, window, False), {}
+
+    summarizer = model.with_config(tags=[TAG_NOSTREAM])
+    summary = (await summarizer.ainvoke(_summary_request(summary, older))).content
+    prompt = _build_prompt(state, summary, window, True)
+    return prompt, {"summary": summary, "summary_until_id": older[-1].id}
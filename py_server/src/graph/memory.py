@@ -0,0 +1,331 @@
+"""
+This module provides bounded in-memory replacements for LangGraph's
+``InMemorySaver`` and ``InMemoryStore``.
+
+The stock classes keep every checkpoint of every thread (and every store item)
+for the life of the process, so dev servers, the LangGraph CLI and test suites
+that create a thread per call grow without limit. The bounded versions are
+drop-in subclasses that keep at most a number of checkpoints per thread, evict
+the least recently used threads (or store items) beyond a count or a byte
+ceiling, and report what they hold. Sizes are those of the serialized values,
+which is what the stock classes keep in memory.
+"""
+
+import json
+import os
+from collections import OrderedDict, defaultdict
+from threading import RLock
+from typing import Any, Dict, Iterable, List, Sequence, Set, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.store.base import GetOp, Op, PutOp, Result
+from langgraph.store.memory import InMemoryStore
+
+# Threads kept by the in-memory checkpointer; the least recently used go first.
+IN_MEMORY_MAX_THREADS = int(os.getenv("IN_MEMORY_MAX_THREADS", "1000"))
+# Checkpoints kept per thread (and subgraph namespace); older ones are dropped.
+IN_MEMORY_MAX_CHECKPOINTS_PER_THREAD = int(
+    os.getenv("IN_MEMORY_MAX_CHECKPOINTS_PER_THREAD", "20")
+)
+IN_MEMORY_MAX_MB = float(os.getenv("IN_MEMORY_MAX_MB", "256"))
+IN_MEMORY_STORE_MAX_ITEMS = int(os.getenv("IN_MEMORY_STORE_MAX_ITEMS", "10000"))
+IN_MEMORY_STORE_MAX_MB = float(os.getenv("IN_MEMORY_STORE_MAX_MB", "64"))
+
+_MB = 1024 * 1024
+
+
+def _typed_size(value: Tuple[str, bytes]) -> int:
+    return len(value[1])
+
+
+class BoundedInMemorySaver(InMemorySaver):
+    """
+    An ``InMemorySaver`` with LRU eviction of threads, a cap on the checkpoints
+    kept per thread and a ceiling on the bytes held.
+
+    Reading or writing a thread marks it as recently used. When a limit is
+    exceeded the least recently used threads are deleted, but never the thread
+    being written.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_threads: int = IN_MEMORY_MAX_THREADS,
+        max_checkpoints_per_thread: int = IN_MEMORY_MAX_CHECKPOINTS_PER_THREAD,
+        max_bytes: int = int(IN_MEMORY_MAX_MB * _MB),
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.max_checkpoints_per_thread = max_checkpoints_per_thread
+        self.max_bytes = max_bytes
+        # thread id -> bytes held, least recently used first
+        self._threads: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        # Per-thread indexes of the writes and blob keys, so a thread is deleted
+        # without scanning every key of every other thread.
+        self._thread_writes: Dict[str, Set[Tuple[str, str, str]]] = defaultdict(set)
+        self._thread_blobs: Dict[str, Set[Tuple]] = defaultdict(set)
+        # thread id -> (checkpoint ns, checkpoint id) -> channel versions it reads
+        self._versions: Dict[str, Dict[Tuple[str, str], ChannelVersions]] = defaultdict(
+            dict
+        )
+        self._evicted_threads = 0
+        self._pruned_checkpoints = 0
+        self._lock = RLock()
+
+    def _add_bytes(self, thread_id: str, size: int):
+        self._threads[thread_id] = self._threads.get(thread_id, 0) + size
+        self._threads.move_to_end(thread_id)
+        self._bytes += size
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        with self._lock:
+            thread_id = config["configurable"]["thread_id"]
+            if thread_id in self._threads:
+                self._threads.move_to_end(thread_id)
+            checkpoint_tuple = super().get_tuple(config)
+            self._discard_read_entries(thread_id, checkpoint_tuple)
+            return checkpoint_tuple
+
+    def list(self, config: RunnableConfig | None, **kwargs: Any):
+        for checkpoint_tuple in super().list(config, **kwargs):
+            with self._lock:
+                self._discard_read_entries(
+                    checkpoint_tuple.config["configurable"]["thread_id"],
+                    checkpoint_tuple,
+                )
+            yield checkpoint_tuple
+        if config:
+            with self._lock:
+                self._discard_read_entries(config["configurable"]["thread_id"], None)
+
+    def _discard_read_entries(self, thread_id: str, checkpoint_tuple):
+        """
+        Removes the empty entries the stock reads leave behind: its defaultdicts
+        create one for every unknown thread and for every checkpoint without writes.
+        """
+        if thread_id not in self._threads and not any(
+            self.storage.get(thread_id, {}).values()
+        ):
+            self.storage.pop(thread_id, None)
+        if checkpoint_tuple:
+            configurable = checkpoint_tuple.config["configurable"]
+            key = (
+                thread_id,
+                configurable["checkpoint_ns"],
+                configurable["checkpoint_id"],
+            )
+            if key in self.writes and not self.writes[key]:
+                del self.writes[key]
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        with self._lock:
+            result = super().put(config, checkpoint, metadata, new_versions)
+            thread_id = config["configurable"]["thread_id"]
+            checkpoint_ns = config["configurable"]["checkpoint_ns"]
+            stored, stored_metadata, _ = self.storage[thread_id][checkpoint_ns][
+                checkpoint["id"]
+            ]
+            size = _typed_size(stored) + _typed_size(stored_metadata)
+            for channel, version in new_versions.items():
+                key = (thread_id, checkpoint_ns, channel, version)
+                self._thread_blobs[thread_id].add(key)
+                size += _typed_size(self.blobs[key])
+            self._versions[thread_id][(checkpoint_ns, checkpoint["id"])] = dict(
+                checkpoint["channel_versions"]
+            )
+            self._add_bytes(thread_id, size)
+            self._prune(thread_id, checkpoint_ns)
+            self._evict(keep=thread_id)
+            return result
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        with self._lock:
+            thread_id = config["configurable"]["thread_id"]
+            outer_key = (
+                thread_id,
+                config["configurable"].get("checkpoint_ns", ""),
+                config["configurable"]["checkpoint_id"],
+            )
+            before = self._writes_size(outer_key)
+            super().put_writes(config, writes, task_id, task_path)
+            self._thread_writes[thread_id].add(outer_key)
+            self._add_bytes(thread_id, self._writes_size(outer_key) - before)
+            self._evict(keep=thread_id)
+
+    def _writes_size(self, outer_key: Tuple[str, str, str]) -> int:
+        writes = self.writes.get(outer_key)
+        return sum(_typed_size(write[2]) for write in writes.values()) if writes else 0
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self.storage.pop(thread_id, None)
+            for key in self._thread_writes.pop(thread_id, ()):
+                self.writes.pop(key, None)
+            for key in self._thread_blobs.pop(thread_id, ()):
+                self.blobs.pop(key, None)
+            self._versions.pop(thread_id, None)
+            self._bytes -= self._threads.pop(thread_id, 0)
+
+    def _prune(self, thread_id: str, checkpoint_ns: str):
+        """Drops the oldest checkpoints of a namespace beyond the per-thread cap."""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        excess = len(checkpoints) - self.max_checkpoints_per_thread
+        if excess <= 0:
+            return
+        freed = 0
+        versions = self._versions[thread_id]
+        # Checkpoint ids are time-ordered; sorting guards against out-of-order puts.
+        for checkpoint_id in sorted(checkpoints)[:excess]:
+            stored, stored_metadata, _ = checkpoints.pop(checkpoint_id)
+            freed += _typed_size(stored) + _typed_size(stored_metadata)
+            versions.pop((checkpoint_ns, checkpoint_id), None)
+            outer_key = (thread_id, checkpoint_ns, checkpoint_id)
+            freed += self._writes_size(outer_key)
+            self.writes.pop(outer_key, None)
+            self._thread_writes[thread_id].discard(outer_key)
+        # Channel values only the dropped checkpoints read.
+        referenced = {
+            (thread_id, checkpoint_ns, channel, version)
+            for checkpoint_id in checkpoints
+            for channel, version in versions.get(
+                (checkpoint_ns, checkpoint_id), {}
+            ).items()
+        }
+        blobs = self._thread_blobs[thread_id]
+        for key in [k for k in blobs if k[1] == checkpoint_ns and k not in referenced]:
+            blob = self.blobs.pop(key, None)
+            freed += _typed_size(blob) if blob else 0
+            blobs.discard(key)
+        self._pruned_checkpoints += excess
+        self._add_bytes(thread_id, -freed)
+
+    def _evict(self, keep: str):
+        while len(self._threads) > 1 and (
+            len(self._threads) > self.max_threads or self._bytes > self.max_bytes
+        ):
+            thread_id = next(iter(self._threads))
+            if thread_id == keep:
+                self._threads.move_to_end(keep)
+                thread_id = next(iter(self._threads))
+            self.delete_thread(thread_id)
+            self._evicted_threads += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "threads": len(self._threads),
+                "checkpoints": sum(len(v) for v in self._versions.values()),
+                "bytes": self._bytes,
+                "max_threads": self.max_threads,
+                "max_checkpoints_per_thread": self.max_checkpoints_per_thread,
+                "max_bytes": self.max_bytes,
+                "evicted_threads": self._evicted_threads,
+                "pruned_checkpoints": self._pruned_checkpoints,
+            }
+
+
+class BoundedInMemoryStore(InMemoryStore):
+    """
+    An ``InMemoryStore`` that evicts the least recently read or written items
+    beyond a count or a byte ceiling.
+
+    An item's size is that of its JSON-encoded value.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_items: int = IN_MEMORY_STORE_MAX_ITEMS,
+        max_bytes: int = int(IN_MEMORY_STORE_MAX_MB * _MB),
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        # (namespace, key) -> bytes, least recently used first
+        self._items: "OrderedDict[Tuple[Tuple[str, ...], str], int]" = OrderedDict()
+        self._bytes = 0
+        self._evicted_items = 0
+        self._lock = RLock()
+
+    def batch(self, ops: Iterable[Op]) -> List[Result]:
+        ops = list(ops)
+        with self._lock:
+            results = super().batch(ops)
+            self._touch(ops)
+            return results
+
+    async def abatch(self, ops: Iterable[Op]) -> List[Result]:
+        ops = list(ops)
+        results = await super().abatch(ops)
+        with self._lock:
+            self._touch(ops)
+        return results
+
+    def _apply_put_ops(self, put_ops: Dict[Tuple[Tuple[str, ...], str], PutOp]) -> None:
+        with self._lock:
+            super()._apply_put_ops(put_ops)
+            for (namespace, key), op in put_ops.items():
+                self._bytes -= self._items.pop((namespace, key), 0)
+                if op.value is None:
+                    self._drop_empty(namespace)
+                else:
+                    size = len(json.dumps(op.value, default=str).encode("utf-8"))
+                    self._items[(namespace, key)] = size
+                    self._bytes += size
+            self._evict()
+
+    def _touch(self, ops: Sequence[Op]):
+        for op in ops:
+            if isinstance(op, GetOp) and (op.namespace, op.key) in self._items:
+                self._items.move_to_end((op.namespace, op.key))
+
+    def _drop_empty(self, namespace: Tuple[str, ...]):
+        # The stock store leaves empty namespaces behind after deletes.
+        if not self._data.get(namespace):
+            self._data.pop(namespace, None)
+            self._vectors.pop(namespace, None)
+
+    def _evict(self):
+        while self._items and (
+            len(self._items) > self.max_items or self._bytes > self.max_bytes
+        ):
+            (namespace, key), size = self._items.popitem(last=False)
+            self._bytes -= size
+            self._data[namespace].pop(key, None)
+            self._vectors[namespace].pop(key, None)
+            self._drop_empty(namespace)
+            self._evicted_items += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "items": len(self._items),
+                "namespaces": len(self._data),
+                "bytes": self._bytes,
+                "max_items": self.max_items,
+                "max_bytes": self.max_bytes,
+                "evicted_items": self._evicted_items,
+            }
@@ -0,0 +1,98 @@
+"""
+This module provides a registry of compiled graphs.
+
+Each graph is compiled once per checkpointer backend and the compiled graph is
+shared read-only by every request, so no request ever needs to mutate a graph
+(e.g. by assigning ``graph.checkpointer``) to bind its own saver.
+
+Builders can be registered as ``"module:function"`` paths so that a graph's
+module, and everything it imports, is only loaded when the graph is first used.
+"""
+
+import importlib
+from threading import RLock
+from typing import Callable, Dict, Optional, Tuple, Union
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.graph.state import CompiledStateGraph
+
+GraphBuilder = Callable[[Optional[BaseCheckpointSaver]], CompiledStateGraph]
+
+
+class GraphRegistry:
+    """Compiles registered graphs lazily and caches them per checkpointer."""
+
+    def __init__(self):
+        self._builders: Dict[str, Union[GraphBuilder, str]] = {}
+        # (graph name, id(checkpointer)) -> (checkpointer, compiled graph)
+        # The checkpointer is kept alive alongside the graph so its id is never reused.
+        self._compiled: Dict[
+            Tuple[str, int], Tuple[Optional[BaseCheckpointSaver], CompiledStateGraph]
+        ] = {}
+        # Reentrant so that a builder can get the graphs it is composed of.
+        self._lock = RLock()
+
+    def register(self, name: str, builder: Union[GraphBuilder, str]) -> None:
+        """
+        Registers a graph builder under the given name.
+
+        Args:
+            name: The name used to look the graph up.
+            builder: A callable taking a checkpointer and returning a compiled graph,
+                or the ``"module:function"`` path of one, imported on first use.
+        """
+        with self._lock:
+            self._builders[name] = builder
+            for key in [key for key in self._compiled if key[0] == name]:
+                del self._compiled[key]
+
+    def get(
+        self, name: str, checkpointer: Optional[BaseCheckpointSaver] = None
+    ) -> CompiledStateGraph:
+        """
+        Returns the graph compiled against the given checkpointer.
+
+        The graph is compiled on first use and the same instance is returned for
+        every later call with the same checkpointer.
+
+        Args:
+            name: The name of a registered graph.
+            checkpointer: The checkpointer backend the graph should persist to.
+
+        Returns:
+            The compiled graph. Callers must treat it as immutable.
+        """
+        key = (name, id(checkpointer))
+        entry = self._compiled.get(key)
+        if entry is not None:
+            return entry[1]
+
+        with self._lock:
+            entry = self._compiled.get(key)
+            if entry is None:
+                if name not in self._builders:
+                    raise KeyError(f"Unknown graph: {name}")
+                graph = self._builder(name)(checkpointer)
+                entry = (checkpointer, graph)
+                self._compiled[key] = entry
+            return entry[1]
+
+    def _builder(self, name: str) -> GraphBuilder:
+        builder = self._builders[name]
+        if isinstance(builder, str):
+            module_name, _, attribute = builder.partition(":")
+            builder = getattr(importlib.import_module(module_name), attribute)
+            self._builders[name] = builder
+        return builder
+
+    def names(self) -> list:
+        """Returns the names of all registered graphs."""
+        return list(self._builders)
+
+
+graph_registry = GraphRegistry()
+
+# The agent graphs are imported and compiled on first use.
+graph_registry.register("planner", "src.agents.planner:build_planner")
+graph_registry.register("researcher", "src.agents.researcher:build_researcher")
+graph_registry.register("supervisor", "src.agents.supervisor:build_supervisor")
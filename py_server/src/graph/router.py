@@ -0,0 +1,193 @@
+"""
+This module provides the fast-path router placed in front of the supervisor.
+
+The LLM supervisor spends a model call deciding whom to hand a turn to, and
+another one after the sub-agent returns. Turns whose intent is obvious from
+their wording are routed by rules instead: greetings and thanks are answered
+directly, explicit search requests go straight to the researcher and explicit
+planning requests to the planner. Everything else falls back to the LLM
+supervisor. The metrics report how many turns took each route, the handoffs
+they made and the supervisor latency the fast path saved.
+"""
+
+import os
+import re
+import statistics
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Deque, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage, HumanMessage, ToolMessage
+
+# Turn the rule-based fast path on or off.
+SUPERVISOR_FAST_PATH = os.getenv("SUPERVISOR_FAST_PATH", "true").lower() in ("1", "true")
+
+ROUTE_DIRECT = "direct"
+ROUTE_PLANNER = "planner"
+ROUTE_RESEARCHER = "researcher"
+ROUTE_SUPERVISOR = "supervisor"
+
+# LLM supervisor calls a fast-path turn avoids: the handoff decision, plus the
+# call that reviews the sub-agent's answer when a sub-agent is used.
+HOPS_AVOIDED = {ROUTE_DIRECT: 1, ROUTE_PLANNER: 2, ROUTE_RESEARCHER: 2}
+
+_TRAILING = r"[\s!！。.~～?？,，]*"
+_GREETINGS = re.compile(
+    r"^(你好|您好|嗨|哈喽|早上好|中午好|下午好|晚上好|早安|晚安|hi|hello|hey)"
+    r"(呀|啊|哦)?" + _TRAILING + "$",
+    re.IGNORECASE,
+)
+_THANKS = re.compile(
+    r"^(谢谢|多谢|感谢|谢啦|thanks|thank you|thx)(你|您)?(了|啦)?" + _TRAILING + "$",
+    re.IGNORECASE,
+)
+_FAREWELLS = re.compile(r"^(再见|拜拜|bye|goodbye)" + _TRAILING + "$", re.IGNORECASE)
+_SEARCH = re.compile(
+    r"^(请|帮我|麻烦)?(搜索|搜一下|搜搜|查一下|查查|检索|search( for)?|look up|google)\s*\S",
+    re.IGNORECASE,
+)
+_PLAN = re.compile(
+    r"^(请|帮我|麻烦)?(制定|规划|列出|拟定|做)(一个|一份|一下)?.{0,12}(计划|规划|步骤|方案)"
+    r"|^(make|create|draft) (a |an )?.{0,20}plan\b",
+    re.IGNORECASE,
+)
+
+DIRECT_REPLIES = {
+    "greeting": "你好！我可以帮你做资料检索、制定计划或深入研究某个问题，请告诉我你想了解什么。",
+    "thanks": "不客气！还有其他需要研究的问题随时告诉我。",
+    "farewell": "再见，有需要随时找我！",
+}
+
+
+@dataclass
+class RouteDecision:
+    route: str
+    reason: str
+    reply: Optional[str] = None
+
+
+def classify(messages: List[BaseMessage]) -> RouteDecision:
+    """Routes the latest turn; anything that is not clear-cut goes to the supervisor."""
+    if not SUPERVISOR_FAST_PATH or not messages or not isinstance(
+        messages[-1], HumanMessage
+    ):
+        return RouteDecision(ROUTE_SUPERVISOR, "not a new user turn")
+    text = messages[-1].text().strip()
+    if not text or len(text) > 200:
+        return RouteDecision(ROUTE_SUPERVISOR, "empty or long message")
+    for kind, pattern in (
+        ("greeting", _GREETINGS),
+        ("thanks", _THANKS),
+        ("farewell", _FAREWELLS),
+    ):
+        if pattern.match(text):
+            return RouteDecision(ROUTE_DIRECT, kind, DIRECT_REPLIES[kind])
+    if _PLAN.search(text):
+        return RouteDecision(ROUTE_PLANNER, "planning request")
+    if _SEARCH.match(text):
+        return RouteDecision(ROUTE_RESEARCHER, "search request")
+    return RouteDecision(ROUTE_SUPERVISOR, "uncertain")
+
+
+def count_handoffs(messages: List[BaseMessage]) -> int:
+    """Handoffs to sub-agents among the given messages (returns are not counted)."""
+    return sum(
+        1
+        for message in messages
+        if isinstance(message, ToolMessage)
+        and (message.name or "").startswith("transfer_to_")
+    )
+
+
+class RouterMetrics:
+    """Per-worker counters of routes, handoffs and supervisor latency."""
+
+    def __init__(self, window: int = 200):
+        self._routes: Counter = Counter()
+        self._handoffs = 0
+        self._hops_avoided = 0
+        self._saved_seconds = 0.0
+        # Durations of the LLM supervisor's own model calls.
+        self._hop_seconds: Deque[float] = deque(maxlen=window)
+        self._recent: Deque[Dict] = deque(maxlen=20)
+        self._lock = Lock()
+
+    def hop_latency(self) -> float:
+        with self._lock:
+            return statistics.median(self._hop_seconds) if self._hop_seconds else 0.0
+
+    def record_hop(self, seconds: float):
+        with self._lock:
+            self._hop_seconds.append(seconds)
+
+    def record_turn(self, decision: RouteDecision, handoffs: int, seconds: float):
+        hops = HOPS_AVOIDED.get(decision.route, 0)
+        saved = hops * self.hop_latency()
+        with self._lock:
+            self._routes[decision.route] += 1
+            self._handoffs += handoffs
+            self._hops_avoided += hops
+            self._saved_seconds += saved
+            self._recent.append(
+                {
+                    "route": decision.route,
+                    "reason": decision.reason,
+                    "handoffs": handoffs,
+                    "ms": round(seconds * 1000),
+                    "saved_ms": round(saved * 1000),
+                }
+            )
+
+    def snapshot(self) -> Dict:
+        hop = self.hop_latency()
+        with self._lock:
+            turns = sum(self._routes.values())
+            return {
+                "turns": turns,
+                "routes": dict(self._routes),
+                "handoffs": self._handoffs,
+                "handoffs_per_turn": round(self._handoffs / turns, 2) if turns else 0.0,
+                "supervisor_hop_p50_ms": round(hop * 1000, 1),
+                "llm_hops_avoided": self._hops_avoided,
+                "saved_ms": round(self._saved_seconds * 1000),
+                "recent": list(self._recent),
+            }
+
+
+router_metrics = RouterMetrics()
+
+
+class SupervisorHopTimer(BaseCallbackHandler):
+    """Times the model calls made by the LLM supervisor itself, not its sub-agents."""
+
+    run_inline = True
+
+    def __init__(self, metrics: RouterMetrics = router_metrics, name: str = "supervisor"):
+        self.metrics = metrics
+        self.prefix = f"{name}:"
+        self._started: Dict[UUID, float] = {}
+
+    def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[BaseMessage]],
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> Any:
+        namespace = (metadata or {}).get("checkpoint_ns", "")
+        if namespace.rsplit("|", 1)[-1].startswith(self.prefix):
+            self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> Any:
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            self.metrics.record_hop(time.perf_counter() - started)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> Any:
+        self._started.pop(run_id, None)
@@ -0,0 +1,284 @@
+"""
+Admission control for outbound LLM calls.
+
+Each model gets a requests-per-minute and a tokens-per-minute token bucket. A
+call that finds the buckets empty waits in a queue that is served round-robin
+across users, so one user's burst cannot starve everybody else. Once the queue
+is full, new chats are rejected up front with a retry delay instead of adding
+to a 429 retry storm at the provider.
+
+The limiter plugs into the chat model's `rate_limiter=` hook, so cached
+responses skip it. Token usage is only known after a call, so it is debited
+when the call ends and later calls wait until the bucket has refilled.
+"""
+
+import asyncio
+import json
+import math
+import os
+import statistics
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from threading import Lock
+from typing import Any, Deque, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.rate_limiters import BaseRateLimiter
+
+# Default limits per model; 0 means unlimited.
+LLM_RPM = int(os.getenv("LLM_RPM", "0"))
+LLM_TPM = int(os.getenv("LLM_TPM", "0"))
+# Per-model overrides: {"model-id": {"rpm": 60, "tpm": 100000}, ...}
+LLM_RATE_LIMITS = os.getenv("LLM_RATE_LIMITS", "")
+# LLM calls allowed to wait across all models before new chats are rejected.
+LLM_ADMISSION_MAX_QUEUE = int(os.getenv("LLM_ADMISSION_MAX_QUEUE", "100"))
+
+# The user a call is made for, used to share the queue fairly between users.
+current_user: ContextVar[str] = ContextVar("llm_admission_user", default="anonymous")
+
+
+class AdmissionRejected(Exception):
+    """Raised when the admission queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"LLM admission queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """A continuously refilling bucket; a limit of 0 never blocks."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float = 1) -> float:
+        """Seconds until `amount` can be taken."""
+        if not self.capacity:
+            return 0.0
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float = 1):
+        """Takes `amount`; the level may go negative when usage is debited late."""
+        if self.capacity:
+            self._refill()
+            self.level -= amount
+
+
+class ModelLimiter(BaseRateLimiter):
+    """The buckets and the fair wait queue of one model."""
+
+    def __init__(
+        self, controller: "AdmissionController", model: str, rpm: int, tpm: int
+    ):
+        self.controller = controller
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.usage_handler = UsageCallback(self)
+        self._waiting: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._lock = Lock()
+
+    def _delay(self) -> float:
+        return max(self.requests.delay(), self.tokens.delay())
+
+    def depth(self) -> int:
+        return sum(len(waiters) for waiters in self._waiting.values())
+
+    def retry_after(self) -> float:
+        """Rough time for the current queue to drain at the request rate."""
+        if not self.requests.rate:
+            return 1.0
+        return (self.depth() + 1) / self.requests.rate
+
+    def record_usage(self, tokens: int):
+        """Debits the tokens a finished call used."""
+        with self._lock:
+            self.tokens.take(tokens)
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        """Blocking variant for synchronous calls, without fair queuing."""
+        while True:
+            with self._lock:
+                delay = self._delay()
+                if not delay:
+                    self.requests.take()
+                    return True
+            if not blocking:
+                return False
+            time.sleep(delay)
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        with self._lock:
+            if not self._waiting and not self._delay():
+                self.requests.take()
+                self.controller.record_wait(0.0)
+                return True
+        if not blocking:
+            return False
+        self.controller.check()
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(current_user.get(), deque()).append(future)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        started = time.monotonic()
+        await future
+        self.controller.record_wait(time.monotonic() - started)
+        return True
+
+    async def _dispatch(self):
+        """Admits waiting calls as the buckets allow, one user at a time in turn."""
+        while self._waiting:
+            with self._lock:
+                delay = self._delay()
+            if delay:
+                await asyncio.sleep(delay)
+                continue
+            user, waiters = next(iter(self._waiting.items()))
+            future = waiters.popleft()
+            if waiters:
+                self._waiting.move_to_end(user)
+            else:
+                del self._waiting[user]
+            if future.cancelled():
+                continue
+            with self._lock:
+                self.requests.take()
+            future.set_result(None)
+
+
+class UsageCallback(BaseCallbackHandler):
+    """Debits the tokens of each finished call from the model's tokens bucket."""
+
+    run_inline = True
+
+    def __init__(self, limiter: ModelLimiter):
+        self.limiter = limiter
+        self._prompt_tokens: Dict[UUID, int] = {}
+
+    def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[BaseMessage]],
+        *,
+        run_id: UUID,
+        **kwargs: Any,
+    ) -> Any:
+        self._prompt_tokens[run_id] = sum(map(count_tokens_approximately, messages))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> Any:
+        estimate = self._prompt_tokens.pop(run_id, 0)
+        if not _is_cache_hit(response):
+            self.limiter.record_usage(usage_tokens(response) or estimate)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> Any:
+        self._prompt_tokens.pop(run_id, None)
+
+
+def _is_cache_hit(response: LLMResult) -> bool:
+    return any(
+        isinstance(generation, ChatGeneration)
+        and generation.message.response_metadata.get("cache_hit")
+        for generations in response.generations
+        for generation in generations
+    )
+
+
+def usage_tokens(response: LLMResult) -> int:
+    """Total tokens reported by the provider, or 0 if the response has no usage."""
+    total = 0
+    for generations in response.generations:
+        for generation in generations:
+            if isinstance(generation, ChatGeneration):
+                usage = getattr(generation.message, "usage_metadata", None) or {}
+                total += usage.get("total_tokens", 0)
+    return total
+
+
+class AdmissionController:
+    """Creates the per-model limiters and keeps the admission metrics."""
+
+    def __init__(
+        self,
+        max_queue: int = LLM_ADMISSION_MAX_QUEUE,
+        rpm: int = LLM_RPM,
+        tpm: int = LLM_TPM,
+        overrides: Optional[Dict[str, Dict]] = None,
+    ):
+        self.max_queue = max_queue
+        self.rpm = rpm
+        self.tpm = tpm
+        self.overrides = overrides or {}
+        self._limiters: Dict[str, ModelLimiter] = {}
+        self._waits: Deque[float] = deque(maxlen=1000)
+        self._admitted = 0
+        self._rejected = 0
+
+    def limiter(self, model: str) -> Optional[ModelLimiter]:
+        """Returns the limiter of a model, or None when it has no limits."""
+        if model not in self._limiters:
+            limits = self.overrides.get(model, {})
+            rpm, tpm = limits.get("rpm", self.rpm), limits.get("tpm", self.tpm)
+            if not rpm and not tpm:
+                return None
+            self._limiters[model] = ModelLimiter(self, model, rpm, tpm)
+        return self._limiters[model]
+
+    def queue_depth(self) -> int:
+        return sum(limiter.depth() for limiter in self._limiters.values())
+
+    def check(self):
+        """
+        Raises:
+            AdmissionRejected: If the queue is full, with the suggested retry delay.
+        """
+        if self.queue_depth() >= self.max_queue:
+            self._rejected += 1
+            retry_after = max(
+                (limiter.retry_after() for limiter in self._limiters.values()),
+                default=1.0,
+            )
+            raise AdmissionRejected(max(1, math.ceil(retry_after)))
+
+    def record_wait(self, seconds: float):
+        self._admitted += 1
+        self._waits.append(seconds)
+
+    def stats(self) -> Dict:
+        waits = list(self._waits)
+        return {
+            "queue_depth": self.queue_depth(),
+            "max_queue": self.max_queue,
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "wait_p50_ms": round(statistics.median(waits) * 1000, 1) if waits else 0.0,
+            "wait_max_ms": round(max(waits) * 1000, 1) if waits else 0.0,
+            "models": {
+                model: {
+                    "queued": limiter.depth(),
+                    "requests_available": round(limiter.requests.level, 1),
+                    "tokens_available": round(limiter.tokens.level, 1),
+                }
+                for model, limiter in self._limiters.items()
+            },
+        }
+
+
+admission = AdmissionController(
+    overrides=json.loads(LLM_RATE_LIMITS) if LLM_RATE_LIMITS.strip() else None
+)
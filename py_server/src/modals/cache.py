@@ -0,0 +1,306 @@
+"""
+An opt-in response cache for the chat model.
+
+The cache plugs into LangChain's `cache=` hook on the chat model and has two
+tiers:
+
+1. Exact: the normalized prompt (message types and whitespace/case-folded
+   contents, system prompt included, plus every other field sent to the model
+   such as tool calls and tool call ids) and the `llm_string` LangChain passes
+   in, which covers the model parameters and the bound tools.
+2. Semantic: for single plain-question prompts, the embedding of the question is
+   compared with previously answered questions under the same model and system
+   prompt, and a close enough match is served instead.
+
+On a hit the cached message is emitted through the graph's `messages` stream in
+one piece, so `/api/chat` sends it over the usual SSE path.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.embeddings import Embeddings
+from langchain_core.outputs import ChatGeneration
+
+if TYPE_CHECKING:
+    import numpy as np
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() in ("1", "true")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+# 0 keeps entries until they are evicted by size.
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+# Leave empty to use the exact tier only.
+LLM_CACHE_EMBEDDING_MODEL = os.getenv("LLM_CACHE_EMBEDDING_MODEL", "")
+# Cosine similarity a question needs to reuse another question's answer.
+LLM_CACHE_SIMILARITY = float(os.getenv("LLM_CACHE_SIMILARITY", "0.95"))
+
+# Serialized message fields that are not sent to the model, so not part of the key.
+_UNSENT_FIELDS = frozenset(
+    {"content", "type", "id", "response_metadata", "usage_metadata"}
+)
+
+Turns = List[Tuple[str, str, str]]
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+def _sent_fields(kwargs: Dict) -> str:
+    """Encodes the non-empty fields, besides the content, that are sent to the model."""
+    fields = {
+        key: value
+        for key, value in kwargs.items()
+        if key not in _UNSENT_FIELDS and value not in (None, "", [], {})
+    }
+    return json.dumps(fields, ensure_ascii=False, sort_keys=True)
+
+
+def parse_prompt(prompt: str) -> Tuple[str, Turns]:
+    """
+    Splits a serialized LangChain prompt into the system prompt and the other turns.
+
+    Returns:
+        A tuple of (system prompt, [(message type, normalized content, other
+        fields as JSON), ...]). The other fields hold tool calls, tool call ids,
+        names and additional kwargs.
+    """
+    system, turns = [], []
+    for item in json.loads(prompt):
+        kind = item.get("id", ["?"])[-1]
+        kwargs = item.get("kwargs", {})
+        content = kwargs.get("content", "")
+        if not isinstance(content, str):
+            content = json.dumps(content, ensure_ascii=False, sort_keys=True)
+        fields = _sent_fields(kwargs)
+        if kind == "SystemMessage":
+            system.append(normalize_text(content) + ("" if fields == "{}" else fields))
+        else:
+            turns.append((kind, normalize_text(content), fields))
+    return "\n".join(system), turns
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def _fresh(generations: RETURN_VAL_TYPE) -> RETURN_VAL_TYPE:
+    """
+    Copies cached generations without message ids, so each hit is a new message,
+    and marks them as cache hits so they are not counted as provider usage.
+    """
+    return [
+        generation.model_copy(
+            update={
+                "message": generation.message.model_copy(
+                    update={
+                        "id": None,
+                        "usage_metadata": None,
+                        "response_metadata": {
+                            **generation.message.response_metadata,
+                            "cache_hit": True,
+                        },
+                    }
+                )
+            }
+        )
+        if isinstance(generation, ChatGeneration)
+        else generation
+        for generation in generations
+    ]
+
+
+def _unit(vector: Sequence[float]) -> np.ndarray:
+    # numpy is only needed by the semantic tier, so it is imported on first use.
+    import numpy as np
+
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+@dataclass
+class _Entry:
+    value: RETURN_VAL_TYPE
+    namespace: str
+    expires_at: float
+    vector: Optional[np.ndarray] = None
+
+
+@dataclass
+class _Keys:
+    exact: str
+    namespace: str
+    # The question used for the semantic tier, if the prompt is a single question.
+    question: Optional[str]
+
+
+class ResponseCache(BaseCache):
+    """An in-process LRU/TTL cache of chat model responses with a semantic tier."""
+
+    def __init__(
+        self,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+        embeddings: Optional[Embeddings] = None,
+        similarity: float = LLM_CACHE_SIMILARITY,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.embeddings = embeddings
+        self.similarity = similarity
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # Question vectors computed by a missed lookup, reused by the update after it.
+        self._pending_vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = Lock()
+        self._counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+        self._evictions = 0
+
+    def _keys(self, prompt: str, llm_string: str) -> _Keys:
+        system, turns = parse_prompt(prompt)
+        exact = _digest(llm_string, system, json.dumps(turns, ensure_ascii=False))
+        question = None
+        if self.embeddings and len(turns) == 1:
+            kind, content, fields = turns[0]
+            if kind == "HumanMessage" and fields == "{}":
+                question = content
+        return _Keys(exact, _digest(llm_string, system), question)
+
+    def _get_exact(self, key: str) -> Optional[RETURN_VAL_TYPE]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at and entry.expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self._counters["exact_hits"] += 1
+            return entry.value
+
+    def _get_similar(
+        self, keys: _Keys, vector: Optional[np.ndarray]
+    ) -> Optional[RETURN_VAL_TYPE]:
+        """Looks up the closest cached question; counts a miss if there is none."""
+        now = time.time()
+        with self._lock:
+            if vector is None:
+                self._counters["misses"] += 1
+                return None
+            self._remember_vector(keys.exact, vector)
+            candidates = [
+                (key, entry)
+                for key, entry in self._entries.items()
+                if entry.namespace == keys.namespace
+                and entry.vector is not None
+                and not (entry.expires_at and entry.expires_at < now)
+            ]
+            if candidates:
+                import numpy as np
+
+                scores = np.stack([entry.vector for _, entry in candidates]) @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity:
+                    key, entry = candidates[best]
+                    self._entries.move_to_end(key)
+                    self._counters["semantic_hits"] += 1
+                    return entry.value
+            self._counters["misses"] += 1
+            return None
+
+    def _remember_vector(self, key: str, vector: np.ndarray):
+        self._pending_vectors[key] = vector
+        while len(self._pending_vectors) > self.max_entries:
+            self._pending_vectors.popitem(last=False)
+
+    def _put(self, keys: _Keys, value: RETURN_VAL_TYPE, vector: Optional[np.ndarray]):
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds else 0.0
+        with self._lock:
+            self._entries[keys.exact] = _Entry(
+                value, keys.namespace, expires_at, vector
+            )
+            self._entries.move_to_end(keys.exact)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def _pop_vector(self, keys: _Keys) -> Tuple[Optional[np.ndarray], bool]:
+        """Returns (vector, needs_embedding) for storing an entry."""
+        if keys.question is None:
+            return None, False
+        with self._lock:
+            vector = self._pending_vectors.pop(keys.exact, None)
+        return vector, vector is None
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        keys = self._keys(prompt, llm_string)
+        value = self._get_exact(keys.exact)
+        if value is None:
+            vector = None
+            if keys.question is not None:
+                try:
+                    vector = _unit(self.embeddings.embed_query(keys.question))
+                except Exception as e:
+                    print(f"❌ Embedding the cache query failed: {e}")
+            value = self._get_similar(keys, vector)
+        return _fresh(value) if value is not None else None
+
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        keys = self._keys(prompt, llm_string)
+        value = self._get_exact(keys.exact)
+        if value is None:
+            vector = None
+            if keys.question is not None:
+                try:
+                    vector = _unit(await self.embeddings.aembed_query(keys.question))
+                except Exception as e:
+                    print(f"❌ Embedding the cache query failed: {e}")
+            value = self._get_similar(keys, vector)
+        return _fresh(value) if value is not None else None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        keys = self._keys(prompt, llm_string)
+        vector, needs_embedding = self._pop_vector(keys)
+        if needs_embedding:
+            try:
+                vector = _unit(self.embeddings.embed_query(keys.question))
+            except Exception as e:
+                print(f"❌ Embedding the cached question failed: {e}")
+        self._put(keys, return_val, vector)
+
+    async def aupdate(
+        self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE
+    ) -> None:
+        keys = self._keys(prompt, llm_string)
+        vector, needs_embedding = self._pop_vector(keys)
+        if needs_embedding:
+            try:
+                vector = _unit(await self.embeddings.aembed_query(keys.question))
+            except Exception as e:
+                print(f"❌ Embedding the cached question failed: {e}")
+        self._put(keys, return_val, vector)
+
+    def clear(self, **kwargs) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._pending_vectors.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = sum(self._counters.values())
+            hits = lookups - self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "evictions": self._evictions,
+            }
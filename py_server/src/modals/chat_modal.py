@@ -1,19 +1,68 @@
 import os
 
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 
 load_dotenv()
 
+# 以下模块在导入时读取环境变量，需要在 load_dotenv 之后导入（因此忽略 E402）
+from .cache import LLM_CACHE_EMBEDDING_MODEL, LLM_CACHE_ENABLED, ResponseCache  # noqa: E402
+from .admission import admission  # noqa: E402
+from .pool import ModelPool, load_backend_configs  # noqa: E402
+
 API_KEY = os.getenv("API_KEY")
 LLM_URL = os.getenv("LLM_URL")
 MODEL = os.getenv("MODEL")
 
-chat_modal = ChatOpenAI(
-    api_key=API_KEY,
-    base_url=LLM_URL,
-    model=MODEL,
-)
+# 可选的响应缓存，LLM_CACHE_ENABLED 关闭时为 None（不缓存）
+llm_cache = None
+if LLM_CACHE_ENABLED:
+    embeddings = None
+    if LLM_CACHE_EMBEDDING_MODEL:
+        embeddings = OpenAIEmbeddings(
+            api_key=API_KEY,
+            base_url=LLM_URL,
+            model=LLM_CACHE_EMBEDDING_MODEL,
+            # OpenAI 兼容服务不一定支持按 token 数组传入
+            check_embedding_ctx_length=False,
+        )
+    llm_cache = ResponseCache(embeddings=embeddings)
+
+
+def create_chat_openai(
+    model, api_key=API_KEY, base_url=LLM_URL, **kwargs
+) -> ChatOpenAI:
+    """创建 ChatOpenAI，配置了限流时挂上该模型的准入控制"""
+    limiter = admission.limiter(model)
+    if limiter:
+        kwargs["rate_limiter"] = limiter
+        # 流式响应也要返回 token 用量，用于扣减 tokens/min 配额
+        kwargs["stream_usage"] = bool(limiter.tokens.capacity)
+    return ChatOpenAI(api_key=api_key, base_url=base_url, model=model, **kwargs)
+
+
+# 配置了 LLM_POOL 时使用多后端模型池，未单独配置的 api_key/base_url 沿用上面的默认值
+backend_configs = load_backend_configs()
+if backend_configs:
+    chat_modal = ModelPool(
+        backends=[
+            create_chat_openai(
+                config["model"],
+                config.get("api_key", API_KEY),
+                config.get("base_url", LLM_URL),
+            )
+            for config in backend_configs
+        ],
+        cache=llm_cache,
+    )
+else:
+    limiter = admission.limiter(MODEL)
+    chat_modal = create_chat_openai(
+        MODEL,
+        cache=llm_cache,
+        # 模型池自行上报用量，单模型时通过回调扣减
+        callbacks=[limiter.usage_handler] if limiter else None,
+    )
 
 if __name__ == "__main__":
     print(chat_modal.invoke("你好"))
@@ -0,0 +1,352 @@
+"""
+A chat model that spreads requests over several OpenAI-compatible backends.
+
+Each request goes to the backend with the best score, computed from its rolling
+median time-to-first-token, its recent error rate and how many requests it is
+already serving. If the first token does not arrive within the hedge delay, the
+same request is also sent to the next backend and whichever answers first wins.
+A backend that fails before its first token is replaced by the next one, so a
+slow or rate-limited upstream no longer stalls every user.
+"""
+
+import asyncio
+import json
+import os
+import statistics
+from collections import deque
+from contextlib import suppress
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.language_models.chat_models import agenerate_from_stream
+from langchain_core.messages import BaseMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+# JSON list of backends: [{"base_url": ..., "api_key": ..., "model": ...}, ...]
+LLM_POOL = os.getenv("LLM_POOL", "")
+# Delay before the request is also sent to the next backend; 0 disables hedging.
+LLM_POOL_HEDGE_MS = int(os.getenv("LLM_POOL_HEDGE_MS", "1500"))
+# Number of recent requests the routing statistics are computed over.
+LLM_POOL_WINDOW = int(os.getenv("LLM_POOL_WINDOW", "50"))
+
+# Seconds added to every backend's latency so error rates still count when a
+# backend has no latency samples (e.g. because all its requests failed).
+_LATENCY_FLOOR = 0.05
+
+
+def load_backend_configs(raw: str = LLM_POOL) -> List[Dict]:
+    """Parses the LLM_POOL setting; an empty setting means no pool."""
+    if not raw.strip():
+        return []
+    configs = json.loads(raw)
+    if not isinstance(configs, list) or not all(
+        isinstance(config, dict) and config.get("model") for config in configs
+    ):
+        raise ValueError("LLM_POOL must be a JSON list of objects with a model")
+    return configs
+
+
+@dataclass
+class BackendStats:
+    """Rolling routing statistics of one backend."""
+
+    name: str
+    window: int
+    ttft: Deque[float] = field(init=False)
+    outcomes: Deque[bool] = field(init=False)
+    in_flight: int = 0
+    requests: int = 0
+    errors: int = 0
+    hedges: int = 0
+
+    def __post_init__(self):
+        self.ttft = deque(maxlen=self.window)
+        self.outcomes = deque(maxlen=self.window)
+
+    @property
+    def p50_ttft(self) -> float:
+        return statistics.median(self.ttft) if self.ttft else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def score(self) -> float:
+        """
+        Lower is better: the expected wait for a first token, scaled up by the
+        requests already in flight and by the error rate. Backends without
+        samples look fast so they get tried.
+        """
+        busy = (self.p50_ttft + _LATENCY_FLOOR) * (1 + self.in_flight)
+        return busy / max(0.05, 1.0 - self.error_rate)
+
+    def as_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "p50_ttft_ms": round(self.p50_ttft * 1000, 1),
+            "error_rate": round(self.error_rate, 3),
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "errors": self.errors,
+            "hedges": self.hedges,
+        }
+
+
+@dataclass
+class _Attempt:
+    index: int
+    iterator: AsyncIterator[ChatGenerationChunk]
+    started: float
+
+
+class ModelPool(BaseChatModel):
+    """
+    Routes chat requests over a pool of backends with hedging and failover.
+
+    Tool binding is delegated to the first backend, so the pool can be used
+    anywhere a single `ChatOpenAI` was, including `create_react_agent` and
+    `create_supervisor`.
+    """
+
+    backends: List[BaseChatModel]
+    hedge_after_ms: int = LLM_POOL_HEDGE_MS
+    window: int = LLM_POOL_WINDOW
+
+    _stats: List[BackendStats] = PrivateAttr(default_factory=list)
+    _lock: Lock = PrivateAttr(default_factory=Lock)
+
+    def model_post_init(self, __context: Any) -> None:
+        if not self.backends:
+            raise ValueError("ModelPool needs at least one backend")
+        self._stats = [
+            BackendStats(f"{index}:{_backend_name(backend)}", self.window)
+            for index, backend in enumerate(self.backends)
+        ]
+
+    @property
+    def _llm_type(self) -> str:
+        return "model-pool"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"backends": [_backend_name(backend) for backend in self.backends]}
+
+    def stats(self) -> List[Dict]:
+        with self._lock:
+            return [stats.as_dict() for stats in self._stats]
+
+    def _ranked(self) -> List[int]:
+        with self._lock:
+            return sorted(range(len(self._stats)), key=lambda i: self._stats[i].score())
+
+    def _begin(self, index: int):
+        with self._lock:
+            self._stats[index].in_flight += 1
+            self._stats[index].requests += 1
+
+    def _end(self, index: int, ok: Optional[bool]):
+        """Records the end of an attempt; ok is None when it was cut short by us."""
+        with self._lock:
+            stats = self._stats[index]
+            stats.in_flight -= 1
+            if ok is not None:
+                stats.outcomes.append(ok)
+                stats.errors += int(not ok)
+
+    def bind_tools(
+        self,
+        tools: Sequence[Any],
+        *,
+        tool_choice: Optional[Any] = None,
+        strict: Optional[bool] = None,
+        parallel_tool_calls: Optional[bool] = None,
+        **kwargs: Any,
+    ):
+        """Converts the tools with the first backend and binds the result to the pool."""
+        if tool_choice is not None:
+            kwargs["tool_choice"] = tool_choice
+        if strict is not None:
+            kwargs["strict"] = strict
+        if parallel_tool_calls is not None:
+            kwargs["parallel_tool_calls"] = parallel_tool_calls
+        bound = self.backends[0].bind_tools(tools, **kwargs)
+        return self.bind(**bound.kwargs)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """Synchronous calls only fail over; hedging needs the event loop."""
+        error: Optional[Exception] = None
+        for index in self._ranked():
+            limiter = self.backends[index].rate_limiter
+            if limiter:
+                limiter.acquire()
+            self._begin(index)
+            try:
+                result = self.backends[index]._generate(messages, stop=stop, **kwargs)
+            except Exception as e:
+                self._end(index, False)
+                print(f"❌ LLM backend {self._stats[index].name} failed: {e}")
+                error = e
+                continue
+            self._end(index, True)
+            usage = (
+                result.llm_output.get("token_usage", {}) if result.llm_output else {}
+            )
+            self._record_usage(index, messages, usage.get("total_tokens", 0))
+            return result
+        raise error
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return await agenerate_from_stream(self._astream(messages, stop, **kwargs))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        attempt, first = await self._first_chunk(messages, stop, kwargs)
+        # Stays None when the consumer stops early, which is not the backend's fault.
+        ok = None
+        tokens = _usage_tokens(first)
+        try:
+            yield first
+            async for chunk in attempt.iterator:
+                tokens += _usage_tokens(chunk)
+                yield chunk
+            ok = True
+        except Exception:
+            ok = False
+            raise
+        finally:
+            self._end(attempt.index, ok)
+            self._record_usage(attempt.index, messages, tokens)
+            with suppress(Exception):
+                await attempt.iterator.aclose()
+
+    async def _admit(
+        self, index: int, iterator: AsyncIterator[ChatGenerationChunk]
+    ) -> ChatGenerationChunk:
+        """Waits for the backend's rate limiter, if any, then for the first chunk."""
+        limiter = self.backends[index].rate_limiter
+        if limiter:
+            await limiter.aacquire()
+        return await anext(iterator)
+
+    def _record_usage(self, index: int, messages: List[BaseMessage], tokens: int):
+        """Reports a finished call's token usage to the backend's rate limiter."""
+        record_usage = getattr(self.backends[index].rate_limiter, "record_usage", None)
+        if record_usage:
+            record_usage(tokens or count_tokens_approximately(messages))
+
+    async def _first_chunk(
+        self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict
+    ) -> Tuple[_Attempt, ChatGenerationChunk]:
+        """
+        Starts the request on the best backend and waits for its first chunk.
+
+        Sends a hedge to the next backend if the first chunk is late, and moves on
+        to the next backend when an attempt fails before producing anything.
+        The winning attempt stays in flight; the others are cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        queue = self._ranked()
+        pending: Dict[asyncio.Future, _Attempt] = {}
+        error: Optional[BaseException] = None
+        hedged = False
+
+        def launch():
+            index = queue.pop(0)
+            self._begin(index)
+            iterator = aiter(
+                self.backends[index]._astream(messages, stop=stop, **kwargs)
+            )
+            task = asyncio.ensure_future(self._admit(index, iterator))
+            pending[task] = _Attempt(index, iterator, loop.time())
+
+        launch()
+        try:
+            while pending:
+                can_hedge = self.hedge_after_ms and queue and not hedged
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self.hedge_after_ms / 1000 if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    hedged = True
+                    with self._lock:
+                        self._stats[queue[0]].hedges += 1
+                    launch()
+                    continue
+
+                for task in done:
+                    attempt = pending.pop(task)
+                    if task.exception() is None:
+                        ttft = loop.time() - attempt.started
+                        with self._lock:
+                            self._stats[attempt.index].ttft.append(ttft)
+                        return attempt, task.result()
+                    error = task.exception()
+                    if isinstance(error, StopAsyncIteration):
+                        error = ValueError("The backend returned an empty response")
+                    self._end(attempt.index, False)
+                    print(
+                        f"❌ LLM backend {self._stats[attempt.index].name} failed: {error}"
+                    )
+                # Fail over, keeping the hedge running alongside if there was one.
+                if queue and (not pending or hedged):
+                    launch()
+            raise error
+        finally:
+            await self._cancel(pending)
+
+    async def _cancel(self, pending: Dict[asyncio.Future, _Attempt]):
+        """
+        Cancels the attempts that lost the race. The time they waited is recorded as
+        their time-to-first-token, a lower bound that keeps slow backends from
+        looking unmeasured and being picked first again.
+        """
+        now = asyncio.get_running_loop().time()
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for attempt in pending.values():
+            with self._lock:
+                self._stats[attempt.index].ttft.append(now - attempt.started)
+            self._end(attempt.index, None)
+            with suppress(Exception):
+                await attempt.iterator.aclose()
+
+
+def _usage_tokens(chunk: ChatGenerationChunk) -> int:
+    usage = getattr(chunk.message, "usage_metadata", None) or {}
+    return usage.get("total_tokens", 0)
+
+
+def _backend_name(backend: BaseChatModel) -> str:
+    model = getattr(backend, "model_name", None) or type(backend).__name__
+    base_url = getattr(backend, "openai_api_base", None)
+    return f"{model}@{base_url}" if base_url else model
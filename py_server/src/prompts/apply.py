@@ -1,11 +1,101 @@
+"""
+Prompt templates, compiled once per process.
+
+Every `.jinja-md` template in `templates/` is compiled when the module is
+imported, optionally through a Jinja bytecode cache, and renders are memoized
+for identical arguments. Set PROMPT_WATCH for development to reload templates
+when their files change.
+"""
+
+import json
 import os
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Hashable, Optional
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates")
+TEMPLATE_SUFFIX = ".jinja-md"
+# Directory for compiled template bytecode; empty disables the bytecode cache.
+PROMPT_BYTECODE_CACHE_DIR = os.getenv("PROMPT_BYTECODE_CACHE_DIR", "")
+# Check template files for changes on every render (development only).
+PROMPT_WATCH = os.getenv("PROMPT_WATCH", "false").lower() in ("1", "true")
+# Rendered prompts kept per process; 0 disables render memoization.
+PROMPT_RENDER_CACHE_SIZE = int(os.getenv("PROMPT_RENDER_CACHE_SIZE", "256"))
+
+
+def _render_key(name: str, kwargs: Dict) -> Optional[Hashable]:
+    """Builds a memo key from the render arguments, or None if they can't be keyed."""
+    try:
+        return name, json.dumps(kwargs, sort_keys=True, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return None
+
+
+class TemplateRegistry:
+    """Compiles the prompt templates once and memoizes their renders."""
+
+    def __init__(
+        self,
+        template_dir: str = TEMPLATE_DIR,
+        bytecode_cache_dir: str = PROMPT_BYTECODE_CACHE_DIR,
+        watch: bool = PROMPT_WATCH,
+        render_cache_size: int = PROMPT_RENDER_CACHE_SIZE,
+    ):
+        bytecode_cache = None
+        if bytecode_cache_dir:
+            os.makedirs(bytecode_cache_dir, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+        self.env = Environment(
+            loader=FileSystemLoader(template_dir),
+            bytecode_cache=bytecode_cache,
+            auto_reload=watch,
+        )
+        self.template_dir = template_dir
+        self.watch = watch
+        self.render_cache_size = render_cache_size
+        self._templates: Dict[str, Template] = {}
+        self._renders: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._lock = Lock()
+
+    def compile_all(self):
+        """Compiles every template in the template directory."""
+        for filename in sorted(os.listdir(self.template_dir)):
+            if filename.endswith(TEMPLATE_SUFFIX):
+                self.get(filename[: -len(TEMPLATE_SUFFIX)])
+
+    def get(self, name: str) -> Template:
+        template = self._templates.get(name)
+        if template is None or (self.watch and not template.is_up_to_date):
+            template = self.env.get_template(f"{name}{TEMPLATE_SUFFIX}")
+            with self._lock:
+                self._templates[name] = template
+                # Renders of the previous version are stale.
+                for key in [key for key in self._renders if key[0] == name]:
+                    del self._renders[key]
+        return template
+
+    def render(self, name: str, **kwargs) -> str:
+        template = self.get(name)
+        key = _render_key(name, kwargs) if self.render_cache_size else None
+        if key is None:
+            return template.render(**kwargs)
+        with self._lock:
+            if key in self._renders:
+                self._renders.move_to_end(key)
+                return self._renders[key]
+        rendered = template.render(**kwargs)
+        with self._lock:
+            self._renders[key] = rendered
+            while len(self._renders) > self.render_cache_size:
+                self._renders.popitem(last=False)
+        return rendered
+
 
-from jinja2 import Environment, FileSystemLoader
+prompt_registry = TemplateRegistry()
+prompt_registry.compile_all()
 
 
 def apply_prompt_template(template: str, **kwargs) -> str:
-    template_dir = os.path.join(os.path.dirname(__file__), "templates")
-    loader = FileSystemLoader(template_dir)
-    env = Environment(loader=loader)
-    template = env.get_template(f"{template}.jinja-md")
-    return template.render(**kwargs)
+    return prompt_registry.render(template, **kwargs)
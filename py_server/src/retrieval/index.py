@@ -0,0 +1,301 @@
+"""
+An in-process hybrid search index over chunked documents.
+
+Chunk embeddings live in one contiguous NumPy matrix (optionally loaded from
+disk as a memory map) and a BM25 inverted index covers the same chunks, so a
+query is a single matrix-vector product plus a walk over the postings of its
+terms. Documents are added and removed one at a time; removed chunks are
+masked out and the index is compacted once they outnumber the live ones.
+"""
+
+import json
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import asdict, dataclass
+from threading import RLock
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Latin words/numbers, or runs of CJK characters (split into uni- and bigrams).
+_TOKEN = re.compile(r"[a-z0-9]+|[㐀-鿿]+")
+_CJK = re.compile(r"[㐀-鿿]")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased words, plus character unigrams and bigrams for CJK text."""
+    tokens = []
+    for match in _TOKEN.findall(text.lower()):
+        if _CJK.match(match):
+            tokens.extend(match)
+            tokens.extend(match[i : i + 2] for i in range(len(match) - 1))
+        else:
+            tokens.append(match)
+    return tokens
+
+
+def chunk_text(text: str, size: int, overlap: int) -> List[str]:
+    """
+    Splits text into chunks of about `size` characters, packing whole paragraphs
+    where possible and cutting longer paragraphs with `overlap` characters of
+    shared context.
+    """
+    chunks: List[str] = []
+    current = ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if current and len(current) + len(paragraph) + 2 > size:
+            chunks.append(current)
+            current = ""
+        if len(paragraph) > size:
+            step = max(1, size - overlap)
+            pieces = [paragraph[i : i + size] for i in range(0, len(paragraph), step)]
+            # The last piece may be nothing but overlap.
+            if len(pieces) > 1 and len(pieces[-1]) <= overlap:
+                pieces.pop()
+            chunks.extend(pieces[:-1])
+            paragraph = pieces[-1]
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+@dataclass
+class Chunk:
+    doc_id: str
+    title: str
+    text: str
+    position: int
+
+
+@dataclass
+class SearchHit:
+    chunk: Chunk
+    score: float
+    dense: float
+    keyword: float
+
+
+def _normalize(scores: np.ndarray, alive: np.ndarray) -> np.ndarray:
+    """Min-max scales the live scores to [0, 1] so both signals can be mixed."""
+    if not alive.any():
+        return scores
+    low, high = scores[alive].min(), scores[alive].max()
+    if high <= low:
+        return np.zeros_like(scores)
+    return (scores - low) / (high - low)
+
+
+class HybridIndex:
+    """Dense vectors plus BM25 over the same chunks."""
+
+    def __init__(self, dim: Optional[int] = None, k1: float = 1.5, b: float = 0.75):
+        self.dim = dim
+        self.k1 = k1
+        self.b = b
+        self._chunks: List[Optional[Chunk]] = []
+        self._vectors: Optional[np.ndarray] = None
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_slots: Dict[str, List[int]] = {}
+        self._total_length = 0
+        self._lock = RLock()
+
+    def __len__(self) -> int:
+        return int(self._alive[: len(self._chunks)].sum())
+
+    @property
+    def documents(self) -> int:
+        return len(self._doc_slots)
+
+    def _reserve(self, count: int):
+        """Grows the slot arrays (and copies a read-only memory map) as needed."""
+        needed = len(self._chunks) + count
+        capacity = len(self._alive)
+        writeable = self._vectors is None or self._vectors.flags.writeable
+        if needed <= capacity and writeable:
+            return
+        capacity = max(needed, capacity * 2, 64)
+        used = len(self._chunks)
+        lengths = np.zeros(capacity, dtype=np.float32)
+        lengths[:used] = self._lengths[:used]
+        self._lengths = lengths
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:used] = self._alive[:used]
+        self._alive = alive
+        if self.dim:
+            vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+            if self._vectors is not None:
+                vectors[:used] = self._vectors[:used]
+            self._vectors = vectors
+
+    def add(self, chunks: Sequence[Chunk], vectors: Optional[np.ndarray] = None):
+        """Adds chunks, with one embedding row per chunk when vectors are used."""
+        if vectors is not None:
+            vectors = np.asarray(vectors, dtype=np.float32)
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(
+                    f"Embedding size {vectors.shape[1]} does not match the index ({self.dim})"
+                )
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.maximum(norms, 1e-12)
+        with self._lock:
+            self._reserve(len(chunks))
+            for offset, chunk in enumerate(chunks):
+                slot = len(self._chunks)
+                self._chunks.append(chunk)
+                terms = Counter(tokenize(f"{chunk.title}\n{chunk.text}"))
+                for term, count in terms.items():
+                    self._postings.setdefault(term, {})[slot] = count
+                length = sum(terms.values())
+                self._lengths[slot] = length
+                self._total_length += length
+                self._alive[slot] = True
+                if self._vectors is not None:
+                    self._vectors[slot] = vectors[offset] if vectors is not None else 0
+                self._doc_slots.setdefault(chunk.doc_id, []).append(slot)
+
+    def remove(self, doc_id: str) -> int:
+        """Removes a document's chunks; returns how many were removed."""
+        with self._lock:
+            slots = self._doc_slots.pop(doc_id, [])
+            for slot in slots:
+                chunk = self._chunks[slot]
+                for term in set(tokenize(f"{chunk.title}\n{chunk.text}")):
+                    postings = self._postings.get(term)
+                    if postings is not None:
+                        postings.pop(slot, None)
+                        if not postings:
+                            del self._postings[term]
+                self._total_length -= int(self._lengths[slot])
+                self._alive[slot] = False
+                self._chunks[slot] = None
+            if len(self._chunks) - len(self) > max(1024, len(self)):
+                self._compact()
+            return len(slots)
+
+    def replace(
+        self, doc_id: str, chunks: Sequence[Chunk], vectors: Optional[np.ndarray] = None
+    ):
+        with self._lock:
+            self.remove(doc_id)
+            self.add(chunks, vectors)
+
+    def _compact(self):
+        """Rebuilds the index over the live chunks only."""
+        live = [slot for slot, chunk in enumerate(self._chunks) if chunk is not None]
+        chunks = [self._chunks[slot] for slot in live]
+        vectors = self._vectors[live] if self._vectors is not None else None
+        self._chunks = []
+        self._vectors = None
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._postings = {}
+        self._doc_slots = {}
+        self._total_length = 0
+        self.add(chunks, vectors)
+
+    def _bm25(self, tokens: Sequence[str], size: int) -> np.ndarray:
+        scores = np.zeros(size, dtype=np.float32)
+        live = len(self)
+        if not live:
+            return scores
+        avg_length = self._total_length / live
+        for term, query_count in Counter(tokens).items():
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (live - len(postings) + 0.5) / (len(postings) + 0.5))
+            slots = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+            tf = np.fromiter(postings.values(), dtype=np.float32, count=len(postings))
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[slots] / avg_length)
+            scores[slots] += query_count * idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def search(
+        self,
+        tokens: Sequence[str],
+        vector: Optional[Sequence[float]] = None,
+        k: int = 5,
+        alpha: float = 0.5,
+    ) -> List[SearchHit]:
+        """
+        Returns the k best chunks. With a query vector the score is
+        `alpha * dense + (1 - alpha) * keyword`, both min-max scaled; without
+        one (or without stored vectors) only BM25 is used.
+        """
+        with self._lock:
+            size = len(self._chunks)
+            if not size or not k:
+                return []
+            alive = self._alive[:size]
+            keyword = self._bm25(tokens, size)
+            if vector is not None and self._vectors is not None:
+                query = np.asarray(vector, dtype=np.float32)
+                query = query / max(float(np.linalg.norm(query)), 1e-12)
+                dense = self._vectors[:size] @ query
+                scores = alpha * _normalize(dense, alive) + (1 - alpha) * _normalize(
+                    keyword, alive
+                )
+                candidates = alive
+            else:
+                dense = np.zeros(size, dtype=np.float32)
+                scores = keyword
+                candidates = alive & (keyword > 0)
+            scores = np.where(candidates, scores, -np.inf)
+            count = min(k, int(candidates.sum()))
+            if not count:
+                return []
+            top = np.argpartition(-scores, count - 1)[:count]
+            top = top[np.argsort(-scores[top])]
+            return [
+                SearchHit(
+                    self._chunks[slot],
+                    float(scores[slot]),
+                    float(dense[slot]),
+                    float(keyword[slot]),
+                )
+                for slot in top
+            ]
+
+    def save(self, directory: str, metadata: Optional[Dict] = None):
+        """Writes the live chunks and their vectors, with optional extra metadata."""
+        with self._lock:
+            self._compact()
+            os.makedirs(directory, exist_ok=True)
+            size = len(self._chunks)
+            if self._vectors is not None:
+                np.save(os.path.join(directory, "vectors.npy"), self._vectors[:size])
+            meta = {
+                "dim": self.dim,
+                "chunks": [asdict(chunk) for chunk in self._chunks],
+                "metadata": metadata or {},
+            }
+        path = os.path.join(directory, "chunks.json")
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, directory: str) -> Tuple["HybridIndex", Dict]:
+        """
+        Loads a saved index. Vectors are memory-mapped; they are copied into
+        memory only when the index next changes.
+        """
+        with open(os.path.join(directory, "chunks.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls(dim=meta["dim"])
+        chunks = [Chunk(**chunk) for chunk in meta["chunks"]]
+        index.add(chunks)
+        vectors_path = os.path.join(directory, "vectors.npy")
+        if index.dim and os.path.exists(vectors_path):
+            index._vectors = np.load(vectors_path, mmap_mode="r")
+        return index, meta["metadata"]
@@ -0,0 +1,264 @@
+"""
+The knowledge base behind the `knowledge_search` tool.
+
+Documents come from a source (the Coze datasets of COZE_SPACE_ID, or a plain
+directory), are chunked, embedded and kept in a local HybridIndex so queries
+are answered in-process. Each sync only re-indexes documents whose version
+changed and drops the ones that disappeared.
+
+The Coze OpenAPI lists dataset documents and their update times but does not
+return their text, so the text of each Coze document is read from the file
+with the same name under KB_DOCS_DIR (the files that were uploaded to Coze).
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from src.coze.app import get_async_coze
+from src.coze.rag import COZE_SPACE_ID
+
+from .index import Chunk, HybridIndex, SearchHit, chunk_text, tokenize
+
+# Where document text is read from; empty disables the knowledge base.
+KB_DOCS_DIR = os.getenv("KB_DOCS_DIR", "")
+# "coze": index the documents of the Coze datasets; "directory": every file in KB_DOCS_DIR.
+KB_SOURCE = os.getenv("KB_SOURCE", "coze")
+# Directory the index is saved to after each sync and loaded from at start; empty keeps it in memory.
+KB_INDEX_DIR = os.getenv("KB_INDEX_DIR", "")
+# Embedding model for the dense half of the hybrid score; empty means BM25 only.
+KB_EMBEDDING_MODEL = os.getenv("KB_EMBEDDING_MODEL", "")
+KB_CHUNK_CHARS = int(os.getenv("KB_CHUNK_CHARS", "600"))
+KB_CHUNK_OVERLAP = int(os.getenv("KB_CHUNK_OVERLAP", "80"))
+# Weight of the dense score; the keyword score gets the rest.
+KB_HYBRID_ALPHA = float(os.getenv("KB_HYBRID_ALPHA", "0.5"))
+KB_TOP_K = int(os.getenv("KB_TOP_K", "5"))
+# Seconds between background syncs; 0 only syncs once at startup.
+KB_SYNC_INTERVAL_SECONDS = int(os.getenv("KB_SYNC_INTERVAL_SECONDS", "600"))
+
+_TEXT_SUFFIXES = (".md", ".markdown", ".txt")
+
+
+@dataclass
+class SourceDocument:
+    doc_id: str
+    title: str
+    # Changes whenever the document does.
+    version: str
+    path: str
+
+
+class DirectorySource:
+    """Every text file under a directory, versioned by modification time and size."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    async def list_documents(self) -> Dict[str, SourceDocument]:
+        return await asyncio.to_thread(self._scan)
+
+    def _scan(self) -> Dict[str, SourceDocument]:
+        documents = {}
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.lower().endswith(_TEXT_SUFFIXES):
+                    continue
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                doc_id = os.path.relpath(path, self.directory)
+                documents[doc_id] = SourceDocument(
+                    doc_id, name, f"{stat.st_mtime_ns}:{stat.st_size}", path
+                )
+        return documents
+
+
+class CozeDatasetSource:
+    """The documents of every Coze dataset in a space, versioned by update time."""
+
+    def __init__(self, space_id: str, directory: str):
+        self.space_id = space_id
+        self.directory = directory
+        self._missing: set = set()
+
+    async def list_documents(self) -> Dict[str, SourceDocument]:
+        coze = get_async_coze()
+        if coze is None:
+            raise RuntimeError("Coze client is not available")
+        documents = {}
+        async for dataset in await coze.datasets.list(
+            space_id=self.space_id, page_size=100
+        ):
+            async for document in await coze.datasets.documents.list(
+                dataset_id=dataset.dataset_id, page_size=100
+            ):
+                path = os.path.join(self.directory, document.name)
+                if not os.path.isfile(path):
+                    if document.document_id not in self._missing:
+                        self._missing.add(document.document_id)
+                        print(f"⚠️  Knowledge base: no local text for {document.name}")
+                    continue
+                documents[document.document_id] = SourceDocument(
+                    document.document_id,
+                    f"{dataset.name}/{document.name}",
+                    str(document.update_time),
+                    path,
+                )
+        return documents
+
+
+def _read_text(path: str) -> str:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def create_embeddings() -> Optional[Embeddings]:
+    if not KB_EMBEDDING_MODEL:
+        return None
+    from langchain_openai import OpenAIEmbeddings
+
+    from src.modals.chat_modal import API_KEY, LLM_URL
+
+    return OpenAIEmbeddings(
+        api_key=API_KEY,
+        base_url=LLM_URL,
+        model=KB_EMBEDDING_MODEL,
+        check_embedding_ctx_length=False,
+    )
+
+
+class KnowledgeBase:
+    """Keeps a HybridIndex in sync with a document source and searches it."""
+
+    def __init__(
+        self,
+        source,
+        embeddings: Optional[Embeddings] = None,
+        index_dir: str = KB_INDEX_DIR,
+        chunk_chars: int = KB_CHUNK_CHARS,
+        chunk_overlap: int = KB_CHUNK_OVERLAP,
+        alpha: float = KB_HYBRID_ALPHA,
+    ):
+        self.source = source
+        self.embeddings = embeddings
+        self.index_dir = index_dir
+        self.chunk_chars = chunk_chars
+        self.chunk_overlap = chunk_overlap
+        self.alpha = alpha
+        self.index = HybridIndex()
+        self.versions: Dict[str, str] = {}
+        self.last_sync: Optional[Dict] = None
+        self._sync_lock = asyncio.Lock()
+        self._loaded = False
+
+    def _load(self):
+        """Loads the saved index once, if there is one."""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.index_dir or not os.path.exists(
+            os.path.join(self.index_dir, "chunks.json")
+        ):
+            return
+        try:
+            self.index, metadata = HybridIndex.load(self.index_dir)
+            self.versions = metadata.get("versions", {})
+            print(f"✅ Knowledge base loaded: {len(self.index)} chunks")
+        except Exception as e:
+            print(f"❌ Failed to load the knowledge base index: {e}")
+
+    async def sync(self) -> Dict:
+        """Re-indexes changed documents and drops removed ones."""
+        async with self._sync_lock:
+            started = time.perf_counter()
+            await asyncio.to_thread(self._load)
+            documents = await self.source.list_documents()
+            removed = [doc_id for doc_id in self.versions if doc_id not in documents]
+            changed = [
+                document
+                for document in documents.values()
+                if self.versions.get(document.doc_id) != document.version
+            ]
+            for doc_id in removed:
+                self.index.remove(doc_id)
+                del self.versions[doc_id]
+            errors = []
+            for document in changed:
+                try:
+                    await self._index_document(document)
+                except Exception as e:
+                    errors.append(f"{document.title}: {e}")
+            if (removed or changed) and self.index_dir:
+                await asyncio.to_thread(
+                    self.index.save, self.index_dir, {"versions": self.versions}
+                )
+            self.last_sync = {
+                "updated": len(changed) - len(errors),
+                "removed": len(removed),
+                "errors": errors,
+                "documents": self.index.documents,
+                "chunks": len(self.index),
+                "seconds": round(time.perf_counter() - started, 3),
+            }
+            return self.last_sync
+
+    async def _index_document(self, document: SourceDocument):
+        text = await asyncio.to_thread(_read_text, document.path)
+        texts = chunk_text(text, self.chunk_chars, self.chunk_overlap)
+        chunks = [
+            Chunk(document.doc_id, document.title, chunk, position)
+            for position, chunk in enumerate(texts)
+        ]
+        vectors = None
+        if self.embeddings is not None and texts:
+            vectors = await self.embeddings.aembed_documents(texts)
+        self.index.replace(document.doc_id, chunks, vectors)
+        self.versions[document.doc_id] = document.version
+
+    async def search(self, query: str, k: int = KB_TOP_K) -> List[SearchHit]:
+        if self.last_sync is None and not self.versions:
+            await self.sync()
+        vector = None
+        if self.embeddings is not None and self.index.dim:
+            try:
+                vector = await self.embeddings.aembed_query(query)
+            except Exception as e:
+                print(f"⚠️  Query embedding failed, using keywords only: {e}")
+        return self.index.search(tokenize(query), vector, k, self.alpha)
+
+    async def run_forever(self, interval: int = KB_SYNC_INTERVAL_SECONDS):
+        """Syncs now and then every `interval` seconds (once if it is 0)."""
+        while True:
+            try:
+                report = await self.sync()
+                print(f"✅ Knowledge base synced: {report}")
+            except Exception as e:
+                print(f"❌ Knowledge base sync failed: {e}")
+            if interval <= 0:
+                return
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict:
+        return {
+            "documents": self.index.documents,
+            "chunks": len(self.index),
+            "dense": bool(self.index.dim),
+            "last_sync": self.last_sync,
+        }
+
+
+def create_knowledge_base() -> Optional[KnowledgeBase]:
+    if not KB_DOCS_DIR:
+        return None
+    if KB_SOURCE == "directory":
+        source = DirectorySource(KB_DOCS_DIR)
+    else:
+        source = CozeDatasetSource(COZE_SPACE_ID, KB_DOCS_DIR)
+    return KnowledgeBase(source, embeddings=create_embeddings())
+
+
+# None when KB_DOCS_DIR is not set.
+knowledge_base = create_knowledge_base()
@@ -0,0 +1,94 @@
+"""
+A bounded buffer of SSE frames for one generation.
+
+Every frame appended to the buffer gets an event id of the form
+`<run_id>:<seq>`, so a client that reconnects with `Last-Event-ID` can be
+replayed the frames it missed and then keep following the live generation.
+"""
+
+import asyncio
+from collections import deque
+from itertools import islice
+from typing import AsyncIterator, Deque, Optional, Tuple
+
+from src.utils.sse import sse_frame
+
+
+def format_event_id(run_id: str, seq: int) -> str:
+    return f"{run_id}:{seq}"
+
+
+def parse_event_id(event_id: Optional[str]) -> Optional[Tuple[str, int]]:
+    """Parses a `Last-Event-ID` header into (run_id, seq), or None if malformed."""
+    run_id, _, seq = (event_id or "").strip().rpartition(":")
+    if not run_id or not seq.isdigit():
+        return None
+    return run_id, int(seq)
+
+
+class FrameBuffer:
+    """
+    A ring buffer of the most recent frames of a generation.
+
+    Writers append frames as the generation produces them; any number of
+    subscribers read from a given sequence number and wait for new frames until
+    the buffer is closed. Once more than `max_frames` frames have been written,
+    the oldest ones are dropped and can no longer be replayed.
+    """
+
+    def __init__(self, run_id: str, max_frames: int):
+        self.run_id = run_id
+        self.closed = False
+        self._frames: Deque[str] = deque(maxlen=max_frames)
+        self._last_seq = 0
+        # Replaced on every change; subscribers wait on the one they last saw.
+        self._changed = asyncio.Event()
+
+    @property
+    def last_seq(self) -> int:
+        return self._last_seq
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def append(self, frame: str):
+        """Stamps a `data:` frame with the next event id and wakes subscribers."""
+        self._last_seq += 1
+        event_id = format_event_id(self.run_id, self._last_seq)
+        self._frames.append(f"id: {event_id}\n{frame}")
+        self._notify()
+
+    def close(self):
+        self.closed = True
+        self._notify()
+
+    def _frames_after(self, seq: int) -> Tuple[list, bool]:
+        """Returns the buffered frames after `seq` and whether some were dropped."""
+        first_seq = self._last_seq - len(self._frames) + 1
+        start = max(seq + 1, first_seq)
+        return list(islice(self._frames, start - first_seq, None)), seq + 1 < first_seq
+
+    async def subscribe(self, after_seq: int = 0) -> AsyncIterator[str]:
+        """
+        Yields the frames after `after_seq`, then live frames until the buffer closes.
+
+        If frames the subscriber has not seen were already dropped from the ring, a
+        `replay_truncated` frame is sent first so the client can reload the
+        history once the generation is done.
+        """
+        cursor = after_seq
+        while True:
+            changed = self._changed
+            if self._last_seq <= cursor and not self.closed:
+                await changed.wait()
+                continue
+            frames, truncated = self._frames_after(cursor)
+            cursor = self._last_seq
+            closed = self.closed
+            if truncated:
+                yield sse_frame({"type": "replay_truncated"})
+            for frame in frames:
+                yield frame
+            if closed:
+                return
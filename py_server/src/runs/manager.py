@@ -0,0 +1,195 @@
+"""
+Runs chat generations as background tasks that outlive the HTTP request.
+
+A generation writes its frames into a `FrameBuffer` instead of straight into
+the response. Any number of clients subscribe to the buffer and read at their
+own pace, so a slow client no longer holds back the model, and a client that
+drops mid-answer can reconnect with `Last-Event-ID`, be replayed what it missed
+and attach to the same generation instead of triggering a new completion.
+
+Each worker runs at most `RUN_MAX_CONCURRENCY` generations at a time; further
+runs wait in a bounded queue.
+
+However a generation ends, its last frame is a `message_done` frame carrying the
+final status ("done", "failed" or "cancelled").
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Optional
+
+from src.utils.sse import sse_frame
+
+from .buffer import FrameBuffer
+
+# Frames kept per generation for replay.
+SSE_REPLAY_BUFFER_FRAMES = int(os.getenv("SSE_REPLAY_BUFFER_FRAMES", "2048"))
+# How long a finished generation stays available for reconnecting clients.
+SSE_REPLAY_TTL_SECONDS = int(os.getenv("SSE_REPLAY_TTL_SECONDS", "300"))
+# Generations running at the same time per worker.
+RUN_MAX_CONCURRENCY = int(os.getenv("RUN_MAX_CONCURRENCY", "8"))
+# Generations allowed to wait for a free slot before new runs are rejected.
+RUN_MAX_QUEUE = int(os.getenv("RUN_MAX_QUEUE", "64"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class RunQueueFull(Exception):
+    """Raised when the worker is saturated and the run queue is full."""
+
+
+@dataclass
+class ChatRun:
+    """One generation for a session and the buffer of frames it produced."""
+
+    run_id: str
+    session_id: str
+    buffer: FrameBuffer
+    status: str = QUEUED
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.buffer.closed
+
+    def as_dict(self) -> Dict:
+        return {
+            "run_id": self.run_id,
+            "session_id": self.session_id,
+            "status": self.status,
+            "error": self.error,
+            "frames": self.buffer.last_seq,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class RunManager:
+    """Runs generations in background tasks with a per-worker concurrency limit."""
+
+    def __init__(
+        self,
+        max_concurrency: int = RUN_MAX_CONCURRENCY,
+        max_queue: int = RUN_MAX_QUEUE,
+        buffer_frames: int = SSE_REPLAY_BUFFER_FRAMES,
+        ttl_seconds: int = SSE_REPLAY_TTL_SECONDS,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.buffer_frames = buffer_frames
+        self.ttl_seconds = ttl_seconds
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._runs: Dict[str, ChatRun] = {}
+        # Unfinished runs per session.
+        self._active_sessions: Dict[str, int] = {}
+        self._queued = 0
+        self._running = 0
+
+    def get(self, run_id: str) -> Optional[ChatRun]:
+        return self._runs.get(run_id)
+
+    def has_active_run(self, session_id: str) -> bool:
+        """Whether a generation for the session is queued or running on this worker."""
+        return session_id in self._active_sessions
+
+    def start(self, session_id: str, frames: AsyncIterator[str]) -> ChatRun:
+        """
+        Starts pumping `frames` into a new buffer in a background task.
+
+        Args:
+            session_id: The session the generation belongs to.
+            frames: The SSE `data:` frames of the generation, without event ids.
+
+        Returns:
+            The run, whose buffer can be subscribed to by any number of clients.
+
+        Raises:
+            RunQueueFull: If all slots are busy and the queue is full.
+        """
+        if self._running + self._queued >= self.max_concurrency + self.max_queue:
+            raise RunQueueFull(f"{self._queued} runs are already waiting")
+        run_id = uuid.uuid4().hex
+        run = ChatRun(run_id, session_id, FrameBuffer(run_id, self.buffer_frames))
+        self._runs[run_id] = run
+        self._active_sessions[session_id] = self._active_sessions.get(session_id, 0) + 1
+        self._queued += 1
+        run.task = asyncio.create_task(self._pump(run, frames))
+        run.task.add_done_callback(lambda task: self._finish(run, task))
+        return run
+
+    async def _pump(self, run: ChatRun, frames: AsyncIterator[str]):
+        async with self._slots:
+            self._queued -= 1
+            self._running += 1
+            run.status, run.started_at = RUNNING, time.time()
+            try:
+                async for frame in frames:
+                    run.buffer.append(frame)
+                run.status = DONE
+            except Exception as e:
+                print(f"❌ Run {run.run_id} failed: {e}")
+                run.status, run.error = FAILED, str(e)
+                run.buffer.append(sse_frame({"type": "error", "message": str(e)}))
+            finally:
+                self._running -= 1
+
+    def _finish(self, run: ChatRun, task: asyncio.Task):
+        """Sends the final frame and closes the buffer, however the task ended."""
+        if run.started_at is None:
+            # Cancelled while still waiting for a slot.
+            self._queued -= 1
+        if task.cancelled():
+            run.status = CANCELLED
+            run.buffer.append(sse_frame({"type": "cancelled"}))
+        run.finished_at = time.time()
+        run.buffer.append(sse_frame({"type": "message_done", "status": run.status}))
+        run.buffer.close()
+        remaining = self._active_sessions.pop(run.session_id) - 1
+        if remaining:
+            self._active_sessions[run.session_id] = remaining
+        asyncio.get_running_loop().call_later(
+            self.ttl_seconds, self._runs.pop, run.run_id, None
+        )
+
+    async def cancel(self, run_id: str) -> Optional[ChatRun]:
+        """
+        Cancels a queued or running generation and waits for it to wind down, so
+        the returned run reports its final status. Returns None for unknown runs.
+        """
+        run = self._runs.get(run_id)
+        if run and run.task and not run.done:
+            run.task.cancel()
+            # `_finish` was registered first, so it has run once the wait returns.
+            await asyncio.wait([run.task])
+        return run
+
+    def stats(self) -> Dict:
+        return {
+            "running": self._running,
+            "queued": self._queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "tracked": len(self._runs),
+        }
+
+    async def shutdown(self):
+        """Cancels the generations that are still running."""
+        tasks = [run.task for run in self._runs.values() if run.task and not run.done]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+run_manager = RunManager()
@@ -1,3 +1,4 @@
+from .retrieve import knowledge_search
 from .search import search
 
-__all__ = ["search"]
+__all__ = ["knowledge_search", "search"]
@@ -0,0 +1,26 @@
+from langchain_core.tools import tool
+
+
+@tool
+async def knowledge_search(query: str) -> str:
+    """
+    Search the internal knowledge base and return the most relevant passages.
+
+    Args:
+        query: What to look for, as keywords or a question.
+
+    Returns:
+        The matching passages with their source documents.
+    """
+    # The index (and numpy) is loaded on first use rather than when agents import tools.
+    from src.retrieval.knowledge_base import knowledge_base
+
+    if knowledge_base is None:
+        return "知识库未配置"
+    hits = await knowledge_base.search(query)
+    if not hits:
+        return "知识库中没有找到相关内容"
+    return "\n\n".join(
+        f"[{number}] {hit.chunk.title}\n{hit.chunk.text}"
+        for number, hit in enumerate(hits, 1)
+    )
@@ -0,0 +1,81 @@
+"""
+Timeouts and a shared result cache for agent tools.
+
+`ToolNode` already gathers the tool calls of one model turn on the event loop,
+so wrapping every tool as a coroutine lets those calls overlap instead of each
+holding an executor thread. Each call is bounded by a per-tool timeout, and
+results of read-only tools are memoized across sessions, keyed on the tool
+name and its normalized arguments, with identical in-flight calls shared.
+"""
+
+import asyncio
+import json
+import os
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from langchain_core.tools import BaseTool, StructuredTool
+
+from src.utils.swr import SWRCache
+
+# Default time limit for one tool call, and per-tool overrides: {"search": 10}
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "30"))
+TOOL_TIMEOUTS = os.getenv("TOOL_TIMEOUTS", "")
+# How long tool results are reused; 0 disables the cache.
+TOOL_CACHE_TTL_SECONDS = float(os.getenv("TOOL_CACHE_TTL_SECONDS", "600"))
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "1024"))
+
+tool_timeouts: Dict[str, float] = json.loads(TOOL_TIMEOUTS) if TOOL_TIMEOUTS.strip() else {}
+tool_cache: SWRCache[Any] = SWRCache(
+    ttl=TOOL_CACHE_TTL_SECONDS, max_entries=TOOL_CACHE_MAX_ENTRIES
+)
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def cache_key(name: str, args: Dict) -> Tuple[str, str]:
+    """Tool name plus its arguments with sorted keys and collapsed whitespace."""
+    return name, json.dumps(
+        _normalize(args), sort_keys=True, ensure_ascii=False, default=str
+    )
+
+
+def managed_tool(
+    tool: BaseTool, timeout: Optional[float] = None, cacheable: bool = True
+) -> BaseTool:
+    """
+    Wraps a tool with a timeout and, if `cacheable`, the shared result cache.
+
+    A call that times out returns an error message to the model instead of
+    failing the run; timeouts and errors are never cached.
+    """
+    timeout = timeout or tool_timeouts.get(tool.name, TOOL_TIMEOUT_SECONDS)
+
+    async def run(**kwargs):
+        async def call():
+            return await asyncio.wait_for(tool.ainvoke(kwargs), timeout)
+
+        try:
+            if cacheable and tool_cache.ttl > 0:
+                return await tool_cache.get(cache_key(tool.name, kwargs), call)
+            return await call()
+        except asyncio.TimeoutError:
+            return f"工具 {tool.name} 执行超时（{timeout:g}s），请稍后重试或换一种方式"
+
+    return StructuredTool.from_function(
+        coroutine=run,
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+    )
+
+
+def managed_tools(tools: Sequence[BaseTool], **kwargs) -> list:
+    return [managed_tool(tool, **kwargs) for tool in tools]
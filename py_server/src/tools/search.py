@@ -1,8 +1,260 @@
+"""
+Web search tool.
+
+A search backend (Tavily, or any HTTP endpoint speaking the same small JSON
+format, such as `benchmarks/search_stub.py`) returns the result URLs, then the
+pages are fetched concurrently through one shared `httpx.AsyncClient`, at most
+SEARCH_FETCH_CONCURRENCY at a time. Extracted page text is kept in an on-disk
+cache and revalidated with the page's ETag, and every page is trimmed to a token
+budget before it goes into the agent's context.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+
+import httpx
 from langchain.tools import tool
 
+from src.utils.lazy import Lazy
+
+# "tavily" or "http"; empty picks tavily when TAVILY_API_KEY is set, else http when
+# SEARCH_BACKEND_URL is set.
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "")
+# Base URL of the http backend: GET {url}/search?q=...&max_results=...
+SEARCH_BACKEND_URL = os.getenv("SEARCH_BACKEND_URL", "")
+TAVILY_API_KEY = os.getenv("TAVILY_API_KEY", "")
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "5"))
+SEARCH_FETCH_CONCURRENCY = int(os.getenv("SEARCH_FETCH_CONCURRENCY", "4"))
+SEARCH_TIMEOUT_SECONDS = float(os.getenv("SEARCH_TIMEOUT_SECONDS", "10"))
+SEARCH_MAX_CONNECTIONS = int(os.getenv("SEARCH_MAX_CONNECTIONS", "20"))
+# Directory of the page cache; empty disables it.
+SEARCH_CACHE_DIR = os.getenv("SEARCH_CACHE_DIR", "")
+# Cached pages younger than this are used without asking the server.
+SEARCH_PAGE_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_PAGE_CACHE_TTL_SECONDS", "3600"))
+# Approximate tokens of each page's text passed to the agent.
+SEARCH_PAGE_TOKEN_BUDGET = int(os.getenv("SEARCH_PAGE_TOKEN_BUDGET", "800"))
+
+TAVILY_URL = "https://api.tavily.com/search"
+_CJK = re.compile(r"[㐀-鿿豈-﫿]")
+
+
+@dataclass
+class SearchResult:
+    title: str
+    url: str
+    snippet: str
+
+
+class TavilyBackend:
+    def __init__(self, api_key: str = TAVILY_API_KEY):
+        self.api_key = api_key
+
+    async def search(
+        self, client: httpx.AsyncClient, query: str, max_results: int
+    ) -> List[SearchResult]:
+        response = await client.post(
+            TAVILY_URL,
+            json={"query": query, "max_results": max_results},
+            headers={"Authorization": f"Bearer {self.api_key}"},
+        )
+        response.raise_for_status()
+        return [
+            SearchResult(item.get("title", ""), item["url"], item.get("content", ""))
+            for item in response.json().get("results", [])
+        ]
+
+
+class HTTPBackend:
+    """A JSON search endpoint returning {"results": [{"title", "url", "content"}]}."""
+
+    def __init__(self, base_url: str = SEARCH_BACKEND_URL):
+        self.base_url = base_url.rstrip("/")
+
+    async def search(
+        self, client: httpx.AsyncClient, query: str, max_results: int
+    ) -> List[SearchResult]:
+        response = await client.get(
+            f"{self.base_url}/search", params={"q": query, "max_results": max_results}
+        )
+        response.raise_for_status()
+        return [
+            SearchResult(item.get("title", ""), item["url"], item.get("content", ""))
+            for item in response.json().get("results", [])
+        ]
+
+
+def create_backend():
+    backend = SEARCH_BACKEND or (
+        "tavily" if TAVILY_API_KEY else "http" if SEARCH_BACKEND_URL else ""
+    )
+    if backend == "tavily":
+        return TavilyBackend()
+    if backend == "http":
+        return HTTPBackend()
+    return None
+
+
+class _TextExtractor(HTMLParser):
+    """Collects the visible text of an HTML page."""
+
+    SKIP = {"script", "style", "noscript", "svg", "template", "head"}
+    BLOCKS = {"p", "div", "br", "li", "tr", "section", "article", "h1", "h2", "h3", "h4"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts: List[str] = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skipping += 1
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def extract_text(html: str) -> str:
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    lines = (" ".join(line.split()) for line in "".join(parser.parts).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def trim_to_tokens(text: str, budget: int) -> str:
+    """
+    Cuts text to about `budget` tokens, counting a CJK character as one token
+    and any other character as a quarter of one.
+    """
+    used = 0.0
+    for position, char in enumerate(text):
+        used += 1 if _CJK.match(char) else 0.25
+        if used > budget:
+            return text[:position].rstrip() + "…"
+    return text
+
+
+class PageCache:
+    """Extracted page text on disk, one file per URL, with the ETag it was served with."""
+
+    def __init__(self, directory: str, ttl: int = SEARCH_PAGE_CACHE_TTL_SECONDS):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(
+            self.directory, hashlib.sha256(url.encode()).hexdigest() + ".json"
+        )
+
+    def get(self, url: str) -> Optional[Dict]:
+        try:
+            with open(self._path(url), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("url") == url else None
+
+    def put(self, url: str, etag: Optional[str], text: str):
+        path = self._path(url)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(
+                {"url": url, "etag": etag, "text": text, "fetched_at": time.time()},
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(f"{path}.tmp", path)
+
+    def fresh(self, entry: Dict) -> bool:
+        return time.time() - entry["fetched_at"] < self.ttl
+
+
+def _create_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=SEARCH_TIMEOUT_SECONDS,
+        limits=httpx.Limits(max_connections=SEARCH_MAX_CONNECTIONS),
+        follow_redirects=True,
+        headers={"User-Agent": "Mozilla/5.0 (compatible; nan-agent/0.1)"},
+    )
+
+
+http_client = Lazy(_create_client)
+page_cache = PageCache(SEARCH_CACHE_DIR) if SEARCH_CACHE_DIR else None
+search_backend = create_backend()
+_fetch_slots = asyncio.Semaphore(SEARCH_FETCH_CONCURRENCY)
+
+
+async def close_search_client():
+    """关闭共享的 HTTP 客户端，应在应用关闭时调用"""
+    if http_client.ready:
+        await http_client.get().aclose()
+
+
+async def fetch_page(url: str, cache: Optional[PageCache] = None) -> str:
+    """The text of a page, from the cache when it is fresh or unchanged (304)."""
+    cache = cache or page_cache
+    cached = await asyncio.to_thread(cache.get, url) if cache else None
+    if cached and cache.fresh(cached):
+        return cached["text"]
+    headers = {"If-None-Match": cached["etag"]} if cached and cached["etag"] else {}
+    async with _fetch_slots:
+        response = await http_client.get().get(url, headers=headers)
+    if response.status_code == 304 and cached:
+        text = cached["text"]
+    else:
+        response.raise_for_status()
+        text = response.text
+        if "html" in response.headers.get("content-type", ""):
+            text = extract_text(text)
+    if cache:
+        etag = response.headers.get("etag") or (cached and cached["etag"])
+        await asyncio.to_thread(cache.put, url, etag, text)
+    return text
+
+
+async def web_search(
+    query: str,
+    backend=None,
+    max_results: int = SEARCH_MAX_RESULTS,
+    token_budget: int = SEARCH_PAGE_TOKEN_BUDGET,
+) -> str:
+    backend = backend or search_backend
+    if backend is None:
+        return "搜索未配置：请设置 TAVILY_API_KEY 或 SEARCH_BACKEND_URL"
+    results = await backend.search(http_client.get(), query, max_results)
+    if not results:
+        return "没有找到相关结果"
+    pages = await asyncio.gather(
+        *(fetch_page(result.url) for result in results), return_exceptions=True
+    )
+    sections = []
+    for number, (result, page) in enumerate(zip(results, pages), 1):
+        # Pages that failed to load fall back to the backend's snippet.
+        text = page if isinstance(page, str) and page else result.snippet
+        sections.append(
+            f"[{number}] {result.title}\n{result.url}\n{trim_to_tokens(text, token_budget)}"
+        )
+    return "\n\n".join(sections)
+
 
 @tool
-def search(query: str) -> str:
+async def search(query: str) -> str:
     """
     Search the internet and return the results.
 
@@ -12,4 +264,4 @@ def search(query: str) -> str:
     Returns:
         The search results.
     """
-    return "搜索结果: 今天深圳天气情况：晴天，温度25℃，湿度60%，风速10m/s"
+    return await web_search(query)
@@ -0,0 +1,121 @@
+import asyncio
+import json
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+# Defaults used when a client only sets one of the coalescing limits.
+DEFAULT_COALESCE_MS = 50
+DEFAULT_COALESCE_BYTES = 4096
+
+
+def sse_frame(data: Dict) -> str:
+    """Encodes a dict as a single SSE `data:` frame."""
+    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class MessageFrameEncoder:
+    """
+    Encodes message chunks into SSE frames using a pre-encoded template.
+
+    The session_id, type and send_type fields are serialized once per session and
+    send_type, so each token only pays for encoding its own content.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self._prefixes: Dict[Optional[str], str] = {}
+
+    def _prefix(self, send_type: Optional[str]) -> str:
+        prefix = self._prefixes.get(send_type)
+        if prefix is None:
+            head = json.dumps(
+                {"session_id": self.session_id, "type": "message", "send_type": send_type},
+                ensure_ascii=False,
+            )
+            prefix = f'data: {head[:-1]}, "content": '
+            self._prefixes[send_type] = prefix
+        return prefix
+
+    def encode(self, content, send_type: Optional[str]) -> str:
+        return f"{self._prefix(send_type)}{json.dumps(content, ensure_ascii=False)}}}\n\n"
+
+
+async def coalesce_frames(
+    chunks: AsyncIterator[Union[Tuple[object, Optional[str]], str]],
+    encoder: MessageFrameEncoder,
+    max_delay_ms: int = DEFAULT_COALESCE_MS,
+    max_bytes: int = DEFAULT_COALESCE_BYTES,
+) -> AsyncIterator[str]:
+    """
+    Merges consecutive message chunks into fewer SSE frames.
+
+    Buffered text is flushed when it is `max_delay_ms` old, when it reaches
+    `max_bytes`, when the send_type changes, when a non-text chunk arrives, or
+    when the source is exhausted.
+
+    Ready-made frames (strings) may be interleaved with the chunks; they flush the
+    buffer and are passed through unchanged.
+
+    Args:
+        chunks: An async iterator of (content, send_type) pairs or SSE frames.
+        encoder: The frame encoder for the session.
+        max_delay_ms: The longest time a chunk may wait in the buffer.
+        max_bytes: The buffer size that triggers an immediate flush.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = aiter(chunks)
+    buffer: List[str] = []
+    buffer_bytes = 0
+    buffer_type: Optional[str] = None
+    deadline = 0.0
+    pending: Optional[asyncio.Future] = None
+
+    def flush() -> str:
+        nonlocal buffer, buffer_bytes
+        frame = encoder.encode("".join(buffer), buffer_type)
+        buffer, buffer_bytes = [], 0
+        return frame
+
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(anext(iterator))
+            timeout = max(0.0, deadline - loop.time()) if buffer else None
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                yield flush()
+                continue
+
+            try:
+                item = pending.result()
+            except StopAsyncIteration:
+                break
+            finally:
+                pending = None
+
+            if isinstance(item, str):
+                if buffer:
+                    yield flush()
+                yield item
+                continue
+            content, send_type = item
+            if buffer and (send_type != buffer_type or not isinstance(content, str)):
+                yield flush()
+            if not isinstance(content, str):
+                yield encoder.encode(content, send_type)
+                continue
+            if not content:
+                continue
+
+            if not buffer:
+                buffer_type = send_type
+                deadline = loop.time() + max_delay_ms / 1000
+            buffer.append(content)
+            buffer_bytes += len(content.encode("utf-8"))
+            if buffer_bytes >= max_bytes:
+                yield flush()
+
+        if buffer:
+            yield flush()
+    finally:
+        if pending is not None:
+            pending.cancel()
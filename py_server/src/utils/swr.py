@@ -0,0 +1,94 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Entry(Generic[T]):
+    value: T
+    fetched_at: float
+
+
+class SWRCache(Generic[T]):
+    """
+    An async TTL cache with stale-while-revalidate and single-flight refreshes.
+
+    A value younger than `ttl` is served as is. Until `ttl + stale_ttl` it is
+    still served immediately while a background refresh replaces it, and only
+    older (or missing) values make the caller wait for the loader. Concurrent
+    callers share one in-flight load per key. A failed background refresh keeps
+    serving the stale value until it expires. With `max_entries` the least
+    recently used keys are evicted beyond that size.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float = 0.0, max_entries: int = 0):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, _Entry[T]]" = OrderedDict()
+        self._loads: Dict[Hashable, asyncio.Task] = {}
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._errors = 0
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[T]]) -> T:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            age = time.monotonic() - entry.fetched_at
+            if age < self.ttl:
+                self._hits += 1
+                return entry.value
+            if age < self.ttl + self.stale_ttl:
+                self._stale_hits += 1
+                self._load(key, loader)
+                return entry.value
+        self._misses += 1
+        # shield: one caller going away must not cancel the load the others share.
+        return await asyncio.shield(self._load(key, loader))
+
+    def _load(self, key: Hashable, loader: Callable[[], Awaitable[T]]) -> asyncio.Task:
+        task = self._loads.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, loader))
+            self._loads[key] = task
+            task.add_done_callback(lambda _: self._loads.pop(key, None))
+            # Marks the exception as retrieved when nobody awaits a background refresh.
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    async def _fetch(self, key: Hashable, loader: Callable[[], Awaitable[T]]) -> T:
+        try:
+            value = await loader()
+        except Exception as e:
+            self._errors += 1
+            print(f"❌ 刷新缓存失败 {key!r}: {e!r}")
+            raise
+        self._entries[key] = _Entry(value, time.monotonic())
+        self._entries.move_to_end(key)
+        if self.max_entries:
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drops one key, or every key when none is given."""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "in_flight": len(self._loads),
+            "hits": self._hits,
+            "stale_hits": self._stale_hits,
+            "misses": self._misses,
+            "errors": self._errors,
+        }
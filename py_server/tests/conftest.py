@@ -0,0 +1,66 @@
+"""
+Shared pytest setup.
+
+The tests never talk to a real MongoDB or LLM endpoint: before any `src` module
+is imported the process-wide Mongo clients in `src.db.connection` are replaced
+by in-memory `mongomock` doubles, and the environment points the OpenAI client
+at an address nothing listens on.
+"""
+
+import os
+
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("API_KEY", "test")
+os.environ.setdefault("LLM_URL", "http://127.0.0.1:9/v1")
+os.environ.setdefault("MODEL", "test-model")
+
+import httpx  # noqa: E402
+import mongomock  # noqa: E402
+import pytest  # noqa: E402
+
+from src.db import connection  # noqa: E402
+from tests.fakes import FakeAsyncMongoClient, ScriptedChatModel  # noqa: E402
+
+fake_async_client = FakeAsyncMongoClient()
+fake_sync_client = mongomock.MongoClient()
+connection._async_client = fake_async_client
+connection._sync_client = fake_sync_client
+
+
+@pytest.fixture(autouse=True)
+def clean_mongo():
+    """Every test starts with empty databases and no cached index setup."""
+    yield
+    fake_async_client.drop_all()
+    for name in fake_sync_client.list_database_names():
+        fake_sync_client.drop_database(name)
+    connection._indexed_collections.clear()
+
+
+@pytest.fixture
+def async_client() -> FakeAsyncMongoClient:
+    return fake_async_client
+
+
+@pytest.fixture
+def scripted_model(monkeypatch) -> ScriptedChatModel:
+    """Swaps the chatbot graph's model for a scripted one."""
+    from src.graph import builder
+
+    model = ScriptedChatModel(replies=["你好 世界"])
+    monkeypatch.setattr(builder, "chat_modal", model)
+    return model
+
+
+@pytest.fixture
+async def app_client(scripted_model):
+    """An HTTP client for the FastAPI app, with its lifespan running."""
+    import main
+
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+    # The lifespan closes the shared clients on the way out.
+    connection._async_client = fake_async_client
+    connection._sync_client = fake_sync_client
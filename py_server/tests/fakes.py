@@ -0,0 +1,242 @@
+"""
+Test doubles for the external services py_server talks to.
+
+`FakeAsyncMongoClient` exposes the subset of pymongo's `AsyncMongoClient` API
+used by `src.db` (and by `AsyncMongoDBSaver`) on top of an in-memory
+`mongomock` database. `ScriptedChatModel` is a chat model that replays canned
+answers, token by token when streamed. `sse_events` decodes a streamed response.
+"""
+
+import asyncio
+import functools
+import json
+from typing import Any, Iterator, List, NamedTuple, Optional
+
+import bson
+import mongomock
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateOne
+
+
+class FakeAsyncCursor:
+    def __init__(self, cursor: Iterator, latency: float = 0.0):
+        self._cursor = cursor
+        self._latency = latency
+
+    def sort(self, *args, **kwargs) -> "FakeAsyncCursor":
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def skip(self, count: int) -> "FakeAsyncCursor":
+        self._cursor = self._cursor.skip(count)
+        return self
+
+    def limit(self, count: int) -> "FakeAsyncCursor":
+        self._cursor = self._cursor.limit(count)
+        return self
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._latency:
+            # One round trip for the first batch.
+            await asyncio.sleep(self._latency)
+            self._latency = 0.0
+        try:
+            return next(self._cursor)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length: Optional[int] = None) -> List:
+        await asyncio.sleep(self._latency)
+        return [doc for _, doc in zip(range(length or 1 << 62), self._cursor)]
+
+    async def close(self):
+        pass
+
+
+def _is_bson_size_total(stage: dict) -> bool:
+    group = stage.get("$group")
+    return bool(group) and any(
+        isinstance(spec, dict) and spec.get("$sum") == {"$bsonSize": "$$ROOT"}
+        for spec in group.values()
+    )
+
+
+class BulkResult(NamedTuple):
+    inserted_count: int = 0
+    upserted_count: int = 0
+    deleted_count: int = 0
+
+
+def bulk_write(collection: mongomock.Collection, operations: List[Any]) -> BulkResult:
+    """
+    Applies pymongo bulk operations to a mongomock collection one at a time.
+
+    mongomock's bulk builder does not accept the `sort` argument pymongo 4.15
+    passes along with update operations.
+    """
+    inserted = upserted = deleted = 0
+    for operation in operations:
+        if isinstance(operation, InsertOne):
+            collection.insert_one(operation._doc)
+            inserted += 1
+        elif isinstance(operation, (UpdateOne, ReplaceOne)):
+            method = (
+                collection.update_one
+                if isinstance(operation, UpdateOne)
+                else collection.replace_one
+            )
+            result = method(operation._filter, operation._doc, upsert=operation._upsert)
+            upserted += result.upserted_id is not None
+        elif isinstance(operation, DeleteMany):
+            deleted += collection.delete_many(operation._filter).deleted_count
+        elif isinstance(operation, DeleteOne):
+            deleted += collection.delete_one(operation._filter).deleted_count
+        else:
+            raise NotImplementedError(type(operation).__name__)
+    return BulkResult(inserted, upserted, deleted)
+
+
+class FakeAsyncCollection:
+    """Runs mongomock's synchronous collection methods behind coroutines."""
+
+    def __init__(self, collection: mongomock.Collection, latency: float = 0.0):
+        self._collection = collection
+        self._latency = latency
+
+    def find(self, *args, **kwargs) -> FakeAsyncCursor:
+        return FakeAsyncCursor(self._collection.find(*args, **kwargs), self._latency)
+
+    async def create_index(self, keys=None, **kwargs) -> str:
+        # pymongo names the first argument `keys`, mongomock `key_or_list`.
+        return self._collection.create_index(keys or kwargs.pop("key_or_list"), **kwargs)
+
+    async def bulk_write(self, operations: List[Any], **kwargs) -> BulkResult:
+        return bulk_write(self._collection, operations)
+
+    def list_indexes(self) -> FakeAsyncCursor:
+        return FakeAsyncCursor(iter(self._collection.list_indexes()))
+
+    async def aggregate(self, pipeline: List[dict], **kwargs) -> FakeAsyncCursor:
+        # mongomock has no $bsonSize; the `{"_id": None, field: {"$sum": {"$bsonSize":
+        # "$$ROOT"}}}` total used by the retention job is computed here instead.
+        if pipeline and _is_bson_size_total(pipeline[-1]):
+            docs = list(self._collection.aggregate(pipeline[:-1], **kwargs))
+            field = next(k for k in pipeline[-1]["$group"] if k != "_id")
+            rows = [{"_id": None, field: sum(len(bson.encode(d)) for d in docs)}]
+            return FakeAsyncCursor(iter(rows if docs else []))
+        return FakeAsyncCursor(iter(self._collection.aggregate(pipeline, **kwargs)))
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._collection, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        async def call(*args, **kwargs):
+            # Yield to the loop like a real round trip would.
+            await asyncio.sleep(self._latency)
+            return attribute(*args, **kwargs)
+
+        return call
+
+
+class FakeAsyncDatabase:
+    def __init__(self, database: mongomock.Database, latency: float = 0.0):
+        self._database = database
+        self._latency = latency
+        self.name = database.name
+
+    def __getitem__(self, name: str) -> FakeAsyncCollection:
+        return FakeAsyncCollection(self._database[name], self._latency)
+
+    def __getattr__(self, name: str) -> FakeAsyncCollection:
+        return self[name]
+
+    def get_collection(self, name: str) -> FakeAsyncCollection:
+        return self[name]
+
+    async def command(self, *args, **kwargs) -> dict:
+        return {"ok": 1.0}
+
+
+class FakeAsyncMongoClient:
+    """`latency` (seconds) is awaited on every operation to stand in for a round trip."""
+
+    append_metadata = None
+
+    def __init__(
+        self, client: Optional[mongomock.MongoClient] = None, latency: float = 0.0
+    ):
+        self._client = client or mongomock.MongoClient()
+        self._latency = latency
+        self.admin = FakeAsyncDatabase(self._client["admin"])
+
+    def __getitem__(self, name: str) -> FakeAsyncDatabase:
+        return FakeAsyncDatabase(self._client[name], self._latency)
+
+    def get_database(self, name: str) -> FakeAsyncDatabase:
+        return self[name]
+
+    def drop_all(self):
+        for name in self._client.list_database_names():
+            self._client.drop_database(name)
+
+    async def close(self):
+        pass
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Answers with the given replies in turn (cycling), optionally after a delay.
+    When `error` is set every call raises a RuntimeError with that message instead.
+    """
+
+    replies: List[str] = ["好的"]
+    delay_seconds: float = 0.0
+    error: Optional[str] = None
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _next_reply(self) -> str:
+        if self.error:
+            raise RuntimeError(self.error)
+        reply = self.replies[self.calls % len(self.replies)]
+        self.calls += 1
+        return reply
+
+    def _generate(self, messages: List[BaseMessage], stop=None, **kwargs) -> ChatResult:
+        message = AIMessage(content=self._next_reply())
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.delay_seconds:
+            await asyncio.sleep(self.delay_seconds)
+        return self._generate(messages, stop, **kwargs)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.delay_seconds:
+            await asyncio.sleep(self.delay_seconds)
+        words = self._next_reply().split(" ")
+        for i, word in enumerate(words):
+            token = word if i == len(words) - 1 else word + " "
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+def sse_events(body: str) -> List[dict]:
+    """Decodes the `data:` frames of an SSE response body."""
+    return [
+        json.loads(line[len("data: ") :])
+        for line in body.splitlines()
+        if line.startswith("data: ")
+    ]
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from src.modals.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    TokenBucket,
+    current_user,
+)
+
+
+def test_token_bucket_refills_and_allows_late_debits():
+    assert TokenBucket(0).delay(1_000) == 0.0
+
+    bucket = TokenBucket(60)
+    bucket.take(60)
+    assert bucket.delay() == pytest.approx(1.0, abs=0.05)
+    bucket.take(30)
+    assert bucket.level < 0
+    # A request larger than the bucket waits for a full bucket, not forever.
+    assert TokenBucket(60).delay(1_000) == 0.0
+
+
+def test_models_without_limits_have_no_limiter():
+    controller = AdmissionController(rpm=0, tpm=0, overrides={"m": {"rpm": 10}})
+    assert controller.limiter("other") is None
+    assert controller.limiter("m").requests.capacity == 10
+    assert controller.limiter("m") is controller.limiter("m")
+
+
+async def test_waiting_calls_are_served_round_robin_across_users():
+    controller = AdmissionController(rpm=6000)
+    limiter = controller.limiter("m")
+    limiter.requests.level = 0
+    admitted = []
+
+    async def call(user: str, n: int):
+        current_user.set(user)
+        await limiter.aacquire()
+        admitted.append(f"{user}{n}")
+
+    burst = [asyncio.create_task(call("a", n)) for n in range(4)]
+    await asyncio.sleep(0)
+    others = [asyncio.create_task(call("b", n)) for n in range(2)]
+    await asyncio.gather(*burst, *others)
+
+    assert admitted == ["a0", "b0", "a1", "b1", "a2", "a3"]
+    assert controller.stats()["admitted"] == 6
+
+
+async def test_full_queue_rejects_with_a_retry_delay():
+    controller = AdmissionController(max_queue=1, rpm=60)
+    limiter = controller.limiter("m")
+    limiter.requests.level = 0
+    waiter = asyncio.create_task(limiter.aacquire())
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        await limiter.aacquire()
+
+    assert rejected.value.retry_after == 2
+    assert controller.stats()["rejected"] == 1
+    waiter.cancel()
@@ -0,0 +1,50 @@
+from src.db.async_user_model import AsyncUserModel
+
+
+async def test_sessions_are_added_once_per_user():
+    model = AsyncUserModel()
+    await model.ensure_indexes()
+    assert await model.create_user("u1") is True
+    assert await model.create_user("u1") is False
+
+    assert await model.add_session_to_user("u1", "s1", "chatbot") is True
+    assert await model.add_session_to_user("u1", "s1", "chatbot") is True
+    assert await model.add_session_to_user("u1", "s2") is True
+    assert await model.add_session_to_user("nobody", "s3") is False
+
+    user = await model.get_user_info("u1")
+    assert user["session_count"] == 2
+    sessions = await model.get_user_sessions("u1")
+    assert [s["id"] for s in sessions] == ["s2", "s1"]
+    assert [s["agent_id"] for s in sessions] == ["main_agent", "chatbot"]
+    chatbot_sessions = await model.get_user_sessions("u1", agent_id="chatbot")
+    assert [s["id"] for s in chatbot_sessions] == ["s1"]
+
+
+async def test_delete_user_removes_their_sessions():
+    model = AsyncUserModel()
+    await model.create_user("u1")
+    await model.add_session_to_user("u1", "s1")
+
+    assert await model.delete_user("u1") is True
+    assert await model.get_user_info("u1") is None
+    assert await model.get_user_sessions("u1") == []
+    assert await model.delete_user("u1") is False
+
+
+async def test_user_routes_use_the_async_model(app_client):
+    import main
+
+    await main.user_model.create_user("u1")
+    created = await app_client.post(
+        "/api/users/sessions/create",
+        json={"user_id": "u1", "session_id": "s1", "agent_id": "chatbot"},
+    )
+    missing = await app_client.post(
+        "/api/users/sessions/create", json={"user_id": "nobody", "session_id": "s1"}
+    )
+    listed = await app_client.get("/api/users/sessions/u1")
+
+    assert created.json()["success"] is True
+    assert missing.json()["success"] is False
+    assert [s["id"] for s in listed.json()["sessions"]] == ["s1"]
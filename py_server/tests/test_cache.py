@@ -0,0 +1,103 @@
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from src.modals.cache import ResponseCache
+from tests.fakes import ScriptedChatModel
+
+
+class KeywordEmbeddings(Embeddings):
+    """Embeds texts about the weather close to each other and far from the rest."""
+
+    def embed_query(self, text: str) -> List[float]:
+        return [1.0, 0.05] if "天气" in text else [0.0, 1.0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+def _model(cache: ResponseCache) -> ScriptedChatModel:
+    return ScriptedChatModel(replies=["一", "二", "三", "四"], cache=cache)
+
+
+def _tool_turn(args: dict, call_id: str = "call1", result: str = "晴") -> list:
+    call = {"name": "weather", "args": args, "id": call_id}
+    return [
+        HumanMessage(content="北京天气"),
+        AIMessage(content="", tool_calls=[call]),
+        ToolMessage(content=result, tool_call_id=call_id),
+    ]
+
+
+async def test_exact_tier_normalizes_whitespace_and_case():
+    cache = ResponseCache()
+    model = _model(cache)
+    system = SystemMessage(content="You are helpful")
+
+    first = await model.ainvoke([system, HumanMessage(content="Hello  World")])
+    second = await model.ainvoke([system, HumanMessage(content="hello world ")])
+    other_system = await model.ainvoke(
+        [SystemMessage(content="Be brief"), HumanMessage(content="hello world")]
+    )
+
+    assert first.content == second.content == "一"
+    assert second.response_metadata["cache_hit"] is True
+    assert other_system.content == "二"
+    assert cache.stats()["exact_hits"] == 1
+
+
+async def test_exact_key_covers_tool_calls_and_tool_call_ids():
+    cache = ResponseCache()
+    model = _model(cache)
+
+    replies = [
+        (await model.ainvoke(_tool_turn({"city": "北京"}))).content,
+        (await model.ainvoke(_tool_turn({"city": "上海"}))).content,
+        (await model.ainvoke(_tool_turn({"city": "北京"}, call_id="call2"))).content,
+        (await model.ainvoke(_tool_turn({"city": "北京"}))).content,
+    ]
+
+    assert replies == ["一", "二", "三", "一"]
+
+
+async def test_exact_key_covers_bound_tools_and_params():
+    cache = ResponseCache()
+    model = _model(cache)
+    prompt = [HumanMessage(content="北京天气")]
+    tool = {"type": "function", "function": {"name": "weather", "parameters": {}}}
+
+    plain = await model.ainvoke(prompt)
+    with_tools = await model.bind(tools=[tool]).ainvoke(prompt)
+    with_stop = await model.ainvoke(prompt, stop=["。"])
+
+    assert [plain.content, with_tools.content, with_stop.content] == ["一", "二", "三"]
+
+
+async def test_semantic_tier_only_serves_plain_single_questions():
+    cache = ResponseCache(embeddings=KeywordEmbeddings(), similarity=0.9)
+    model = _model(cache)
+
+    first = await model.ainvoke([HumanMessage(content="今天天气怎么样")])
+    similar = await model.ainvoke([HumanMessage(content="明天天气如何")])
+    named = await model.ainvoke([HumanMessage(content="后天天气如何", name="bob")])
+    unrelated = await model.ainvoke([HumanMessage(content="讲个笑话")])
+
+    assert [first.content, similar.content] == ["一", "一"]
+    assert [named.content, unrelated.content] == ["二", "三"]
+    assert cache.stats()["semantic_hits"] == 1
+
+
+async def test_entries_expire_and_are_evicted():
+    cache = ResponseCache(max_entries=2, ttl_seconds=0)
+    model = _model(cache)
+    for question in ("a", "b", "c"):
+        await model.ainvoke([HumanMessage(content=question)])
+
+    assert cache.stats()["entries"] == 2 and cache.stats()["evictions"] == 1
+    assert (await model.ainvoke([HumanMessage(content="a")])).content == "四"
+
+    expiring = ResponseCache(ttl_seconds=-1)
+    model = _model(expiring)
+    await model.ainvoke([HumanMessage(content="a")])
+    assert (await model.ainvoke([HumanMessage(content="a")])).content == "二"
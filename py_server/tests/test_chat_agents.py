@@ -0,0 +1,82 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+import main
+from tests.fakes import sse_events
+
+
+def test_progress_messages_skip_history_and_repeats():
+    history = [HumanMessage(content="old", id="h0"), AIMessage(content="old", id="a0")]
+    turn = [HumanMessage(content="q", id="h1"), AIMessage(content="step", id="a1")]
+    reported = set()
+
+    first = main._progress_messages(history + turn, reported)
+    again = main._progress_messages(
+        history + turn + [AIMessage(content="next", id="a2")], reported
+    )
+
+    assert [m.id for m in first] == ["a1"]
+    assert [m.id for m in again] == ["a2"]
+
+
+def test_update_frame_trims_content_and_lists_tool_calls():
+    call = {"name": "web_search", "args": {}, "id": "c1"}
+    messages = [
+        AIMessage(content="", tool_calls=[call]),
+        ToolMessage(content="x" * 2000, tool_call_id="c1", name="web_search"),
+    ]
+    update = {"messages": messages, "next": "researcher", "todos": []}
+
+    encoded = main._update_frame("s", "supervisor", "tools", update, messages)
+    frame = sse_events(encoded)[0]
+
+    assert (frame["type"], frame["agent"], frame["node"]) == (
+        "update",
+        "supervisor",
+        "tools",
+    )
+    assert frame["state"] == {"next": "researcher"}
+    assert frame["messages"][0]["tool_calls"] == ["web_search"]
+    assert len(frame["messages"][1]["content"]) == main.UPDATE_PREVIEW_CHARS
+
+
+async def test_unknown_agent_is_rejected(app_client):
+    response = await app_client.post(
+        "/api/chat", json={"message": "hi", "agent_id": "nope"}
+    )
+    assert response.status_code == 400
+
+
+async def test_chat_streams_updates_and_tags_the_thread(app_client):
+    response = await app_client.post(
+        "/api/chat", json={"message": "hi", "session_id": "s", "agent_id": "chatbot"}
+    )
+
+    events = sse_events(response.text)
+    assert "".join(e["content"] for e in events if e["type"] == "message") == "你好 世界"
+    updates = [e for e in events if e["type"] == "update"]
+    assert [(u["agent"], u["node"]) for u in updates] == [("chatbot", "chatbot")]
+    checkpoint = await main.app.state.checkpointer.aget_tuple(
+        {"configurable": {"thread_id": "s"}}
+    )
+    assert checkpoint.metadata["agent_id"] == "chatbot"
+
+
+async def test_sessions_resume_with_their_stored_agent_id(app_client):
+    await main.user_model.create_user("u1")
+    await main.user_model.add_session_to_user("u1", "s")
+    (session,) = await main.user_model.get_user_sessions("u1")
+
+    response = await app_client.post(
+        "/api/chat",
+        json={"message": "hi", "session_id": "s", "agent_id": session["agent_id"]},
+    )
+
+    assert response.status_code == 200
+    events = sse_events(response.text)
+    assert [(e["agent"], e["node"]) for e in events if e["type"] == "update"] == [
+        ("chatbot", "chatbot")
+    ]
+    checkpoint = await main.app.state.checkpointer.aget_tuple(
+        {"configurable": {"thread_id": "s"}}
+    )
+    assert checkpoint.metadata["agent_id"] == "chatbot"
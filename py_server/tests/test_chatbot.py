@@ -0,0 +1,35 @@
+import threading
+from typing import List
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+from src.graph import builder
+from tests.fakes import ScriptedChatModel
+
+
+class ThreadRecordingModel(ScriptedChatModel):
+    threads: List[threading.Thread] = []
+
+    async def _astream(self, *args, **kwargs):
+        self.threads.append(threading.current_thread())
+        async for chunk in super()._astream(*args, **kwargs):
+            yield chunk
+
+
+async def test_chatbot_streams_tokens_from_the_event_loop_thread(monkeypatch):
+    model = ThreadRecordingModel(replies=["你好 世界"])
+    monkeypatch.setattr(builder, "chat_modal", model)
+    graph = builder.build_graph(InMemorySaver())
+
+    tokens = [
+        chunk.content
+        async for chunk, _ in graph.astream(
+            {"messages": [HumanMessage(content="hi")]},
+            {"configurable": {"thread_id": "t"}},
+            stream_mode="messages",
+        )
+    ]
+
+    assert tokens == ["你好 ", "世界"]
+    assert model.threads == [threading.main_thread()]
@@ -0,0 +1,43 @@
+from langchain_core.messages import HumanMessage
+from pymongo.errors import ServerSelectionTimeoutError
+
+from src.db.checkpointer import (
+    CHECKPOINT_DB_NAME,
+    check_checkpointer_health,
+    create_checkpointer,
+)
+from src.graph.builder import build_graph
+
+
+async def test_create_checkpointer_uses_the_shared_client(async_client):
+    checkpointer = await create_checkpointer()
+
+    assert checkpointer.client is async_client
+    assert checkpointer.db.name == CHECKPOINT_DB_NAME
+    indexes = await checkpointer.checkpoint_collection.list_indexes().to_list()
+    assert any(index["key"].get("thread_id") for index in indexes)
+
+
+async def test_checkpointer_persists_turns_per_thread(scripted_model):
+    checkpointer = await create_checkpointer()
+    graph = build_graph(checkpointer)
+
+    for thread_id in ("a", "b"):
+        config = {"configurable": {"thread_id": thread_id}}
+        await graph.ainvoke({"messages": [HumanMessage(content=thread_id)]}, config)
+
+    state = await checkpointer.aget_tuple({"configurable": {"thread_id": "a"}})
+    contents = [m.content for m in state.checkpoint["channel_values"]["messages"]]
+    assert contents == ["a", "你好 世界"]
+
+
+async def test_health_reports_ok_and_errors(monkeypatch):
+    checkpointer = await create_checkpointer()
+    assert (await check_checkpointer_health(checkpointer))["status"] == "ok"
+
+    async def unreachable(*args, **kwargs):
+        raise ServerSelectionTimeoutError("no servers")
+
+    monkeypatch.setattr(checkpointer.client.admin, "command", unreachable)
+    health = await check_checkpointer_health(checkpointer)
+    assert health == {"status": "error", "error": "no servers"}
@@ -0,0 +1,55 @@
+from src.db import connection
+from src.db.async_user_model import AsyncUserModel
+from src.db.user_model import UserModel
+
+
+class RecordingClient:
+    def __init__(self, uri, **options):
+        self.uri = uri
+        self.options = options
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class RecordingAsyncClient(RecordingClient):
+    async def close(self):
+        self.closed = True
+
+
+def test_sync_client_is_created_once_and_closed_once(monkeypatch):
+    monkeypatch.setattr(connection, "MongoClient", RecordingClient)
+    monkeypatch.setattr(connection, "_sync_client", None)
+
+    client = connection.get_sync_client()
+
+    assert connection.get_sync_client() is client
+    assert client.options["maxPoolSize"] == connection.MONGODB_MAX_POOL_SIZE
+    connection.close_sync_client()
+    connection.close_sync_client()
+    assert client.closed and connection._sync_client is None
+    assert connection.get_sync_client() is not client
+
+
+async def test_async_client_is_shared_and_closed(monkeypatch):
+    monkeypatch.setattr(connection, "AsyncMongoClient", RecordingAsyncClient)
+    monkeypatch.setattr(connection, "_async_client", None)
+    monkeypatch.setattr(connection, "_sync_client", None)
+
+    client = connection.get_async_client()
+
+    assert connection.get_async_client() is client
+    await connection.close_clients()
+    assert client.closed and connection._async_client is None
+
+
+def test_models_reuse_the_shared_clients():
+    assert UserModel().client is connection.get_sync_client()
+    assert AsyncUserModel().client is connection.get_async_client()
+
+
+def test_indexes_are_marked_once_per_process():
+    assert not connection.indexes_ready("db.collection")
+    connection.mark_indexes_ready("db.collection")
+    assert connection.indexes_ready("db.collection")
@@ -0,0 +1,66 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from src.graph import context
+from src.graph.context import assemble_context, count_tokens, split_window
+from tests.fakes import ScriptedChatModel
+
+
+def _turns(count: int, words: int = 40) -> list:
+    messages = []
+    for i in range(count):
+        text = " ".join(["word"] * words)
+        messages.append(HumanMessage(content=f"q{i} {text}", id=f"h{i}"))
+        messages.append(AIMessage(content=f"a{i} {text}", id=f"a{i}"))
+    return messages
+
+
+def test_split_window_starts_on_a_human_message():
+    call = {"name": "search", "args": {}, "id": "c1"}
+    messages = [
+        HumanMessage(content="q0", id="h0"),
+        AIMessage(content="", tool_calls=[call], id="a0"),
+        ToolMessage(content="x " * 200, tool_call_id="c1", id="t0"),
+        AIMessage(content="a0", id="a1"),
+        HumanMessage(content="q1", id="h1"),
+        AIMessage(content="a1", id="a2"),
+    ]
+    budget = count_tokens(messages[3:])
+
+    older, window = split_window(messages, budget)
+
+    assert [m.id for m in window] == ["h1", "a2"]
+    assert older + window == messages
+
+
+def test_split_window_keeps_the_latest_message_over_budget():
+    messages = _turns(2)
+    older, window = split_window(messages, 1)
+    assert window == messages[-1:] and older == messages[:-1]
+
+
+async def test_short_history_is_sent_unchanged():
+    state = {"messages": _turns(2)}
+    prompt, update = await assemble_context(state, ScriptedChatModel(), budget=10_000)
+    assert prompt == state["messages"] and update == {}
+
+
+async def test_summary_is_refreshed_only_with_messages_that_left_the_window():
+    model = ScriptedChatModel(replies=["摘要一", "摘要二"])
+    messages = _turns(12)
+    budget = count_tokens(messages) // 2 + context.CONTEXT_SUMMARY_MAX_TOKENS
+
+    prompt, update = await assemble_context({"messages": messages}, model, budget)
+
+    assert isinstance(prompt[0], SystemMessage) and "摘要一" in prompt[0].content
+    assert isinstance(prompt[1], HumanMessage)
+    assert update["summary"] == "摘要一"
+    window_start = messages.index(prompt[1])
+    assert update["summary_until_id"] == messages[window_start - 1].id
+    assert count_tokens(prompt) <= budget
+
+    # The next turn fits again, so the cached summary is reused without a model call.
+    turn = [HumanMessage(content="q", id="h12"), AIMessage(content="a", id="a12")]
+    state = {"messages": messages + turn, **update}
+    prompt, update = await assemble_context(state, model, budget)
+    assert update == {} and model.calls == 1
+    assert prompt[0].content.endswith("摘要一") and prompt[1] is messages[window_start]
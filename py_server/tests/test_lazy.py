@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from src.utils.lazy import Lazy
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_value_is_built_once_across_threads():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    lazy = Lazy(factory)
+    assert not lazy.ready
+    values = []
+    threads = [threading.Thread(target=lambda: values.append(lazy.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1 and lazy.ready
+    assert all(value is values[0] for value in values)
+
+
+def test_importing_main_builds_no_agents_or_clients():
+    # A fresh interpreter, since other tests may already have built them.
+    check = (
+        "import sys, main\n"
+        "from src.coze.app import async_coze_client, coze_client, token_manager\n"
+        "from src.tools.search import http_client\n"
+        "assert 'src.agents.supervisor' not in sys.modules\n"
+        "clients = (async_coze_client, coze_client, token_manager, http_client)\n"
+        "assert not any(client.ready for client in clients)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", check],
+        cwd=SERVER_DIR,
+        env={**os.environ, "WARMUP": ""},
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
@@ -0,0 +1,92 @@
+from langchain_core.messages import HumanMessage
+
+from src.graph.builder import build_graph
+from src.graph.memory import BoundedInMemorySaver, BoundedInMemoryStore
+
+
+def _config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+async def _chat(graph, thread_id: str, turns: int = 1):
+    for turn in range(turns):
+        await graph.ainvoke({"messages": [HumanMessage(content=f"q{turn}")]}, _config(thread_id))
+
+
+async def test_old_checkpoints_are_pruned_without_losing_state(scripted_model):
+    saver = BoundedInMemorySaver(max_checkpoints_per_thread=3)
+    graph = build_graph(saver)
+
+    await _chat(graph, "t", turns=4)
+
+    state = await graph.aget_state(_config("t"))
+    assert len(state.values["messages"]) == 8
+    history = [snapshot async for snapshot in graph.aget_state_history(_config("t"))]
+    assert len(history) == 3
+    assert all(snapshot.values["messages"] for snapshot in history[:2])
+    stats = saver.stats()
+    assert stats["checkpoints"] == 3 and stats["pruned_checkpoints"] > 0
+    # Only blobs a remaining checkpoint reads are kept.
+    referenced = {
+        ("t", "", channel, version)
+        for versions in saver._versions["t"].values()
+        for channel, version in versions.items()
+    }
+    assert set(saver.blobs) <= referenced
+
+
+async def test_least_recently_used_threads_are_evicted(scripted_model):
+    saver = BoundedInMemorySaver(max_threads=2)
+    graph = build_graph(saver)
+
+    await _chat(graph, "a")
+    await _chat(graph, "b")
+    await graph.aget_state(_config("a"))
+    await _chat(graph, "c")
+
+    assert set(saver.storage) == {"a", "c"}
+    assert not any(key[0] == "b" for key in [*saver.blobs, *saver.writes])
+    assert saver.stats()["evicted_threads"] == 1
+    assert (await graph.aget_state(_config("b"))).values == {}
+    assert "b" not in saver.storage
+
+
+async def test_byte_ceiling_keeps_only_the_thread_being_written(scripted_model):
+    saver = BoundedInMemorySaver(max_bytes=1)
+    graph = build_graph(saver)
+
+    await _chat(graph, "a")
+    await _chat(graph, "b")
+
+    assert list(saver.storage) == ["b"]
+    assert saver.stats()["bytes"] == saver._threads["b"] > 0
+
+
+async def test_deleted_and_unknown_threads_leave_nothing_behind(scripted_model):
+    saver = BoundedInMemorySaver()
+    graph = build_graph(saver)
+
+    await _chat(graph, "a")
+    await graph.aget_state(_config("missing"))
+    assert list(saver.list(_config("missing"))) == []
+    assert set(saver.storage) == {"a"}
+
+    saver.delete_thread("a")
+    assert not saver.storage and not saver.blobs and not saver.writes
+    assert saver.stats()["bytes"] == 0
+
+
+def test_store_evicts_least_recently_used_items():
+    store = BoundedInMemoryStore(max_items=2)
+    store.put(("users", "u1"), "a", {"v": 1})
+    store.put(("users", "u1"), "b", {"v": 2})
+    store.get(("users", "u1"), "a")
+    store.put(("users", "u2"), "c", {"v": 3})
+
+    assert store.get(("users", "u1"), "b") is None
+    assert store.get(("users", "u1"), "a").value == {"v": 1}
+    assert store.stats()["evicted_items"] == 1
+
+    store.delete(("users", "u2"), "c")
+    assert store.stats()["namespaces"] == 1
+    assert store.stats()["bytes"] == len('{"v": 1}')
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from pymongo.errors import AutoReconnect
+
+import main
+from src.db.message_store import MessageStore
+from tests.fakes import sse_events
+
+
+def _turns(count: int) -> list:
+    messages = []
+    for i in range(count):
+        messages += [HumanMessage(content=f"q{i}"), AIMessage(content=f"a{i}")]
+    return messages
+
+
+async def test_append_assigns_consecutive_seqs():
+    store = MessageStore()
+
+    assert await store.append_messages("s", _turns(1)) == [1, 2]
+    assert await store.append_messages("s", _turns(1)) == [3, 4]
+    assert await store.count_messages("s") == 4
+    assert await store.count_messages("unknown") is None
+
+
+async def test_default_read_returns_the_latest_page():
+    store = MessageStore()
+    await store.append_messages("s", _turns(5))
+
+    page = await store.get_messages("s", limit=4)
+    assert [m["content"] for m in page["history"]] == ["q3", "a3", "q4", "a4"]
+    assert (page["first_seq"], page["last_seq"], page["has_more"]) == (7, 10, True)
+
+    older = await store.get_messages("s", limit=4, before_seq=page["first_seq"])
+    assert [m["seq"] for m in older["history"]] == [3, 4, 5, 6]
+    oldest = await store.get_messages("s", limit=4, before_seq=older["first_seq"])
+    assert [m["seq"] for m in oldest["history"]] == [1, 2]
+    assert oldest["has_more"] is False
+
+
+async def test_incremental_read_after_seq():
+    store = MessageStore()
+    await store.append_messages("s", _turns(3))
+
+    page = await store.get_messages("s", after_seq=2, limit=3)
+    assert [m["seq"] for m in page["history"]] == [3, 4, 5]
+    assert (page["last_seq"], page["has_more"]) == (5, True)
+    empty = await store.get_messages("s", after_seq=6)
+    assert empty["history"] == [] and empty["last_seq"] == 6
+
+
+async def test_backfill_imports_the_checkpoint_once(app_client):
+    checkpointer = main.app.state.checkpointer
+    graph = main.graph_registry.get("chatbot", checkpointer)
+    config = {"configurable": {"thread_id": "legacy"}}
+    await graph.aupdate_state(config, {"messages": _turns(2)})
+    store = MessageStore()
+
+    results = await asyncio.gather(
+        store.backfill_from_checkpoint("legacy", checkpointer),
+        store.backfill_from_checkpoint("legacy", checkpointer),
+    )
+
+    assert sorted(results) == [0, 4]
+    page = await store.get_messages("legacy")
+    assert [m["content"] for m in page["history"]] == ["q0", "a0", "q1", "a1"]
+
+
+async def test_failed_backfill_is_retried(app_client, monkeypatch):
+    checkpointer = main.app.state.checkpointer
+    graph = main.graph_registry.get("chatbot", checkpointer)
+    await graph.aupdate_state(
+        {"configurable": {"thread_id": "legacy"}}, {"messages": _turns(2)}
+    )
+    store = MessageStore()
+
+    async def unreachable(*args, **kwargs):
+        raise AutoReconnect("primary stepped down")
+
+    monkeypatch.setattr(store.messages_collection, "insert_many", unreachable)
+    with pytest.raises(AutoReconnect):
+        await store.backfill_from_checkpoint("legacy", checkpointer)
+    assert await store.count_messages("legacy") is None
+
+    monkeypatch.undo()
+    assert await store.backfill_from_checkpoint("legacy", checkpointer) == 4
+    assert await store.count_messages("legacy") == 4
+
+
+async def test_history_read_during_the_first_turn_is_not_imported(
+    app_client, scripted_model
+):
+    # Regression: the read imported the in-flight checkpoint, and the turn then
+    # appended its human message a second time.
+    scripted_model.delay_seconds = 0.3
+    chat = asyncio.create_task(
+        app_client.post("/api/chat", json={"message": "q0", "session_id": "s"})
+    )
+    await asyncio.sleep(0.15)
+    during = (await app_client.get("/api/chat/history/s")).json()
+    await chat
+
+    assert during["history"] == []
+    history = (await app_client.get("/api/chat/history/s")).json()
+    assert [(m["type"], m["content"], m["seq"]) for m in history["history"]] == [
+        ("human", "q0", 1),
+        ("ai", "你好 世界", 2),
+    ]
+
+
+async def test_legacy_session_keeps_its_history_after_a_new_turn(app_client):
+    # Regression: the checkpoint fallback used to stop as soon as one new turn was
+    # stored, hiding every message from before the message store existed.
+    graph = main.graph_registry.get("chatbot", main.app.state.checkpointer)
+    config = {"configurable": {"thread_id": "legacy"}}
+    await graph.aupdate_state(config, {"messages": _turns(2)})
+
+    response = await app_client.post(
+        "/api/chat", json={"message": "q2", "session_id": "legacy"}
+    )
+    assert sse_events(response.text)[-1]["type"] == "message_done"
+
+    history = (await app_client.get("/api/chat/history/legacy")).json()
+    contents = [m["content"] for m in history["history"]]
+    assert contents == ["q0", "a0", "q1", "a1", "q2", "你好 世界"]
+    assert [m["seq"] for m in history["history"]] == [1, 2, 3, 4, 5, 6]
+
+
+async def test_failed_turn_still_records_the_human_message(app_client, scripted_model):
+    scripted_model.error = "model down"
+    response = await app_client.post(
+        "/api/chat", json={"message": "hello?", "session_id": "s"}
+    )
+    assert any(event["type"] == "error" for event in sse_events(response.text))
+
+    history = (await app_client.get("/api/chat/history/s")).json()
+    assert [(m["type"], m["content"]) for m in history["history"]] == [
+        ("human", "hello?")
+    ]
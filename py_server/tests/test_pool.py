@@ -0,0 +1,59 @@
+import pytest
+from langchain_core.messages import HumanMessage
+
+from src.modals.pool import ModelPool, load_backend_configs
+from tests.fakes import ScriptedChatModel
+
+PROMPT = [HumanMessage(content="hi")]
+
+
+def _pool(*backends, hedge_after_ms=0) -> ModelPool:
+    return ModelPool(backends=list(backends), hedge_after_ms=hedge_after_ms)
+
+
+def test_backend_configs_are_validated():
+    assert load_backend_configs("") == []
+    assert load_backend_configs('[{"model": "a"}]') == [{"model": "a"}]
+    with pytest.raises(ValueError):
+        load_backend_configs('[{"base_url": "http://x"}]')
+    with pytest.raises(ValueError):
+        ModelPool(backends=[])
+
+
+async def test_failed_backend_fails_over_and_is_ranked_last():
+    broken = ScriptedChatModel(error="rate limited")
+    healthy = ScriptedChatModel(replies=["ok"])
+    pool = _pool(broken, healthy)
+
+    assert (await pool.ainvoke(PROMPT)).content == "ok"
+    assert pool._ranked() == [1, 0]
+    stats = pool.stats()
+    assert [s["errors"] for s in stats] == [1, 0]
+    assert [s["in_flight"] for s in stats] == [0, 0]
+
+    assert pool.invoke(PROMPT).content == "ok"
+    assert broken.calls == 0 and healthy.calls == 2
+
+
+async def test_late_first_token_is_hedged_to_the_next_backend():
+    slow = ScriptedChatModel(replies=["slow"], delay_seconds=5)
+    fast = ScriptedChatModel(replies=["fast"])
+    pool = _pool(slow, fast, hedge_after_ms=20)
+
+    chunks = [chunk.content async for chunk in pool.astream(PROMPT)]
+
+    assert "".join(chunks) == "fast"
+    stats = pool.stats()
+    assert stats[1]["hedges"] == 1
+    assert [s["in_flight"] for s in stats] == [0, 0]
+    # The cancelled attempt is not an error, but its wait counts as its latency.
+    assert stats[0]["errors"] == 0 and stats[0]["p50_ttft_ms"] >= 20
+    assert pool._ranked() == [1, 0]
+
+
+async def test_busy_backends_score_worse():
+    pool = _pool(ScriptedChatModel(), ScriptedChatModel())
+    pool._begin(0)
+    assert pool._ranked() == [1, 0]
+    pool._end(0, None)
+    assert pool._ranked() == [0, 1]
@@ -0,0 +1,53 @@
+import os
+
+from src.prompts.apply import TemplateRegistry, prompt_registry
+
+
+def _write(directory, name: str, text: str, mtime: int):
+    path = os.path.join(directory, f"{name}.jinja-md")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.utime(path, (mtime, mtime))
+
+
+def test_bundled_templates_are_compiled_at_import():
+    names = {name[: -len(".jinja-md")] for name in os.listdir(prompt_registry.template_dir)}
+    assert names and names <= set(prompt_registry._templates)
+
+
+def test_renders_are_memoized_and_bounded(tmp_path):
+    _write(tmp_path, "greet", "你好 {{ user }}", 1)
+    registry = TemplateRegistry(str(tmp_path), render_cache_size=2)
+
+    first = registry.render("greet", user="a")
+    assert registry.render("greet", user="a") is first
+    registry.render("greet", user="b")
+    registry.render("greet", user="c")
+
+    assert first == "你好 a"
+    assert len(registry._renders) == 2
+    # Arguments that cannot be keyed are rendered without memoization.
+    assert registry.render("greet", user=object()).startswith("你好 <object")
+    assert len(registry._renders) == 2
+
+
+def test_watch_mode_reloads_changed_templates(tmp_path):
+    _write(tmp_path, "greet", "v1 {{ user }}", 1)
+    watched = TemplateRegistry(str(tmp_path), watch=True)
+    fixed = TemplateRegistry(str(tmp_path))
+    assert watched.render("greet", user="a") == fixed.render("greet", user="a") == "v1 a"
+
+    _write(tmp_path, "greet", "v2 {{ user }}", 2)
+
+    assert watched.render("greet", user="a") == "v2 a"
+    assert fixed.render("greet", user="a") == "v1 a"
+
+
+def test_bytecode_cache_is_written(tmp_path):
+    templates, cache = tmp_path / "templates", tmp_path / "cache"
+    templates.mkdir()
+    _write(templates, "greet", "{{ user }}", 1)
+
+    TemplateRegistry(str(templates), bytecode_cache_dir=str(cache)).compile_all()
+
+    assert len(os.listdir(cache)) == 1
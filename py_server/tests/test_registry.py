@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from langgraph.checkpoint.memory import InMemorySaver
+
+import main
+from src.graph.builder import build_graph
+from src.graph.registry import GraphRegistry, graph_registry
+
+
+def test_graphs_are_compiled_once_per_checkpointer():
+    registry = GraphRegistry()
+    builds = []
+    registry.register("g", lambda saver: builds.append(saver) or build_graph(saver))
+    first, second = InMemorySaver(), InMemorySaver()
+
+    assert registry.get("g", first) is registry.get("g", first)
+    assert registry.get("g", second) is not registry.get("g", first)
+    assert registry.get("g", second).checkpointer is second
+    assert builds == [first, second]
+
+    registry.register("g", build_graph)
+    assert registry.get("g", first) is not None and len(builds) == 2
+    with pytest.raises(KeyError):
+        registry.get("missing")
+
+
+def test_path_builders_are_imported_on_first_use():
+    registry = GraphRegistry()
+    registry.register("lazy", "src.graph.builder:build_graph")
+    # Registering a path never imports it, so a bad one only fails when used.
+    registry.register("broken", "tests.no_such_module:build")
+
+    assert registry.names() == ["lazy", "broken"]
+    saver = InMemorySaver()
+    assert registry.get("lazy", saver).checkpointer is saver
+    with pytest.raises(ModuleNotFoundError):
+        registry.get("broken", saver)
+
+
+async def test_parallel_chats_keep_their_own_checkpoints(app_client):
+    sessions = [f"s{i}" for i in range(30)]
+
+    async def chat(session_id: str):
+        for turn in range(2):
+            response = await app_client.post(
+                "/api/chat", json={"message": f"{session_id}/{turn}", "session_id": session_id}
+            )
+            assert response.status_code == 200
+
+    await asyncio.gather(*(chat(session_id) for session_id in sessions))
+
+    graph = graph_registry.get("chatbot", main.app.state.checkpointer)
+    for session_id in sessions:
+        state = await graph.aget_state({"configurable": {"thread_id": session_id}})
+        humans = [m.content for m in state.values["messages"] if m.type == "human"]
+        assert humans == [f"{session_id}/0", f"{session_id}/1"]
+        assert len(state.values["messages"]) == 4
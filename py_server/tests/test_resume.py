@@ -0,0 +1,80 @@
+import asyncio
+
+from src.runs.buffer import FrameBuffer, parse_event_id
+from src.utils.sse import sse_frame
+from tests.fakes import sse_events
+
+
+def _event_ids(body: str) -> list:
+    return [line[len("id: ") :] for line in body.splitlines() if line.startswith("id: ")]
+
+
+def test_parse_event_id():
+    assert parse_event_id("abc:12") == ("abc", 12)
+    assert parse_event_id(" abc:def:3 ") == ("abc:def", 3)
+    assert parse_event_id("abc") is None
+    assert parse_event_id("abc:x") is None
+    assert parse_event_id(None) is None
+
+
+async def _collect(iterator) -> list:
+    return [frame async for frame in iterator]
+
+
+async def test_buffer_replays_missed_frames_then_follows_live():
+    buffer = FrameBuffer("run", max_frames=10)
+    for i in range(3):
+        buffer.append(sse_frame({"n": i}))
+
+    subscriber = asyncio.create_task(_collect(buffer.subscribe(after_seq=1)))
+    await asyncio.sleep(0)
+    buffer.append(sse_frame({"n": 3}))
+    buffer.close()
+
+    frames = await subscriber
+    ids = [frame.split("\n")[0] for frame in frames]
+    assert ids == ["id: run:2", "id: run:3", "id: run:4"]
+    assert [event["n"] for event in sse_events("".join(frames))] == [1, 2, 3]
+
+
+async def test_buffer_reports_truncated_replay():
+    buffer = FrameBuffer("run", max_frames=2)
+    for i in range(5):
+        buffer.append(sse_frame({"n": i}))
+    buffer.close()
+
+    events = sse_events("".join(await _collect(buffer.subscribe())))
+    assert events == [{"type": "replay_truncated"}, {"n": 3}, {"n": 4}]
+
+
+async def test_reconnect_without_session_id_resumes_a_new_session(app_client):
+    # Regression: a new session's first turn has no session_id, and the reconnect
+    # (which repeats the original request body) was rejected with a 410.
+    first = await app_client.post("/api/chat", json={"message": "hi"})
+    ids = _event_ids(first.text)
+
+    resumed = await app_client.post(
+        "/api/chat", json={"message": "hi"}, headers={"Last-Event-ID": ids[0]}
+    )
+
+    assert resumed.status_code == 200
+    assert _event_ids(resumed.text) == ids[1:]
+    session_id = sse_events(first.text)[0]["session_id"]
+    history = (await app_client.get(f"/api/chat/history/{session_id}")).json()
+    # Resuming attached to the run instead of starting a second generation.
+    assert [m["type"] for m in history["history"]] == ["human", "ai"]
+
+
+async def test_reconnect_to_another_session_is_rejected(app_client):
+    first = await app_client.post("/api/chat", json={"message": "hi", "session_id": "a"})
+    last_id = _event_ids(first.text)[0]
+
+    other = await app_client.post(
+        "/api/chat",
+        json={"message": "hi", "session_id": "b"},
+        headers={"Last-Event-ID": last_id},
+    )
+    unknown = await app_client.post(
+        "/api/chat", json={"message": "hi"}, headers={"Last-Event-ID": "nope:1"}
+    )
+    assert (other.status_code, unknown.status_code) == (410, 410)
@@ -0,0 +1,195 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.graph import MessagesState, StateGraph
+
+from src.db.checkpointer import create_checkpointer
+from src.db.retention import CheckpointRetention, RetentionReport, checkpoint_id_before
+from src.graph.builder import build_graph
+from src.graph.context import assemble_context
+from tests.fakes import ScriptedChatModel
+
+
+def test_checkpoint_id_before_orders_like_checkpoint_ids():
+    cutoff = checkpoint_id_before(0)
+    assert checkpoint_id_before(3600) < cutoff < str(uuid6())
+    assert str(uuid6(clock_seq=0)) > checkpoint_id_before(1)
+
+
+@pytest.fixture
+async def checkpointer():
+    return await create_checkpointer()
+
+
+def _conversation(turns: int, tool_calls: bool = False) -> list:
+    messages = []
+    for i in range(turns):
+        messages.append(HumanMessage(content=f"问题 {i} " * 20, id=f"h{i}"))
+        if tool_calls:
+            call = {"name": "search", "args": {"q": str(i)}, "id": f"call{i}"}
+            messages.append(AIMessage(content="", tool_calls=[call], id=f"c{i}"))
+            messages.append(ToolMessage(content="结果 " * 40, tool_call_id=f"call{i}"))
+        messages.append(AIMessage(content=f"回答 {i} " * 20, id=f"a{i}"))
+    return messages
+
+
+def _other_graph(checkpointer):
+    def other(state):
+        return {"messages": [AIMessage(content="other")]}
+
+    workflow = StateGraph(MessagesState)
+    workflow.add_node("other", other)
+    workflow.set_entry_point("other")
+    return workflow.compile(checkpointer=checkpointer)
+
+
+async def test_prune_keeps_the_latest_checkpoints(checkpointer, scripted_model):
+    scripted_model.replies = ["ok"]
+    graph = build_graph(checkpointer)
+    config = {"configurable": {"thread_id": "t"}}
+    for i in range(3):
+        await graph.ainvoke({"messages": [HumanMessage(content=str(i))]}, config)
+
+    retention = CheckpointRetention(checkpointer, keep_last=2)
+    report = RetentionReport()
+    await retention.prune_checkpoints(report)
+
+    # Every turn writes an input checkpoint and one per step.
+    assert report.deleted_checkpoints == 3 * 3 - 2
+    assert report.deleted_writes > 0 and report.reclaimed_bytes > 0
+    remaining = [c async for c in checkpointer.alist(config)]
+    assert len(remaining) == 2
+    state = await graph.aget_state(config)
+    contents = [m.content for m in state.values["messages"]]
+    assert contents == ["0", "ok", "1", "ok", "2", "ok"]
+
+
+async def test_summarize_keeps_a_window_starting_on_a_human_message(
+    checkpointer, scripted_model
+):
+    graph = build_graph(checkpointer)
+    config = {"configurable": {"thread_id": "t"}, "metadata": {"agent_id": "chatbot"}}
+    await graph.ainvoke({"messages": _conversation(4, tool_calls=True)}, config)
+    model = ScriptedChatModel(replies=["摘要"])
+    retention = CheckpointRetention(
+        checkpointer,
+        summary_token_budget=400,
+        graph_for={"chatbot": graph}.get,
+        summary_model=model,
+    )
+
+    report = RetentionReport()
+    await retention.summarize_threads(report, checkpoint_id_before(60))
+
+    assert report.summarized_threads == 1 and not report.errors
+    messages = (await graph.aget_state(config)).values["messages"]
+    assert isinstance(messages[0], SystemMessage) and "摘要" in messages[0].content
+    assert isinstance(messages[1], HumanMessage)
+    assert not any(isinstance(m, ToolMessage) for m in messages[1:2])
+    # The rewritten checkpoint stays tagged with its agent.
+    latest = await checkpointer.aget_tuple({"configurable": {"thread_id": "t"}})
+    assert latest.metadata["agent_id"] == "chatbot"
+
+
+async def test_summarize_skips_threads_of_other_graphs(checkpointer):
+    chatbot = build_graph(checkpointer)
+    other = _other_graph(checkpointer)
+    long_history = {"messages": [HumanMessage(content="很长的问题 " * 200)]}
+    tagged = {"configurable": {"thread_id": "tagged"}, "metadata": {"agent_id": "x"}}
+    untagged = {"configurable": {"thread_id": "untagged"}}
+    await other.ainvoke(long_history, tagged)
+    await other.ainvoke(long_history, untagged)
+    retention = CheckpointRetention(
+        checkpointer,
+        summary_token_budget=100,
+        # Untagged threads are assumed to belong to the chatbot.
+        graph_for={None: chatbot, "chatbot": chatbot}.get,
+        summary_model=ScriptedChatModel(),
+    )
+
+    report = RetentionReport()
+    await retention.summarize_threads(report, checkpoint_id_before(60))
+
+    assert (report.summarized_threads, report.skipped_threads) == (0, 2)
+    state = await other.aget_state(untagged)
+    assert [m.content for m in state.values["messages"]][-1] == "other"
+
+
+async def test_one_failing_thread_does_not_stop_the_others(checkpointer, scripted_model):
+    graph = build_graph(checkpointer)
+    for thread_id in ("a", "b"):
+        config = {"configurable": {"thread_id": thread_id}}
+        await graph.ainvoke({"messages": _conversation(4)}, config)
+    model = ScriptedChatModel(replies=["摘要"], error="model down")
+    retention = CheckpointRetention(
+        checkpointer,
+        summary_token_budget=200,
+        graph_for=lambda agent_id: graph,
+        summary_model=model,
+    )
+
+    report = await retention.run_once()
+
+    assert sorted(error.split(":")[0] for error in report.errors) == ["a", "b"]
+    model.error = None
+    report = RetentionReport()
+    await retention.summarize_threads(report, checkpoint_id_before(60))
+    assert report.summarized_threads == 2
+
+
+async def test_summarize_resets_the_rolling_summary(checkpointer, scripted_model):
+    graph = build_graph(checkpointer)
+    config = {"configurable": {"thread_id": "t"}}
+    await graph.ainvoke({"messages": _conversation(4)}, config)
+    await graph.aupdate_state(config, {"summary": "旧摘要", "summary_until_id": "a1"})
+    retention = CheckpointRetention(
+        checkpointer,
+        summary_token_budget=200,
+        graph_for=lambda agent_id: graph,
+        summary_model=ScriptedChatModel(replies=["摘要"]),
+    )
+
+    report = RetentionReport()
+    await retention.summarize_threads(report, checkpoint_id_before(60))
+
+    assert report.summarized_threads == 1
+    values = (await graph.aget_state(config)).values
+    assert (values["summary"], values["summary_until_id"]) == ("", "")
+    prompt, _ = await assemble_context(values, scripted_model)
+    assert [m.content for m in prompt if isinstance(m, SystemMessage)] == [
+        "此前对话摘要：摘要"
+    ]
+
+
+async def test_summarize_skips_threads_with_a_run_in_flight(checkpointer, scripted_model):
+    graph = build_graph(checkpointer)
+    for thread_id in ("busy", "late"):
+        config = {"configurable": {"thread_id": thread_id}}
+        await graph.ainvoke({"messages": _conversation(4)}, config)
+    retention = CheckpointRetention(
+        checkpointer,
+        summary_token_budget=200,
+        graph_for=lambda agent_id: graph,
+        summary_model=ScriptedChatModel(replies=["摘要"], delay_seconds=0.2),
+        thread_busy=lambda thread_id: thread_id == "busy",
+    )
+
+    async def new_turn():
+        # Starts on "late" while its summary is being generated.
+        await asyncio.sleep(0.1)
+        config = {"configurable": {"thread_id": "late"}}
+        await graph.ainvoke({"messages": [HumanMessage(content="新问题")]}, config)
+
+    report = RetentionReport()
+    await asyncio.gather(
+        retention.summarize_threads(report, checkpoint_id_before(60)), new_turn()
+    )
+
+    assert (report.summarized_threads, report.skipped_threads) == (0, 2)
+    for thread_id in ("busy", "late"):
+        state = await graph.aget_state({"configurable": {"thread_id": thread_id}})
+        assert not isinstance(state.values["messages"][0], SystemMessage)
+    late = await graph.aget_state({"configurable": {"thread_id": "late"}})
+    assert late.values["messages"][-2].content == "新问题"
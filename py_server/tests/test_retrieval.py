@@ -0,0 +1,97 @@
+import os
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.retrieval.index import Chunk, HybridIndex, chunk_text, tokenize
+from src.retrieval.knowledge_base import DirectorySource, KnowledgeBase
+
+
+class TopicEmbeddings(Embeddings):
+    """Two axes: texts about cats and everything else."""
+
+    def embed_query(self, text: str) -> List[float]:
+        return [1.0, 0.0] if "cat" in text or "猫" in text else [0.0, 1.0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+def _chunk(doc_id: str, text: str) -> Chunk:
+    return Chunk(doc_id, doc_id, text, 0)
+
+
+def test_tokenize_splits_cjk_into_unigrams_and_bigrams():
+    assert tokenize("Hello, 知识库 v2") == ["hello", "知", "识", "库", "知识", "识库", "v2"]
+
+
+def test_chunk_text_packs_paragraphs_and_cuts_long_ones():
+    assert chunk_text("a\n\nb\n\n\nc", size=10, overlap=2) == ["a\n\nb\n\nc"]
+    long = "x" * 25
+    chunks = chunk_text(f"intro\n\n{long}", size=10, overlap=2)
+    assert chunks[0] == "intro"
+    assert all(len(chunk) <= 10 for chunk in chunks)
+    assert "".join(chunk[2:] if i else chunk for i, chunk in enumerate(chunks[1:])) == long
+
+
+def test_keyword_search_ranks_by_bm25_and_skips_removed_documents():
+    index = HybridIndex()
+    index.add([_chunk("a", "apple pie recipe"), _chunk("b", "apple apple tart")])
+    index.add([_chunk("c", "banana bread")])
+
+    hits = index.search(tokenize("apple"), k=5)
+    assert [hit.chunk.doc_id for hit in hits] == ["b", "a"]
+
+    assert index.remove("b") == 1
+    assert [hit.chunk.doc_id for hit in index.search(tokenize("apple"))] == ["a"]
+    assert len(index) == 2 and index.documents == 2
+
+
+def test_hybrid_search_mixes_dense_and_keyword_scores():
+    index = HybridIndex()
+    vectors = np.array([[1.0, 0.0], [0.0, 1.0]])
+    index.add([_chunk("cats", "feline care"), _chunk("dogs", "pet care")], vectors)
+
+    dense_only = index.search(tokenize("care"), [1.0, 0.0], k=1, alpha=1.0)
+    keyword_only = index.search(tokenize("pet"), [1.0, 0.0], k=1, alpha=0.0)
+
+    assert dense_only[0].chunk.doc_id == "cats"
+    assert keyword_only[0].chunk.doc_id == "dogs"
+
+
+def test_saved_index_loads_memory_mapped_and_stays_writable(tmp_path):
+    index = HybridIndex()
+    index.add([_chunk("a", "apple"), _chunk("b", "banana")], np.eye(2))
+    index.remove("a")
+    index.save(str(tmp_path), {"versions": {"b": "1"}})
+
+    loaded, metadata = HybridIndex.load(str(tmp_path))
+    assert metadata == {"versions": {"b": "1"}}
+    assert isinstance(loaded._vectors, np.memmap)
+    loaded.add([_chunk("c", "cherry")], [[1.0, 0.0]])
+    assert [h.chunk.doc_id for h in loaded.search(["cherry"], [1.0, 0.0], k=1)] == ["c"]
+
+
+async def test_knowledge_base_reindexes_only_changed_documents(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "cats.md").write_text("猫 喜欢 睡觉", encoding="utf-8")
+    (docs / "dogs.md").write_text("狗 喜欢 散步", encoding="utf-8")
+    kb = KnowledgeBase(
+        DirectorySource(str(docs)), TopicEmbeddings(), index_dir=str(tmp_path / "index")
+    )
+
+    hits = await kb.search("猫")
+    assert hits[0].chunk.doc_id == "cats.md"
+    assert kb.last_sync["updated"] == 2
+
+    (docs / "dogs.md").write_text("狗 喜欢 跑步 和 散步", encoding="utf-8")
+    os.utime(docs / "dogs.md", ns=(1, 1))
+    (docs / "cats.md").unlink()
+    report = await kb.sync()
+    assert (report["updated"], report["removed"], report["documents"]) == (1, 1, 1)
+
+    restored = KnowledgeBase(DirectorySource(str(docs)), index_dir=str(tmp_path / "index"))
+    assert (await restored.sync())["updated"] == 0
+    assert [hit.chunk.doc_id for hit in await restored.search("跑步")] == ["dogs.md"]
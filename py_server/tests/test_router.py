@@ -0,0 +1,77 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+from src.graph.registry import GraphRegistry
+from src.graph.router import (
+    DIRECT_REPLIES,
+    ROUTE_DIRECT,
+    ROUTE_PLANNER,
+    ROUTE_RESEARCHER,
+    ROUTE_SUPERVISOR,
+    RouteDecision,
+    RouterMetrics,
+    classify,
+    count_handoffs,
+)
+
+
+@pytest.mark.parametrize(
+    "text, route",
+    [
+        ("你好！", ROUTE_DIRECT),
+        ("Thank you", ROUTE_DIRECT),
+        ("拜拜~", ROUTE_DIRECT),
+        ("帮我搜索一下深圳天气", ROUTE_RESEARCHER),
+        ("search for langgraph docs", ROUTE_RESEARCHER),
+        ("帮我制定一个学习计划", ROUTE_PLANNER),
+        ("create a travel plan for Tokyo", ROUTE_PLANNER),
+        ("你好，帮我分析一下这份财报", ROUTE_SUPERVISOR),
+        ("搜索", ROUTE_SUPERVISOR),
+        ("你好" * 120, ROUTE_SUPERVISOR),
+    ],
+)
+def test_classify_routes_only_clear_cut_turns(text, route):
+    assert classify([HumanMessage(content=text)]).route == route
+
+
+def test_classify_leaves_non_user_turns_to_the_supervisor():
+    assert classify([]).route == ROUTE_SUPERVISOR
+    assert classify([HumanMessage(content="hi"), AIMessage(content="x")]).route == (
+        ROUTE_SUPERVISOR
+    )
+
+
+def test_metrics_count_routes_handoffs_and_saved_latency():
+    metrics = RouterMetrics()
+    metrics.record_hop(0.2)
+    metrics.record_hop(0.4)
+    handoff = ToolMessage(content="", tool_call_id="c", name="transfer_to_researcher")
+    back = ToolMessage(content="", tool_call_id="d", name="transfer_back_to_supervisor")
+
+    metrics.record_turn(RouteDecision(ROUTE_DIRECT, "greeting"), 0, 0.01)
+    metrics.record_turn(RouteDecision(ROUTE_RESEARCHER, "search"), 1, 1.0)
+    metrics.record_turn(
+        RouteDecision(ROUTE_SUPERVISOR, "uncertain"), count_handoffs([handoff, back]), 2.0
+    )
+
+    snapshot = metrics.snapshot()
+    assert snapshot["routes"] == {"direct": 1, "researcher": 1, "supervisor": 1}
+    assert snapshot["handoffs"] == 2 and snapshot["handoffs_per_turn"] == 0.67
+    assert snapshot["llm_hops_avoided"] == 3
+    assert snapshot["saved_ms"] == pytest.approx(900, abs=1)
+
+
+async def test_greetings_are_answered_without_a_model_call():
+    # The supervisor's model points at an address nothing listens on.
+    registry = GraphRegistry()
+    registry.register("supervisor", "src.agents.supervisor:build_supervisor")
+    graph = registry.get("supervisor", InMemorySaver())
+
+    state = await graph.ainvoke(
+        {"messages": [HumanMessage(content="你好")]},
+        {"configurable": {"thread_id": "t"}},
+    )
+
+    assert state["messages"][-1].content == DIRECT_REPLIES["greeting"]
+    assert state["route"] == ROUTE_DIRECT
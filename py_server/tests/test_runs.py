@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from src.runs.manager import CANCELLED, DONE, FAILED, RunManager, RunQueueFull
+from src.utils.sse import sse_frame
+from tests.fakes import sse_events
+
+
+async def _frames(count: int, delay: float = 0.0, error: str = None):
+    for i in range(count):
+        await asyncio.sleep(delay)
+        yield sse_frame({"type": "message", "n": i})
+    if error:
+        raise RuntimeError(error)
+
+
+async def _events(run) -> list:
+    return sse_events("".join([frame async for frame in run.buffer.subscribe()]))
+
+
+async def test_finished_run_ends_with_message_done():
+    manager = RunManager()
+    run = manager.start("s", _frames(2))
+
+    events = await _events(run)
+
+    assert [event["type"] for event in events] == ["message", "message", "message_done"]
+    assert events[-1]["status"] == DONE == run.status
+
+
+async def test_failed_run_sends_error_then_message_done():
+    manager = RunManager()
+    run = manager.start("s", _frames(1, error="boom"))
+
+    events = await _events(run)
+
+    assert [event["type"] for event in events] == ["message", "error", "message_done"]
+    assert events[-1]["status"] == FAILED
+    assert run.error == "boom"
+
+
+async def test_cancel_waits_for_the_final_status():
+    manager = RunManager()
+    run = manager.start("s", _frames(100, delay=0.01))
+    subscriber = asyncio.create_task(_events(run))
+    await asyncio.sleep(0.03)
+
+    cancelled = await manager.cancel(run.run_id)
+
+    assert cancelled is run and run.status == CANCELLED and run.done
+    events = await subscriber
+    assert [event["type"] for event in events[-2:]] == ["cancelled", "message_done"]
+    assert events[-1]["status"] == CANCELLED
+    assert manager.stats()["running"] == 0
+    assert await manager.cancel("unknown") is None
+
+
+async def test_active_runs_are_tracked_per_session():
+    manager = RunManager()
+    first = manager.start("s", _frames(1))
+    second = manager.start("s", _frames(3, delay=0.01))
+    assert manager.has_active_run("s") and not manager.has_active_run("t")
+
+    await _events(first)
+    assert manager.has_active_run("s")
+    await _events(second)
+    assert not manager.has_active_run("s")
+
+
+async def test_queued_runs_wait_and_the_queue_is_bounded():
+    manager = RunManager(max_concurrency=1, max_queue=1)
+    first = manager.start("a", _frames(3, delay=0.01))
+    queued = manager.start("b", _frames(1))
+    await asyncio.sleep(0)
+    assert manager.stats()["queued"] == 1
+    with pytest.raises(RunQueueFull):
+        manager.start("c", _frames(1))
+
+    await manager.cancel(queued.run_id)
+    assert queued.status == CANCELLED and queued.started_at is None
+    await _events(first)
+    assert first.status == DONE
+    assert manager.stats()["queued"] == manager.stats()["running"] == 0
+
+
+async def test_cancel_endpoint_reports_cancelled(app_client, scripted_model):
+    scripted_model.delay_seconds = 5
+    run = (await app_client.post("/api/runs", json={"message": "hi"})).json()
+    # Let the generation reach the model call.
+    await asyncio.sleep(0.1)
+
+    response = await app_client.post(f"/api/runs/{run['run_id']}/cancel")
+
+    assert response.json()["status"] == CANCELLED
+    stream = await app_client.get(f"/api/runs/{run['run_id']}/stream")
+    assert sse_events(stream.text)[-1] == {"type": "message_done", "status": CANCELLED}
+    # The human message is recorded even though the generation never finished.
+    history = (await app_client.get(f"/api/chat/history/{run['session_id']}")).json()
+    assert [m["content"] for m in history["history"]] == ["hi"]
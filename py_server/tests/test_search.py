@@ -0,0 +1,81 @@
+import asyncio
+import importlib
+
+import pytest
+
+from benchmarks.search_stub import StubSearchServer
+from src.utils.lazy import Lazy
+
+# `src.tools.search` is also the name of the tool exported by `src.tools`.
+search = importlib.import_module("src.tools.search")
+HTTPBackend, PageCache = search.HTTPBackend, search.PageCache
+extract_text, trim_to_tokens = search.extract_text, search.trim_to_tokens
+
+
+@pytest.fixture
+async def stub(monkeypatch):
+    # A client and fetch slots bound to this test's event loop.
+    monkeypatch.setattr(search, "http_client", Lazy(search._create_client))
+    monkeypatch.setattr(search, "_fetch_slots", asyncio.Semaphore(2))
+    with StubSearchServer(paragraphs=3) as server:
+        yield server
+    await search.close_search_client()
+
+
+def test_extract_text_drops_scripts_and_keeps_blocks():
+    html = (
+        "<html><head><title>t</title></head><body><script>x=1</script>"
+        "<h1>标题</h1><p>第一段   text</p><p>second</p></body></html>"
+    )
+    assert extract_text(html) == "标题\n第一段 text\nsecond"
+
+
+def test_trim_to_tokens_counts_cjk_as_whole_tokens():
+    assert trim_to_tokens("abcd" * 2, 2) == "abcdabcd"
+    assert trim_to_tokens("abcd" * 3, 2) == "abcdabcd…"
+    assert trim_to_tokens("一二三", 2) == "一二…"
+
+
+def test_page_cache_round_trip(tmp_path):
+    cache = PageCache(str(tmp_path), ttl=60)
+    assert cache.get("http://a") is None
+    cache.put("http://a", '"v1"', "text")
+
+    entry = cache.get("http://a")
+    assert (entry["etag"], entry["text"]) == ('"v1"', "text") and cache.fresh(entry)
+    assert not PageCache(str(tmp_path), ttl=0).fresh(entry)
+
+
+async def test_search_fetches_pages_and_trims_them(stub):
+    result = await search.web_search(
+        "天气", HTTPBackend(stub.url), max_results=3, token_budget=20
+    )
+
+    sections = result.split("\n\n")
+    assert len(sections) == 3
+    assert sections[0].startswith(f"[1] Page 0\n{stub.url}/pages/0\nPage 0\n第 0 页第 0 段")
+    assert all(section.endswith("…") for section in sections)
+    assert stub.requests == {"search": 1, "pages": 3, "not_modified": 0}
+
+
+async def test_cached_pages_are_revalidated_with_their_etag(stub, tmp_path):
+    url = f"{stub.url}/pages/1"
+    stale = PageCache(str(tmp_path), ttl=0)
+
+    first = await search.fetch_page(url, stale)
+    again = await search.fetch_page(url, stale)
+    fresh = await search.fetch_page(url, PageCache(str(tmp_path), ttl=60))
+
+    assert first == again == fresh and "第 1 页第 2 段" in first
+    assert stub.requests == {"search": 0, "pages": 1, "not_modified": 1}
+
+
+async def test_unreachable_pages_fall_back_to_the_snippet(stub, monkeypatch):
+    async def broken(url, cache=None):
+        raise OSError("unreachable")
+
+    monkeypatch.setattr(search, "fetch_page", broken)
+    result = await search.web_search("q", HTTPBackend(stub.url), max_results=1)
+    assert result.endswith("Snippet of page 0")
+    monkeypatch.setattr(search, "search_backend", None)
+    assert (await search.web_search("q")).startswith("搜索未配置")
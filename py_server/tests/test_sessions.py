@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import mongomock
+import pytest
+
+from src.db.migrate_sessions import migrate_embedded_sessions
+from src.db.sessions import decode_cursor, encode_cursor, new_session_document
+from src.db.user_model import UserModel
+from tests.fakes import bulk_write
+
+
+def _seed(model: UserModel, created_at: datetime, count: int, agent_id=None):
+    model.sessions_collection.insert_many(
+        [
+            new_session_document("u1", f"s{i:02d}", agent_id, created_at)
+            for i in range(count)
+        ]
+    )
+
+
+def test_cursor_pages_cover_every_session_once_despite_equal_timestamps():
+    model = UserModel()
+    _seed(model, datetime(2024, 1, 1), 7)
+
+    seen, cursor = [], None
+    while True:
+        page = model.list_user_sessions("u1", limit=3, cursor=cursor)
+        seen += [s["id"] for s in page["sessions"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == [f"s{i:02d}" for i in reversed(range(7))]
+
+
+def test_pages_filter_by_agent_and_reject_bad_cursors():
+    model = UserModel()
+    _seed(model, datetime(2024, 1, 1), 2, agent_id="chatbot")
+    model.sessions_collection.insert_one(
+        new_session_document("u1", "other", None, datetime(2024, 1, 2))
+    )
+
+    page = model.list_user_sessions("u1", agent_id="chatbot")
+    assert [s["id"] for s in page["sessions"]] == ["s01", "s00"]
+    assert page["next_cursor"] is None
+    with pytest.raises(ValueError):
+        model.list_user_sessions("u1", cursor="not-a-cursor")
+
+
+def test_cursor_round_trip():
+    doc = {"created_at": datetime(2024, 1, 1, 12, 30, 0, 123000), "session_id": "a|b"}
+    assert decode_cursor(encode_cursor(doc)) == (doc["created_at"], "a|b")
+
+
+async def test_bad_cursor_is_a_bad_request(app_client):
+    response = await app_client.get("/api/users/sessions/u1", params={"cursor": "x"})
+    assert response.status_code == 400
+
+
+def test_migration_moves_embedded_sessions_in_order(monkeypatch):
+    monkeypatch.setattr(
+        mongomock.Collection, "bulk_write", lambda self, ops, **kwargs: bulk_write(self, ops)
+    )
+    model = UserModel()
+    model.users_collection.insert_one(
+        {
+            "user_id": "u1",
+            "created_at": datetime(2024, 1, 1),
+            "session_ids": ["a", {"id": "b", "agent_id": "chatbot"}, {"id": None}],
+        }
+    )
+
+    assert migrate_embedded_sessions(dry_run=True)["inserted"] == 0
+    assert model.sessions_collection.count_documents({}) == 0
+
+    stats = migrate_embedded_sessions()
+    page = model.list_user_sessions("u1")
+    user = model.users_collection.find_one({"user_id": "u1"})
+
+    assert stats == {"users": 1, "sessions": 2, "inserted": 2}
+    assert [(s["id"], s["agent_id"]) for s in page["sessions"]] == [
+        ("b", "chatbot"),
+        ("a", "main_agent"),
+    ]
+    assert user["session_count"] == 2 and "session_ids" not in user
+    assert migrate_embedded_sessions()["users"] == 0
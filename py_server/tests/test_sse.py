@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+from src.utils.sse import MessageFrameEncoder, coalesce_frames, sse_frame
+from tests.fakes import sse_events
+
+
+async def _source(items, delay: float = 0.0):
+    for item in items:
+        await asyncio.sleep(delay)
+        yield item
+
+
+async def _coalesce(items, delay: float = 0.0, **limits) -> list:
+    frames = coalesce_frames(_source(items, delay), MessageFrameEncoder("s"), **limits)
+    return sse_events("".join([frame async for frame in frames]))
+
+
+def test_encoder_matches_sse_frame():
+    encoder = MessageFrameEncoder("会话")
+    head = {"session_id": "会话", "type": "message", "send_type": "ai"}
+    for content in ["你好", 'quote " and \\', ["list"], {"k": 1}]:
+        assert encoder.encode(content, "ai") == sse_frame({**head, "content": content})
+    assert json.loads(encoder.encode("x", None)[len("data: ") :])["send_type"] is None
+
+
+async def test_chunks_merge_until_the_send_type_or_a_frame_changes():
+    update = sse_frame({"type": "update"})
+    events = await _coalesce(
+        [("a", "ai"), ("b", "ai"), ("", "ai"), ("c", "tool"), update, ("d", "ai")]
+    )
+    assert [(e["type"], e.get("content")) for e in events] == [
+        ("message", "ab"),
+        ("message", "c"),
+        ("update", None),
+        ("message", "d"),
+    ]
+
+
+async def test_buffer_flushes_on_size_and_age():
+    by_size = await _coalesce([("ab", "ai"), ("cd", "ai"), ("e", "ai")], max_bytes=4)
+    assert [e["content"] for e in by_size] == ["abcd", "e"]
+
+    by_age = await _coalesce([("a", "ai"), ("b", "ai")], delay=0.05, max_delay_ms=10)
+    assert [e["content"] for e in by_age] == ["a", "b"]
+
+
+async def test_non_text_content_is_sent_alone():
+    events = await _coalesce([("a", "ai"), (["x"], "ai"), ("b", "ai")])
+    assert [e["content"] for e in events] == ["a", ["x"], "b"]
+
+
+async def test_chat_coalesces_when_asked(app_client, scripted_model):
+    scripted_model.replies = ["一 二 三 四"]
+    plain = await app_client.post("/api/chat", json={"message": "hi", "session_id": "a"})
+    merged = await app_client.post(
+        "/api/chat", json={"message": "hi", "session_id": "b", "coalesce_ms": 1000}
+    )
+
+    def messages(response):
+        return [e["content"] for e in sse_events(response.text) if e["type"] == "message"]
+
+    assert messages(plain) == ["一 ", "二 ", "三 ", "四"]
+    assert messages(merged) == ["一 二 三 四"]
@@ -0,0 +1,98 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.coze import rag
+from src.utils.swr import SWRCache
+
+
+class Loader:
+    def __init__(self, delay: float = 0.0):
+        self.calls = 0
+        self.delay = delay
+        self.error = None
+
+    async def __call__(self) -> int:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.calls
+
+
+def _age(cache: SWRCache, key, seconds: float):
+    cache._entries[key].fetched_at -= seconds
+
+
+async def test_concurrent_misses_share_one_load():
+    cache = SWRCache(ttl=60)
+    loader = Loader(delay=0.02)
+
+    values = await asyncio.gather(*(cache.get("k", loader) for _ in range(10)))
+
+    assert values == [1] * 10 and loader.calls == 1
+    assert await cache.get("k", loader) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 10
+
+
+async def test_stale_value_is_served_while_one_refresh_runs():
+    cache = SWRCache(ttl=1, stale_ttl=10)
+    loader = Loader(delay=0.02)
+    await cache.get("k", loader)
+    _age(cache, "k", 2)
+
+    stale = await asyncio.gather(*(cache.get("k", loader) for _ in range(5)))
+    assert stale == [1] * 5 and cache.stats()["in_flight"] == 1
+    await asyncio.sleep(0.05)
+
+    assert await cache.get("k", loader) == 2 and loader.calls == 2
+    _age(cache, "k", 20)
+    assert await cache.get("k", loader) == 3
+
+
+async def test_failed_refresh_keeps_the_stale_value():
+    cache = SWRCache(ttl=1, stale_ttl=10)
+    loader = Loader()
+    await cache.get("k", loader)
+    _age(cache, "k", 2)
+    loader.error = RuntimeError("down")
+
+    assert await cache.get("k", loader) == 1
+    await asyncio.sleep(0.01)
+    assert cache.stats()["errors"] == 1
+    assert await cache.get("k", loader) == 1
+
+    _age(cache, "k", 20)
+    with pytest.raises(RuntimeError):
+        await cache.get("k", loader)
+
+
+async def test_least_recently_used_keys_are_evicted():
+    cache = SWRCache(ttl=60, max_entries=2)
+    loader = Loader()
+    for key in ("a", "b", "a", "c"):
+        await cache.get(key, loader)
+
+    assert list(cache._entries) == ["a", "c"]
+    cache.invalidate("a")
+    assert list(cache._entries) == ["c"]
+
+
+async def test_dataset_listing_is_cached_and_outages_are_not(monkeypatch):
+    listed = []
+
+    async def list_datasets(space_id):
+        listed.append(space_id)
+        item = SimpleNamespace(model_dump=lambda: {"id": "d1"})
+        return SimpleNamespace(items=[item])
+
+    coze = SimpleNamespace(datasets=SimpleNamespace(list=list_datasets))
+    monkeypatch.setattr(rag, "datasets_cache", SWRCache(ttl=60))
+    monkeypatch.setattr(rag, "get_async_coze", lambda: None)
+    assert await rag.alist_datasets("space") == []
+
+    monkeypatch.setattr(rag, "get_async_coze", lambda: coze)
+    results = await asyncio.gather(*(rag.alist_datasets("space") for _ in range(3)))
+
+    assert results == [[{"id": "d1"}]] * 3 and listed == ["space"]
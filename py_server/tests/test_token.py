@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from src.coze.token import AccessToken, CozeTokenManager
+
+
+class Minter:
+    def __init__(self, lifetime: float = 3600, delay: float = 0.0):
+        self.lifetime = lifetime
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self, ttl: int) -> AccessToken:
+        time.sleep(self.delay)
+        self.calls += 1
+        return AccessToken(f"token-{self.calls}", time.time() + self.lifetime)
+
+
+@pytest.fixture
+def managers():
+    created = []
+
+    def create(mint, **kwargs) -> CozeTokenManager:
+        kwargs.setdefault("shared", False)
+        manager = CozeTokenManager(mint, key="client", **kwargs)
+        created.append(manager)
+        return manager
+
+    yield create
+    for manager in created:
+        manager.close()
+
+
+def test_token_is_minted_once_for_concurrent_callers(managers):
+    mint = Minter(delay=0.05)
+    manager = managers(mint)
+    tokens = []
+    threads = [threading.Thread(target=lambda: tokens.append(manager.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert tokens == ["token-1"] * 8 and mint.calls == 1
+    assert manager.get() == "token-1" and manager.stats()["mints"] == 1
+
+
+def test_token_is_refreshed_in_the_background_before_it_expires(managers):
+    mint = Minter()
+    manager = managers(mint, refresh_margin=60)
+    manager.get()
+    # The cached token enters the refresh window but is still valid.
+    manager._token = AccessToken("old", time.time() + 30)
+
+    assert manager.get() == "old"
+    deadline = time.time() + 2
+    while manager._token.access_token == "old" and time.time() < deadline:
+        time.sleep(0.01)
+    assert manager.get() == "token-2" and mint.calls == 2
+
+
+async def test_async_get_uses_the_cached_token(managers):
+    mint = Minter()
+    manager = managers(mint)
+
+    assert await manager.aget() == "token-1"
+    assert await manager.aget() == "token-1" and mint.calls == 1
+
+
+def test_shared_token_is_reused_by_other_workers(managers):
+    mint = Minter()
+    first = managers(mint, shared=True)
+    second = managers(mint, shared=True)
+
+    assert first.get() == second.get() == "token-1"
+    assert mint.calls == 1 and second.stats()["shared_hits"] == 1
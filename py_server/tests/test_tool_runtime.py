@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.tools import tool
+
+from src.tools import runtime
+from src.tools.runtime import cache_key, managed_tool
+from src.utils.swr import SWRCache
+
+calls = []
+
+
+@tool
+async def lookup(query: str) -> str:
+    """Looks a query up."""
+    calls.append(query)
+    await asyncio.sleep(0.05)
+    if query == "fail":
+        raise ValueError("lookup failed")
+    return f"result for {query}"
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    calls.clear()
+    monkeypatch.setattr(runtime, "tool_cache", SWRCache(ttl=60))
+
+
+def test_cache_key_ignores_key_order_and_whitespace():
+    assert cache_key("t", {"a": "x  y", "b": [" z "]}) == cache_key(
+        "t", {"b": ["z"], "a": "x y"}
+    )
+    assert cache_key("t", {"a": 1}) != cache_key("u", {"a": 1})
+
+
+async def test_identical_calls_share_one_run():
+    managed = managed_tool(lookup)
+
+    results = await asyncio.gather(
+        managed.ainvoke({"query": "天气"}),
+        managed.ainvoke({"query": " 天气 "}),
+        managed.ainvoke({"query": "新闻"}),
+    )
+
+    assert results == ["result for 天气", "result for 天气", "result for 新闻"]
+    assert sorted(calls) == ["天气", "新闻"]
+    await managed.ainvoke({"query": "天气"})
+    assert len(calls) == 2
+
+
+async def test_errors_are_not_cached_and_uncacheable_tools_always_run():
+    managed = managed_tool(lookup)
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            await managed.ainvoke({"query": "fail"})
+    uncached = managed_tool(lookup, cacheable=False)
+    await uncached.ainvoke({"query": "a"})
+    await uncached.ainvoke({"query": "a"})
+
+    assert calls == ["fail", "fail", "a", "a"]
+
+
+async def test_slow_calls_time_out_with_a_message_and_overlap():
+    managed = managed_tool(lookup, timeout=0.01)
+    assert "超时" in await managed.ainvoke({"query": "slow"})
+    assert runtime.tool_cache.stats()["entries"] == 0
+
+    managed = managed_tool(lookup, cacheable=False)
+    started = time.perf_counter()
+    await asyncio.gather(*(managed.ainvoke({"query": str(i)}) for i in range(5)))
+    assert time.perf_counter() - started < 0.2